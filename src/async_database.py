@@ -0,0 +1,105 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from config import load_config
+from database import ComicDatabase
+from logger import app_logger
+
+config = load_config()
+
+# ComicDatabase methods that only read, run concurrently on the reader threads
+READ_METHODS = (
+    'get_user_by_id', 'get_cached_user', 'get_user_by_username', 'get_user_by_email', 'get_all_users',
+    'check_password', 'get_comic_assets', 'get_similar_story_candidates', 'get_comic_by_story',
+    'get_comic_by_title_or_story', 'get_all_comics', 'get_filtered_comics', 'get_comic_page',
+    'get_comic_detail', 'get_unique_locations', 'get_location_stats', 'get_date_stats',
+    'get_output_manifest', 'find_comic_id_by_image_path', 'get_loyalty_ledger',
+    'get_loyalty_point_costs', 'get_loyalty_point_cost',
+)
+
+# ComicDatabase methods that write, run one at a time on the writer thread
+WRITE_METHODS = (
+    'add_comic', 'add_comics', 'add_comic_assets', 'index_comic_story', 'add_user',
+    'update_user_password', 'update_user_loyalty_points', 'spend_loyalty_points',
+    'update_user_last_login', 'update_user_last_purchase', 'update_loyalty_point_cost',
+    'update_loyalty_point_costs', 'upsert_output_manifest_entry', 'update_indexed_comic',
+    'purge_database', 'initialize_database',
+)
+
+def _call_and_release(method, args, kwargs):
+    # Each call is its own unit of work, like a request: the thread's connections go
+    # back to the pool afterwards instead of staying pinned to an executor thread
+    try:
+        return method(*args, **kwargs)
+    finally:
+        ComicDatabase.close()
+
+def _delegate(name, write):
+    method = getattr(ComicDatabase, name)
+
+    @functools.wraps(method)
+    async def call(self, *args, **kwargs):
+        return await self._run(write, method, *args, **kwargs)
+
+    return call
+
+class AsyncComicDatabase:
+    """
+    An awaitable twin of ComicDatabase for code running on an asyncio event loop.
+
+    Every method in READ_METHODS and WRITE_METHODS takes the same arguments as the
+    ComicDatabase method of the same name and returns the same result, but runs on a
+    dedicated database thread so the event loop never blocks on I/O. Reads share a
+    pool of DB_POOL_SIZE threads; writes are serialized on one writer thread, which
+    matches SQLite's single writer and keeps them from waiting on busy_timeout.
+
+    Example:
+        db = AsyncComicDatabase()
+        comics, next_cursor = await db.get_comic_page(user_id, search='picnic')
+    """
+
+    def __init__(self, read_workers=None):
+        self._readers = ThreadPoolExecutor(max_workers=read_workers or config.DB_POOL_SIZE,
+                                           thread_name_prefix='comic-db-read')
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='comic-db-write')
+
+    async def _run(self, write, method, *args, **kwargs):
+        executor = self._writer if write else self._readers
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, _call_and_release, method, args, kwargs)
+
+    async def run_in_transaction(self, func, *args, **kwargs):
+        """
+        Run a function calling several ComicDatabase mutators as one transaction.
+
+        The function runs synchronously on the writer thread inside
+        ComicDatabase.transaction(), so it is committed once or rolled back as a whole.
+
+        Args:
+            func (callable): Function calling ComicDatabase methods.
+
+        Returns:
+            The function's return value.
+        """
+        def run():
+            with ComicDatabase.transaction():
+                return func(*args, **kwargs)
+        return await self._run(True, run)
+
+    async def close(self):
+        """Wait for queued calls to finish and stop the database threads."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self._writer.shutdown, wait=True))
+        await loop.run_in_executor(None, functools.partial(self._readers.shutdown, wait=True))
+        app_logger.debug("Async database threads stopped")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+for _name in READ_METHODS:
+    setattr(AsyncComicDatabase, _name, _delegate(_name, write=False))
+for _name in WRITE_METHODS:
+    setattr(AsyncComicDatabase, _name, _delegate(_name, write=True))
@@ -0,0 +1,122 @@
+import gc
+import threading
+import time
+
+from config import load_config
+from lazy_imports import lazy_import, is_loaded
+from logger import app_logger
+
+config = load_config()
+
+torch = lazy_import('torch')
+transformers = lazy_import('transformers')
+
+class CaptioningEngine:
+    """
+    Keeps the TORCH_IMAGE_TO_TEXT_MODEL captioning pipeline loaded and captions
+    images in batches.
+
+    The model is loaded on the first caption() call and stays resident for later
+    videos and images; a background thread unloads it after
+    CAPTION_MODEL_IDLE_SECONDS without use. One batch runs at a time.
+
+    Example:
+        captions = captioning_engine.caption(frames)
+    """
+
+    def __init__(self, batch_size=None, idle_seconds=None):
+        self._batch_size = batch_size
+        self._idle_seconds = idle_seconds
+        self._captioner = None
+        self._last_used = time.monotonic()
+        # Serializes loading, captioning and unloading; the pipeline is not thread-safe
+        self._lock = threading.Lock()
+        self._evictor = None
+        self._stop = threading.Event()
+
+    @property
+    def batch_size(self):
+        return max(1, self._batch_size or config.CAPTION_BATCH_SIZE)
+
+    @property
+    def idle_seconds(self):
+        return config.CAPTION_MODEL_IDLE_SECONDS if self._idle_seconds is None else self._idle_seconds
+
+    def is_loaded(self):
+        return self._captioner is not None
+
+    def _load(self):
+        # Called with self._lock held
+        device = 0 if torch.cuda.is_available() else -1
+        app_logger.info(f"Loading captioning model {config.TORCH_IMAGE_TO_TEXT_MODEL} on "
+                        f"{torch.cuda.get_device_name(0) if device == 0 else 'cpu'}")
+        started = time.perf_counter()
+        # fp16 on GPU for memory optimization
+        self._captioner = transformers.pipeline("image-to-text", model=config.TORCH_IMAGE_TO_TEXT_MODEL, device=device,
+                                                torch_dtype=torch.float16 if device == 0 else None)
+        app_logger.info(f"Loaded captioning model in {time.perf_counter() - started:.1f}s")
+        if self.idle_seconds > 0 and (self._evictor is None or not self._evictor.is_alive()):
+            self._stop.clear()
+            self._evictor = threading.Thread(target=self._unload_when_idle, name='captioning-evictor', daemon=True)
+            self._evictor.start()
+
+    def _unload(self):
+        # Called with self._lock held
+        if self._captioner is None:
+            return
+        captioner, self._captioner = self._captioner, None
+        # Move the model off the GPU before dropping it so its memory is released
+        captioner.model.to('cpu')
+        del captioner
+        gc.collect()
+        if is_loaded(torch) and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        app_logger.info("Unloaded captioning model")
+
+    def caption(self, images, max_new_tokens=50, batch_size=None):
+        """
+        Caption images with the resident model.
+
+        Args:
+            images (list): PIL images.
+            max_new_tokens (int): Maximum caption length in tokens.
+            batch_size (int): Images per forward pass; defaults to CAPTION_BATCH_SIZE.
+
+        Returns:
+            list: One caption per image, in order.
+        """
+        if not images:
+            return []
+        with self._lock:
+            if self._captioner is None:
+                self._load()
+            try:
+                results = self._captioner(list(images), max_new_tokens=max_new_tokens,
+                                          batch_size=batch_size or self.batch_size)
+            finally:
+                self._last_used = time.monotonic()
+        return [result[0]['generated_text'] for result in results]
+
+    def unload(self):
+        """Unload the model now and stop the idle thread."""
+        self._stop.set()
+        with self._lock:
+            self._unload()
+
+    def _unload_when_idle(self):
+        while not self._stop.wait(max(1.0, min(self.idle_seconds / 4, 60.0))):
+            with self._lock:
+                if self._captioner is None:
+                    # The next load starts a new idle thread
+                    self._evictor = None
+                    return
+                if time.monotonic() - self._last_used >= self.idle_seconds:
+                    try:
+                        self._unload()
+                    except Exception as e:
+                        app_logger.error(f"Error unloading captioning model: {e}")
+                    self._evictor = None
+                    return
+
+# Shared by video summaries and image comics in this process
+captioning_engine = CaptioningEngine()
@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+from config import load_config
+from database import ComicDatabase
+from logger import app_logger
+from text_compression import train_dictionary
+
+config = load_config()
+
+def train_compression_dictionary(sample_size=500):
+    """
+    Train a preset dictionary on the newest comics and compress new text with it.
+
+    Args:
+        sample_size (int): Number of recent comics to sample.
+
+    Returns:
+        int: The new dictionary ID, or None if there is too little text to train on.
+    """
+    samples = ComicDatabase.get_comic_text_samples(sample_size)
+    dictionary = train_dictionary(samples)
+    if not dictionary:
+        app_logger.info("Not enough comic text to train a compression dictionary")
+        return None
+    return ComicDatabase.add_compression_dictionary(dictionary)
+
+def compress_all_comic_text(batch_size=500):
+    """
+    Rewrite plain or older-dictionary comic text with the current dictionary.
+
+    Returns:
+        int: The number of comics rewritten.
+    """
+    after_id, rewritten = 0, 0
+    while after_id is not None:
+        after_id, changed = ComicDatabase.compress_comic_text(after_id, batch_size)
+        rewritten += changed
+    return rewritten
+
+def archive_old_comics(days=None, batch_size=500):
+    """
+    Move the story and script of comics older than `days` into comic_text_archive.
+
+    Archives nothing on backends with native text compression; see
+    ComicDatabase.archive_comic_text.
+
+    Args:
+        days (int): Age in days after which comics are archived (defaults to
+            config.COMIC_ARCHIVE_AFTER_DAYS).
+        batch_size (int): Comics moved per transaction.
+
+    Returns:
+        int: The number of comics archived.
+    """
+    if ComicDatabase.get_backend().native_text_compression:
+        return 0
+    days = config.COMIC_ARCHIVE_AFTER_DAYS if days is None else days
+    before_date = date.today() - timedelta(days=days)
+    archived = 0
+    while True:
+        moved = ComicDatabase.archive_comic_text(before_date, batch_size)
+        archived += moved
+        if moved < batch_size:
+            return archived
+
+def run_archival(days=None):
+    """
+    Compress comic text and archive old comics.
+
+    Trains the first dictionary if there is none yet. Only SQLite stores text this
+    way; PostgreSQL compresses and moves large values out of line itself (TOAST), and
+    its search index reads the comics columns, so nothing is done there.
+
+    Returns:
+        dict: Counts of comics 'compressed' and 'archived'.
+    """
+    if ComicDatabase.get_backend().native_text_compression:
+        app_logger.info("Storage backend compresses text natively; skipping comic archival")
+        return {'compressed': 0, 'archived': 0}
+    if ComicDatabase.get_current_compression_dictionary()[0] == 0:
+        train_compression_dictionary()
+    counts = {'compressed': compress_all_comic_text(), 'archived': archive_old_comics(days)}
+    app_logger.info(f"Comic archival finished: {counts['compressed']} compressed, {counts['archived']} archived")
+    return counts
+
+if __name__ == '__main__':
+    ComicDatabase.initialize_database()
+    run_archival()
+    ComicDatabase.close_pools()
@@ -0,0 +1,88 @@
+import os
+from PIL import Image
+from logger import app_logger
+
+def canonical_image_path(path, output_dir):
+    """
+    Convert a stored panel path to the path relative to OUTPUT_DIR that serve_image expects.
+
+    Handles absolute paths, paths already relative to OUTPUT_DIR and the legacy
+    './output/' prefixed form.
+
+    Args:
+        path (str): The path as stored in comics.image_path.
+        output_dir (str): The output directory.
+
+    Returns:
+        str: The canonical relative path using forward slashes.
+    """
+    path = path.strip()
+    if os.path.isabs(path):
+        path = os.path.relpath(path, os.path.abspath(output_dir))
+    else:
+        if path.startswith('./'):
+            path = path[2:]
+        if path.startswith('output/'):
+            path = path[7:]
+    return os.path.normpath(path).replace(os.sep, '/')
+
+def canonical_audio_path(path, output_dir):
+    """
+    Convert a stored narration path to the path relative to OUTPUT_DIR/audio that serve_audio expects.
+
+    Args:
+        path (str): The path as stored in comics.audio_path.
+        output_dir (str): The output directory.
+
+    Returns:
+        str: The canonical relative path using forward slashes.
+    """
+    audio_dir = os.path.join(os.path.abspath(output_dir), 'audio')
+    path = path.strip()
+    if os.path.isabs(path):
+        path = os.path.relpath(path, audio_dir)
+    return os.path.normpath(path).replace(os.sep, '/')
+
+def _stat_asset(full_path, relative_path, kind):
+    """Get (byte_size, width, height, available) of an asset file."""
+    if relative_path.startswith('../') or not os.path.isfile(full_path):
+        app_logger.warning(f"Comic {kind} file not found: {full_path}")
+        return None, None, None, 0
+    byte_size = os.path.getsize(full_path)
+    width = height = None
+    if kind == 'image':
+        try:
+            # Image.open only parses the header; the pixel data is never decoded here
+            with Image.open(full_path) as image:
+                width, height = image.size
+        except Exception as e:
+            app_logger.warning(f"Could not read image dimensions of {full_path}: {e}")
+    return byte_size, width, height, 1
+
+def describe_comic_assets(image_path, audio_path, output_dir):
+    """
+    Describe the panels and narration of a comic for the comic_assets table.
+
+    This is the only place the gallery touches the filesystem: availability, size and
+    dimensions are captured when a comic is written so listing pages read them from
+    the database.
+
+    Args:
+        image_path (str): Comma-separated panel paths as stored in comics.image_path.
+        audio_path (str): The narration path as stored in comics.audio_path, or None.
+        output_dir (str): The output directory.
+
+    Returns:
+        list: (kind, position, path, byte_size, width, height, available) tuples.
+    """
+    assets = []
+    panel_paths = [path for path in (image_path or '').split(',') if path.strip()]
+    for position, path in enumerate(panel_paths):
+        relative_path = canonical_image_path(path, output_dir)
+        full_path = os.path.join(output_dir, relative_path)
+        assets.append(('image', position, relative_path) + _stat_asset(full_path, relative_path, 'image'))
+    if audio_path:
+        relative_path = canonical_audio_path(audio_path, output_dir)
+        full_path = os.path.join(output_dir, 'audio', relative_path)
+        assets.append(('audio', 0, relative_path) + _stat_asset(full_path, relative_path, 'audio'))
+    return assets
@@ -0,0 +1,24 @@
+from database import ComicDatabase
+
+def format_comic_stats(location_stats, date_stats):
+    """
+    Render comic counts per location and per date as a plain text report.
+
+    Args:
+        location_stats (list): Rows from ComicDatabase.get_location_stats().
+        date_stats (list): Rows from ComicDatabase.get_date_stats().
+
+    Returns:
+        str: The report.
+    """
+    total = sum(row['comic_count'] for row in location_stats)
+    lines = [f"{total} comics in {len(location_stats)} locations over {len(date_stats)} days", "", "Locations:"]
+    lines.extend(f"  {row['comic_count']:>6}  {row['location']}" for row in location_stats)
+    lines.extend(["", "Dates:"])
+    lines.extend(f"  {row['comic_count']:>6}  {row['date']}" for row in date_stats)
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    ComicDatabase.initialize_database()
+    print(format_comic_stats(ComicDatabase.get_location_stats(), ComicDatabase.get_date_stats()))
+    ComicDatabase.close_pools()
@@ -1,12 +1,52 @@
 import os
-from dotenv import load_dotenv
+import sys
+import threading
+from dotenv import dotenv_values
 
+ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
+
+# Keys os.environ got from the .env file; a reload may replace these but never a
+# variable that was set in the real environment
+_env_file_keys = set()
+_env_lock = threading.RLock()
+
+_config = None
+_env_mtime = None
+_reload_listeners = []
+_watcher_thread = None
+_watcher_stop = threading.Event()
+
+def _env_file_mtime():
+    try:
+        return os.stat(ENV_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+def _apply_env_file():
+    """Copy the .env file into os.environ, replacing values it set before."""
+    global _env_mtime
+    with _env_lock:
+        _env_mtime = _env_file_mtime()
+        values = dotenv_values(ENV_PATH) if _env_mtime is not None else {}
+        for key in _env_file_keys - set(values):
+            os.environ.pop(key, None)
+            _env_file_keys.discard(key)
+        for key, value in values.items():
+            if value is None or (key in os.environ and key not in _env_file_keys):
+                continue
+            os.environ[key] = value
+            _env_file_keys.add(key)
 
 class Config:
-    def __init__(self):
-        dotenv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
-        load_dotenv(dotenv_path)
+    """
+    Application settings read from the environment and the .env file.
+
+    There is one shared instance, returned by load_config(). It is read-only;
+    reload() re-reads the environment and swaps in every new value at once, so
+    modules that keep `config = load_config()` as a global see the change.
+    """
 
+    def __init__(self):
         self.ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD')
         self.SECRET_KEY = os.getenv('SECRET_KEY')
         self.SUNO_COOKIE = os.getenv('SUNO_COOKIE')
@@ -14,11 +54,28 @@ class Config:
         self.LOCATION = os.getenv("LOCATION", "New York")
         self.SOURCE_DIR = os.getenv("SOURCE_DIR")
         self.OUTPUT_DIR = os.getenv("OUTPUT_DIR")
+        self.OUTPUT_INDEXER_ENABLED = os.getenv('OUTPUT_INDEXER_ENABLED', 'true').lower() == 'true'
+        self.OUTPUT_INDEX_INTERVAL = int(os.getenv('OUTPUT_INDEX_INTERVAL', 0))
+        self.DB_BACKEND = os.getenv('DB_BACKEND', 'sqlite').lower()
+        self.DATABASE_URL = os.getenv('DATABASE_URL')
         self.DB_PATH = os.getenv("DB_PATH")
+        self.DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 8))
+        self.DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', 5000))
+        self.DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', 65536))
+        self.DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', 268435456))
+        self.DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', 256))
+        self.USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 5))
+        self.COMIC_ARCHIVE_AFTER_DAYS = int(os.getenv('COMIC_ARCHIVE_AFTER_DAYS', 180))
         self.LOG_PATH = os.getenv("LOG_PATH")
         self.GENERATE_AUDIO = os.getenv("GENERATE_AUDIO", "false").lower() == "true"
         self.TRAINING_FOLDER = os.getenv("TRAINING_FOLDER")
         self.FLUX1_MODEL_LOCATION = os.getenv("FLUX1_MODEL_LOCATION")
+        self.FLUX1_REALISM_LORA = os.getenv("FLUX1_REALISM_LORA")
+        self.FLUX_PIPELINE_CACHE_SIZE = int(os.getenv('FLUX_PIPELINE_CACHE_SIZE', 1))
+        self.FLUX_PIPELINE_IDLE_SECONDS = float(os.getenv('FLUX_PIPELINE_IDLE_SECONDS', 600))
+        self.FLUX_BATCH_SIZE = int(os.getenv('FLUX_BATCH_SIZE', 3))
+        self.PROMPT_EMBEDDING_CACHE_SIZE = int(os.getenv('PROMPT_EMBEDDING_CACHE_SIZE', 32))
+        self.PROMPT_EMBEDDING_CACHE_DIR = os.getenv('PROMPT_EMBEDDING_CACHE_DIR', '')
         self.DEFAULT_LAT=os.getenv('DEFAULT_LAT', 50.693802)
         self.DEFAULT_LON=os.getenv('DEFAULT_LON', -121.936584)
 
@@ -27,6 +84,8 @@ class Config:
         self.OLLAMA_GROQ_TOOL_MODEL=os.getenv('OLLAMA_GROQ_TOOL_MODEL', "llama-3-groq-70b-tool-use")
         self.OLLAMA_TEXT_ANALYZE_MODEL=os.getenv('OLLAMA_TEXT_ANALYZE_MODEL', 'llama3-optimized')
         self.TORCH_IMAGE_TO_TEXT_MODEL=os.getenv('TORCH_IMAGE_TO_TEXT_MODEL', 'unified-vl-t5-base')
+        self.CAPTION_BATCH_SIZE = int(os.getenv('CAPTION_BATCH_SIZE', 8))
+        self.CAPTION_MODEL_IDLE_SECONDS = float(os.getenv('CAPTION_MODEL_IDLE_SECONDS', 600))
 
         self.OPENAI_API_KEY = os.getenv("API_KEY_OPENAI")
         self.PERPLEXITY_API_KEY = os.getenv("API_KEY_PERPLEXITY")
@@ -60,10 +119,114 @@ class Config:
 
         self.WEB_PORT = os.getenv('WEB_PORT', 5000)
         self.WEB_DEBUG = os.getenv('WEB_DEBUG', 'true').lower() == 'true'
+        self.GALLERY_PAGE_SIZE = int(os.getenv('GALLERY_PAGE_SIZE', 20))
 
         # DALL-E rate limit parameters
         self.DALLE_RATE_LIMIT = int(os.getenv('DALLE_RATE_LIMIT', 5))
         self.DALLE_RATE_LIMIT_PERIOD = int(os.getenv('DALLE_RATE_LIMIT_PERIOD', 60))
 
+        # Seconds between checks of the .env file for changes; 0 disables the watcher
+        self.CONFIG_WATCH_INTERVAL = float(os.getenv('CONFIG_WATCH_INTERVAL', 0))
+
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get('_frozen'):
+            raise AttributeError(f"Config is read-only; change the environment and call reload() to update {name}")
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Config is read-only; cannot delete {name}")
+
+    def reload(self):
+        """
+        Re-read the .env file and the environment.
+
+        Returns:
+            Config: This instance, updated.
+        """
+        with _env_lock:
+            _apply_env_file()
+            # Replacing the whole __dict__ means a reader never sees a mix of old and new values
+            object.__setattr__(self, '__dict__', Config().__dict__)
+            listeners = list(_reload_listeners)
+        for listener in listeners:
+            listener(self)
+        return self
+
 def load_config():
-    return Config()
+    """
+    Get the shared Config, reading the .env file the first time.
+
+    Returns:
+        Config: The application config.
+    """
+    global _config
+    if _config is None:
+        with _env_lock:
+            if _config is None:
+                _apply_env_file()
+                _config = Config()
+    return _config
+
+def add_reload_listener(listener):
+    """
+    Register a function called with the Config after every reload().
+
+    Args:
+        listener (callable): Function taking the reloaded Config.
+    """
+    with _env_lock:
+        if listener not in _reload_listeners:
+            _reload_listeners.append(listener)
+
+def reload_if_changed():
+    """
+    Reload the config if the .env file was modified since it was last read.
+
+    Returns:
+        bool: True if the config was reloaded.
+    """
+    config = load_config()
+    if _env_file_mtime() == _env_mtime:
+        return False
+    config.reload()
+    return True
+
+def _watch_env_file(interval):
+    while not _watcher_stop.wait(interval):
+        try:
+            reload_if_changed()
+        except Exception as e:
+            # The logger depends on this module, so report on stderr
+            print(f"Error reloading configuration from {ENV_PATH}: {e}", file=sys.stderr)
+
+def start_config_watcher(interval=None):
+    """
+    Start a daemon thread that reloads the config when the .env file changes.
+
+    Args:
+        interval (float): Seconds between checks; defaults to CONFIG_WATCH_INTERVAL.
+
+    Returns:
+        bool: True if the watcher is running, False if it is disabled.
+    """
+    global _watcher_thread
+    interval = load_config().CONFIG_WATCH_INTERVAL if interval is None else interval
+    if interval <= 0:
+        return False
+    with _env_lock:
+        if _watcher_thread is None or not _watcher_thread.is_alive():
+            _watcher_stop.clear()
+            _watcher_thread = threading.Thread(target=_watch_env_file, args=(interval,),
+                                               name='config-watcher', daemon=True)
+            _watcher_thread.start()
+    return True
+
+def stop_config_watcher():
+    """Stop the .env watcher thread if it is running."""
+    global _watcher_thread
+    _watcher_stop.set()
+    if _watcher_thread is not None:
+        _watcher_thread.join()
+        _watcher_thread = None
@@ -0,0 +1,120 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from logger import app_logger
+
+class ConnectionPool:
+    """
+    A pool of reusable database connections.
+
+    Released connections are kept for reuse instead of being reopened. Up to
+    `max_idle` released connections are kept; extra ones are closed on release so
+    bursts never block. Subclasses implement _connect and _in_transaction.
+    """
+
+    def __init__(self, max_idle=8):
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._lock = threading.Lock()
+        self._open_count = 0
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def _in_transaction(self, connection):
+        raise NotImplementedError
+
+    def _opened(self):
+        with self._lock:
+            self._open_count += 1
+
+    def acquire(self):
+        """Take an idle connection from the pool, opening a new one if none is idle."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, connection):
+        """Return a connection to the pool, rolling back any transaction left open."""
+        if self._in_transaction(connection):
+            app_logger.warning("Rolling back uncommitted transaction on released database connection")
+            connection.rollback()
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            self._close_connection(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def _close_connection(self, connection):
+        connection.close()
+        with self._lock:
+            self._open_count -= 1
+
+    def close_all(self):
+        """Close every idle connection. Connections currently checked out are unaffected."""
+        while True:
+            try:
+                self._close_connection(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    @property
+    def open_count(self):
+        return self._open_count
+
+class SQLiteConnectionPool(ConnectionPool):
+    """
+    A pool of tuned SQLite connections to one database file.
+
+    Connections are opened with WAL journaling, synchronous=NORMAL, a busy timeout,
+    memory-mapped I/O, a larger page cache and the sqlite3 statement cache.
+
+    A read-only pool (read_only=True) opens connections with mode=ro. Under WAL these
+    readers see the last committed state and never take the write lock, so gallery
+    reads do not stall comic generation writes.
+    """
+
+    def __init__(self, db_path, read_only=False, max_idle=8, busy_timeout_ms=5000,
+                 cache_size_kb=65536, mmap_size=268435456, cached_statements=256):
+        super().__init__(max_idle)
+        self.db_path = db_path
+        self.read_only = read_only
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+
+    def _connect(self):
+        if self.read_only:
+            connection = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True,
+                                         timeout=self.busy_timeout_ms / 1000,
+                                         cached_statements=self.cached_statements,
+                                         check_same_thread=False)
+        else:
+            connection = sqlite3.connect(self.db_path,
+                                         timeout=self.busy_timeout_ms / 1000,
+                                         cached_statements=self.cached_statements,
+                                         check_same_thread=False)
+            # journal_mode is persistent in the database file, so readers inherit it
+            connection.execute('PRAGMA journal_mode=WAL')
+        connection.row_factory = sqlite3.Row
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        connection.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        connection.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        if self.read_only:
+            connection.execute('PRAGMA query_only=ON')
+        self._opened()
+        app_logger.debug(f"Opened {'read-only' if self.read_only else 'read-write'} database connection to {self.db_path}")
+        return connection
+
+    def _in_transaction(self, connection):
+        return connection.in_transaction
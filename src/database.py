@@ -1,15 +1,60 @@
-import os
-import sqlite3
+import json
+import base64
+import hashlib
+import hmac
 from datetime import datetime
 from config import load_config
 from logger import app_logger
+from storage import create_backend
+from story_signatures import story_hash, story_bands
+from comic_assets import describe_comic_assets
+from text_compression import compress_text, compressed_dictionary_id, decompress_text
+import startup_profiler
 import threading
+import time
+from contextlib import contextmanager
 from werkzeug.security import generate_password_hash, check_password_hash
 
 config = load_config()
 
+# Columns for gallery listings. The full original_story and comic_script are left out
+# and only loaded for a single comic by get_comic_detail.
+COMIC_LIST_COLUMNS = '''
+    c.id, c.user_id, c.title, c.location, c.story_hash, c.story_excerpt, c.story_truncated,
+    c.comic_summary, c.story_source_url, c.image_path, c.audio_path, c.created_at, c.date
+'''
+
+# Length of the plain story_excerpt stored next to the (possibly compressed) story
+STORY_EXCERPT_LENGTH = 280
+
+# Comic columns stored compressed unless the backend compresses text natively
+COMPRESSED_COMIC_COLUMNS = ('original_story', 'comic_script', 'comic_summary')
+
+INSERT_COMIC_SQL = '''
+    INSERT INTO comics (user_id, title, location, original_story, story_excerpt, story_truncated, story_hash, comic_script, comic_summary, story_source_url, image_path, audio_path, created_at, date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    RETURNING id
+'''
+
+INSERT_ASSET_SQL = '''
+    INSERT INTO comic_assets (comic_id, kind, position, path, byte_size, width, height, available)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
 class ComicDatabase:
     _local = threading.local()
+    _backend = None
+    _backend_lock = threading.Lock()
+    _price_cache = None
+    _price_cache_version = None
+    _price_cache_lock = threading.Lock()
+    _user_cache = {}
+    _user_cache_lock = threading.Lock()
+    _dictionaries = {}
+    _current_dictionary = None
+    _dictionaries_lock = threading.Lock()
+    _bootstrapped = False
+    _bootstrap_lock = threading.Lock()
 
     @classmethod
     def get_user_by_id(cls, user_id):
@@ -22,6 +67,43 @@ class ComicDatabase:
             app_logger.error(f"Error getting user by ID from database: {e}")
             return None
 
+    @classmethod
+    def get_cached_user(cls, user_id):
+        """
+        Get a user through a short-lived cache shared by all requests of this process.
+
+        Entries live for config.USER_CACHE_TTL seconds and are dropped as soon as this
+        process changes the user's points, password, last login or last purchase, so
+        repeated auth and loyalty checks do not each query the users table.
+
+        Args:
+            user_id (int): The user ID.
+
+        Returns:
+            dict: A copy of the user row, or None if the user does not exist.
+        """
+        now = time.monotonic()
+        with cls._user_cache_lock:
+            cached = cls._user_cache.get(user_id)
+            if cached and cached[0] > now:
+                return dict(cached[1])
+        user = cls.get_user_by_id(user_id)
+        if user and config.USER_CACHE_TTL > 0:
+            with cls._user_cache_lock:
+                cls._user_cache[user_id] = (now + config.USER_CACHE_TTL, user)
+        return dict(user) if user else None
+
+    @classmethod
+    def invalidate_user(cls, user_id=None, username=None):
+        """Drop a user from the cross-request user cache, by ID or by username."""
+        with cls._user_cache_lock:
+            if user_id is not None:
+                cls._user_cache.pop(user_id, None)
+            if username is not None:
+                for cached_id, (_, user) in list(cls._user_cache.items()):
+                    if user['username'] == username:
+                        del cls._user_cache[cached_id]
+
     @classmethod
     def update_user_password(cls, username, new_password):
         try:
@@ -32,92 +114,416 @@ class ComicDatabase:
                 SET password_hash = ?
                 WHERE username = ?
             ''', (password_hash, username))
-            cls.get_connection().commit()
+            cls.commit()
+            cls.on_commit(lambda: cls.invalidate_user(username=username))
             app_logger.debug(f"Updated password for user: {username}")
         except Exception as e:
+            if cls.in_transaction():
+                raise
             app_logger.error(f"Error updating user password: {e}")
 
+    @classmethod
+    def get_backend(cls):
+        """Get the storage backend selected by config.DB_BACKEND, creating it on first use."""
+        with cls._backend_lock:
+            if cls._backend is None:
+                cls._backend = create_backend(config)
+                app_logger.info(f"Using {cls._backend.name} storage backend: {cls._backend.describe()}")
+            return cls._backend
+
     @classmethod
     def get_connection(cls):
         if not hasattr(cls._local, "connection"):
-            app_logger.debug(f"Creating new database connection to {config.DB_PATH}")
-            cls._local.connection = sqlite3.connect(config.DB_PATH)
-            cls._local.connection.row_factory = sqlite3.Row
+            app_logger.debug("Checking out database connection")
+            cls._local.connection = cls.get_backend().acquire()
         return cls._local.connection
 
+    @classmethod
+    def get_read_connection(cls):
+        """Get this thread's read-only connection, used by the gallery queries."""
+        if not hasattr(cls._local, "read_connection"):
+            app_logger.debug("Checking out read-only database connection")
+            cls._local.read_connection = cls.get_backend().acquire(read_only=True)
+        return cls._local.read_connection
+
+    @classmethod
+    @contextmanager
+    def transaction(cls):
+        """
+        Run several mutators as one unit of work with a single commit.
+
+        Mutators called inside the block skip their own commit and re-raise errors
+        instead of logging them, so the whole block is rolled back on failure. Nested
+        blocks join the outermost transaction. Callbacks registered with on_commit()
+        run after the outermost block commits.
+
+        Yields:
+            This thread's read-write connection.
+        """
+        connection = cls.get_connection()
+        depth = getattr(cls._local, 'transaction_depth', 0)
+        if depth == 0:
+            cls._local.commit_callbacks = []
+        cls._local.transaction_depth = depth + 1
+        try:
+            yield connection
+        except Exception:
+            cls._local.transaction_depth = depth
+            if depth == 0:
+                cls._local.commit_callbacks = []
+                connection.rollback()
+                app_logger.debug("Database transaction rolled back")
+            raise
+        cls._local.transaction_depth = depth
+        if depth == 0:
+            try:
+                connection.commit()
+            finally:
+                callbacks, cls._local.commit_callbacks = cls._local.commit_callbacks, []
+            for callback in callbacks:
+                cls._run_commit_callback(callback)
+
+    @classmethod
+    def in_transaction(cls):
+        return getattr(cls._local, 'transaction_depth', 0) > 0
+
+    @classmethod
+    def on_commit(cls, callback):
+        """
+        Run a callback once this thread's changes are committed.
+
+        Inside a transaction() block the callback waits for the outermost block to
+        commit and is dropped if it rolls back; otherwise it runs immediately. Use it
+        for cache invalidation, so other threads cannot re-cache the old rows between
+        the invalidation and the commit.
+
+        Args:
+            callback (callable): Function taking no arguments.
+        """
+        if cls.in_transaction():
+            cls._local.commit_callbacks.append(callback)
+        else:
+            cls._run_commit_callback(callback)
+
+    @classmethod
+    def _run_commit_callback(cls, callback):
+        # The data is already committed; a failing callback must not look like a failed write
+        try:
+            callback()
+        except Exception as e:
+            app_logger.error(f"Error in database commit callback: {e}")
+
+    @classmethod
+    def commit(cls):
+        """Commit this thread's connection unless a transaction() block is open."""
+        if not cls.in_transaction():
+            cls.get_connection().commit()
+
     @classmethod
     def get_cursor(cls):
         connection = cls.get_connection()
         app_logger.debug("Getting database cursor")
-        return connection.cursor()
+        return cls.get_backend().cursor(connection)
+
+    @classmethod
+    def get_read_cursor(cls):
+        return cls.get_backend().cursor(cls.get_read_connection())
+
+    @classmethod
+    def _comic_row(cls, user_id, title, location, original_story, comic_script, comic_summary, story_source_url, image_path, audio_path=None, date=None):
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if date is None:
+            date = datetime.now().date()
+        return (user_id, title, location, cls.encode_comic_text(original_story), original_story[:STORY_EXCERPT_LENGTH],
+                int(len(original_story) > STORY_EXCERPT_LENGTH), story_hash(original_story), cls.encode_comic_text(comic_script), cls.encode_comic_text(comic_summary),
+                story_source_url, image_path, audio_path, current_time, date)
 
     @classmethod
-    def create_table(cls):
+    def insert_comic(cls, user_id, title, location, original_story, comic_script, comic_summary, story_source_url, image_path, audio_path=None, date=None):
+        """
+        Insert a comic with its assets, story bands and full-text index entry.
+
+        Does not commit and raises on error; add_comic and add_comics wrap it, and
+        callers saving the comic together with other writes commit themselves.
+
+        Returns:
+            int: The new comic's ID.
+        """
         cursor = cls.get_cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS comics (
-                id INTEGER PRIMARY KEY,
-                user_id INTEGER,
-                title TEXT NOT NULL,
-                location TEXT NOT NULL,
-                original_story TEXT NOT NULL,
-                comic_script TEXT NOT NULL,
-                comic_summary TEXT,
-                story_source_url TEXT,
-                image_path TEXT NOT NULL,
-                audio_path TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                date DATE NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE,
-                password_hash TEXT NOT NULL,
-                role TEXT NOT NULL,
-                loyalty_points INTEGER DEFAULT 0,
-                last_login TEXT,
-                last_purchase_date DATE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS loyalty_point_costs (
-                id INTEGER PRIMARY KEY,
-                action_name TEXT UNIQUE NOT NULL,
-                point_cost INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        cls.get_connection().commit()
+        cursor.execute(INSERT_COMIC_SQL, cls._comic_row(user_id, title, location, original_story, comic_script, comic_summary, story_source_url, image_path, audio_path, date))
+        comic_id = cursor.fetchone()['id']
+        cls.add_comic_assets(comic_id, image_path, audio_path)
+        cls.index_comic_story(comic_id, original_story)
+        cls.get_backend().index_search_text(cursor, comic_id, title, original_story, comic_summary, comic_script)
+        return comic_id
 
     @classmethod
     def add_comic(cls, user_id, title, location, original_story, comic_script, comic_summary, story_source_url, image_path, audio_path=None, date=None):
         try:
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            if date is None:
-                date = datetime.now().date()
-            cursor = cls.get_cursor()
-            cursor.execute('''
-                INSERT INTO comics (user_id, title, location, original_story, comic_script, comic_summary, story_source_url, image_path, audio_path, created_at, date)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (user_id, title, location, original_story, comic_script, comic_summary, story_source_url, image_path, audio_path, current_time, date))
-            cls.get_connection().commit()
+            with cls.transaction():
+                comic_id = cls.insert_comic(user_id, title, location, original_story, comic_script, comic_summary, story_source_url, image_path, audio_path, date)
             app_logger.debug(f"Added comic to database: {title} for user_id: {user_id}")
+            return comic_id
         except Exception as e:
+            if cls.in_transaction():
+                raise
             app_logger.error(f"Error adding comic to database: {e}")
+            return None
+
+    @classmethod
+    def add_comics(cls, comics):
+        """
+        Insert several comics and their assets in one transaction and one commit.
+
+        Args:
+            comics (list): Dicts of add_comic keyword arguments.
+
+        Returns:
+            int: The number of comics inserted (0 on error).
+        """
+        if not comics:
+            return 0
+        try:
+            with cls.transaction():
+                for comic in comics:
+                    cls.insert_comic(**comic)
+            app_logger.debug(f"Added {len(comics)} comics to database")
+            return len(comics)
+        except Exception as e:
+            if cls.in_transaction():
+                raise
+            app_logger.error(f"Error adding comics to database: {e}")
+            return 0
+
+    @classmethod
+    def get_compression_dictionary(cls, dictionary_id):
+        """
+        Get a preset dictionary from compression_dictionaries, cached for the process.
+
+        Dictionaries are never changed once stored, so cached ones never go stale.
+
+        Raises:
+            KeyError: If there is no dictionary with that ID.
+        """
+        with cls._dictionaries_lock:
+            if dictionary_id in cls._dictionaries:
+                return cls._dictionaries[dictionary_id]
+        cursor = cls.get_read_cursor()
+        cursor.execute('SELECT dictionary FROM compression_dictionaries WHERE id = ?', (dictionary_id,))
+        row = cursor.fetchone()
+        if row is None:
+            raise KeyError(f"Compression dictionary {dictionary_id} not found")
+        with cls._dictionaries_lock:
+            cls._dictionaries[dictionary_id] = bytes(row['dictionary'])
+            return cls._dictionaries[dictionary_id]
+
+    @classmethod
+    def get_current_compression_dictionary(cls):
+        """
+        Get the newest preset dictionary, which new text is compressed with.
+
+        Looked up once per process; a dictionary added by another process is picked up
+        after a restart, and text compressed with older dictionaries stays readable.
+
+        Returns:
+            tuple: (dictionary ID, dictionary bytes), or (0, None) if none was trained yet.
+        """
+        with cls._dictionaries_lock:
+            if cls._current_dictionary is not None:
+                return cls._current_dictionary
+        cursor = cls.get_read_cursor()
+        cursor.execute('SELECT id, dictionary FROM compression_dictionaries ORDER BY id DESC LIMIT 1')
+        row = cursor.fetchone()
+        with cls._dictionaries_lock:
+            if row is None:
+                cls._current_dictionary = (0, None)
+            else:
+                cls._dictionaries[row['id']] = bytes(row['dictionary'])
+                cls._current_dictionary = (row['id'], cls._dictionaries[row['id']])
+            return cls._current_dictionary
+
+    @classmethod
+    def add_compression_dictionary(cls, dictionary):
+        """
+        Store a new preset dictionary and compress new text with it from now on.
+
+        Args:
+            dictionary (bytes): A dictionary built by text_compression.train_dictionary.
+
+        Returns:
+            int: The dictionary ID, or None on error.
+        """
+        try:
+            cursor = cls.get_cursor()
+            cursor.execute('INSERT INTO compression_dictionaries (dictionary) VALUES (?) RETURNING id', (dictionary,))
+            dictionary_id = cursor.fetchone()['id']
+            cls.commit()
+            with cls._dictionaries_lock:
+                cls._dictionaries[dictionary_id] = dictionary
+                cls._current_dictionary = (dictionary_id, dictionary)
+            app_logger.info(f"Added compression dictionary {dictionary_id} ({len(dictionary)} bytes)")
+            return dictionary_id
+        except Exception as e:
+            if cls.in_transaction():
+                raise
+            app_logger.error(f"Error adding compression dictionary: {e}")
+            return None
+
+    @classmethod
+    def encode_comic_text(cls, text):
+        """Compress a story, script or summary for storage, unless the backend compresses text itself."""
+        if cls.get_backend().native_text_compression:
+            return text
+        dictionary_id, dictionary = cls.get_current_compression_dictionary()
+        return compress_text(text, dictionary_id, dictionary)
+
+    @classmethod
+    def decode_comic_text(cls, value):
+        """Decompress a stored story, script or summary; plain text is returned unchanged."""
+        dictionary_id = compressed_dictionary_id(value)
+        if dictionary_id is None:
+            return value
+        return decompress_text(value, cls.get_compression_dictionary(dictionary_id) if dictionary_id else None)
+
+    @classmethod
+    def _expand_comics(cls, comics):
+        """
+        Decompress the text columns of comic dicts, loading the story and script of
+        archived comics from comic_text_archive with one query.
+
+        Returns:
+            list: The same dicts, modified in place.
+        """
+        archived = {comic['id']: comic for comic in comics if comic.get('text_archived')}
+        if archived:
+            cursor = cls.get_read_cursor()
+            placeholders = ','.join('?' * len(archived))
+            cursor.execute(f'''
+                SELECT comic_id, original_story, comic_script
+                FROM comic_text_archive
+                WHERE comic_id IN ({placeholders})
+            ''', list(archived))
+            for row in cursor.fetchall():
+                archived[row['comic_id']].update(original_story=row['original_story'], comic_script=row['comic_script'])
+        for comic in comics:
+            for column in COMPRESSED_COMIC_COLUMNS:
+                if column in comic:
+                    comic[column] = cls.decode_comic_text(comic[column])
+        return comics
+
+    @classmethod
+    def add_comic_assets(cls, comic_id, image_path, audio_path=None):
+        """
+        Replace the comic_assets rows of a comic from its stored image and audio paths.
+
+        Does not commit; callers commit together with the comic row they just wrote.
+
+        Args:
+            comic_id (int): The comic ID.
+            image_path (str): Comma-separated panel paths as stored in comics.image_path.
+            audio_path (str): The narration path as stored in comics.audio_path, or None.
+        """
+        cursor = cls.get_cursor()
+        cursor.execute('DELETE FROM comic_assets WHERE comic_id = ?', (comic_id,))
+        cursor.executemany(INSERT_ASSET_SQL, [(comic_id,) + asset for asset in describe_comic_assets(image_path, audio_path, config.OUTPUT_DIR)])
+
+    @classmethod
+    def get_comic_assets(cls, comic_ids):
+        """
+        Get the available assets of several comics with one query.
+
+        Args:
+            comic_ids (list): The comic IDs, e.g. the comics of one gallery page.
+
+        Returns:
+            dict: Comic ID -> list of asset dicts (kind, position, path, byte_size, width,
+            height), ordered by kind and position.
+        """
+        assets = {comic_id: [] for comic_id in comic_ids}
+        if not assets:
+            return assets
+        try:
+            cursor = cls.get_read_cursor()
+            placeholders = ','.join('?' * len(assets))
+            cursor.execute(f'''
+                SELECT comic_id, kind, position, path, byte_size, width, height
+                FROM comic_assets
+                WHERE comic_id IN ({placeholders}) AND available = 1
+                ORDER BY comic_id, kind, position
+            ''', list(assets))
+            for row in cursor.fetchall():
+                assets[row['comic_id']].append(dict(row))
+            return assets
+        except Exception as e:
+            app_logger.error(f"Error getting comic assets from database: {e}")
+            return assets
+
+    @classmethod
+    def index_comic_story(cls, comic_id, original_story):
+        """
+        Replace the comic_story_bands rows of a comic from its story.
+
+        Does not commit; callers commit together with the comic row they just wrote.
+
+        Args:
+            comic_id (int): The comic ID.
+            original_story (str): The comic's story.
+        """
+        cursor = cls.get_cursor()
+        cursor.execute('DELETE FROM comic_story_bands WHERE comic_id = ?', (comic_id,))
+        cursor.executemany('INSERT INTO comic_story_bands (band, bucket, comic_id) VALUES (?, ?, ?)',
+                           [(band, bucket, comic_id) for band, bucket in story_bands(original_story)])
+
+    @classmethod
+    def get_similar_story_candidates(cls, original_story, user_id=None):
+        """
+        Get a user's comics whose stories may be near duplicates of a story.
+
+        Looks up the story's MinHash LSH buckets in comic_story_bands, so only comics
+        sharing a bucket are loaded instead of every comic of the user. Candidates are
+        ordered by the number of shared buckets, most similar first; callers confirm
+        them with comic_core.is_similar_story.
+
+        Args:
+            original_story (str): The story to check.
+            user_id (int): The user whose comics to search.
+
+        Returns:
+            list: Candidate comic dicts (empty if user_id is not given, as with get_all_comics).
+        """
+        bands = story_bands(original_story)
+        if not user_id or not bands:
+            return []
+        try:
+            cursor = cls.get_cursor()
+            placeholders = ','.join('(?, ?)' for _ in bands)
+            # CROSS JOIN keeps the buckets as the outer loop in SQLite so each is a primary key probe
+            cursor.execute(f'''
+                SELECT c.*, u.username
+                FROM (
+                    SELECT sb.comic_id, COUNT(*) AS shared_bands
+                    FROM (VALUES {placeholders}) q
+                    CROSS JOIN comic_story_bands sb
+                    WHERE sb.band = q.column1 AND sb.bucket = q.column2
+                    GROUP BY sb.comic_id
+                ) b
+                JOIN comics c ON c.id = b.comic_id
+                LEFT JOIN users u ON c.user_id = u.id
+                WHERE c.user_id = ?
+                ORDER BY b.shared_bands DESC, c.date DESC, c.created_at DESC
+            ''', [value for band in bands for value in band] + [user_id])
+            return cls._expand_comics([dict(row) for row in cursor.fetchall()])
+        except Exception as e:
+            app_logger.error(f"Error getting similar story candidates from database: {e}")
+            return []
 
     @classmethod
     def get_comic_by_story(cls, original_story):
         try:
             cursor = cls.get_cursor()
-            cursor.execute('SELECT * FROM comics WHERE original_story = ?', (original_story,))
+            cursor.execute('SELECT * FROM comics WHERE story_hash = ? LIMIT 1', (story_hash(original_story),))
             result = cursor.fetchone()
-            return dict(result) if result else None
+            return cls._expand_comics([dict(result)])[0] if result else None
         except Exception as e:
             app_logger.error(f"Error getting comic from database: {e}")
             return None
@@ -126,9 +532,15 @@ class ComicDatabase:
     def get_comic_by_title_or_story(cls, title, story):
         try:
             cursor = cls.get_cursor()
-            cursor.execute('SELECT * FROM comics WHERE title = ? OR original_story = ?', (title, story))
+            # Two index probes instead of an OR, which SQLite would answer with a table scan
+            cursor.execute('''
+                SELECT * FROM comics WHERE story_hash = ?
+                UNION ALL
+                SELECT * FROM comics WHERE title = ?
+                LIMIT 1
+            ''', (story_hash(story), title))
             result = cursor.fetchone()
-            return dict(result) if result else None
+            return cls._expand_comics([dict(result)])[0] if result else None
         except Exception as e:
             app_logger.error(f"Error getting comic by title or story from database: {e}")
             return None
@@ -154,88 +566,332 @@ class ComicDatabase:
                 ''', (user_id,))
             else:
                 return []
-            return [dict(row) for row in cursor.fetchall()]
+            return cls._expand_comics([dict(row) for row in cursor.fetchall()])
         except Exception as e:
             app_logger.error(f"Error getting all comics from database: {e}")
             return []
 
     @classmethod
-    def get_filtered_comics(cls, user_id=None, is_admin=False, start_date=None, end_date=None, location=None):
+    def build_search_query(cls, search):
+        """
+        Turn free text from the search box into the backend's full-text query.
+
+        All words must match and the last word matches as a prefix so results appear
+        while a word is still being typed.
+
+        Args:
+            search (str): The search text.
+
+        Returns:
+            str: The query, or None if the text contains no words.
+        """
+        return cls.get_backend().build_search_query(search)
+
+    @staticmethod
+    def _comic_filters(user_id, is_admin, start_date, end_date, location, alias='c'):
+        """Build the WHERE conditions shared by the comic listing queries."""
+        query = ''
+        params = []
+        if not is_admin and user_id:
+            query += f' AND {alias}.user_id = ?'
+            params.append(user_id)
+        if start_date:
+            query += f' AND {alias}.date >= ?'
+            params.append(start_date)
+        if end_date:
+            query += f' AND {alias}.date <= ?'
+            params.append(end_date)
+        if location:
+            query += f' AND {alias}.location = ?'
+            params.append(location)
+        return query, params
+
+    @classmethod
+    def _newest_of_duplicates_filter(cls, user_id, is_admin, start_date, end_date, location):
+        """
+        Build a WHERE condition keeping only the newest listed comic of each story_hash
+        and of each title, so the gallery shows every story once across all its pages.
+
+        Each NOT EXISTS is an index lookup on idx_comics_story_hash_page or
+        idx_comics_title_page.
+        """
+        filters, params = cls._comic_filters(user_id, is_admin, start_date, end_date, location, alias='d')
+        newer = '(d.date, d.created_at, d.id) > (c.date, c.created_at, c.id)'
+        query = ''.join(
+            f' AND NOT EXISTS (SELECT 1 FROM comics d WHERE d.{column} = c.{column} AND {newer}{filters})'
+            for column in ('story_hash', 'title')
+        )
+        return query, params * 2
+
+    @classmethod
+    def get_filtered_comics(cls, user_id=None, is_admin=False, start_date=None, end_date=None, location=None, search=None):
         try:
-            cursor = cls.get_cursor()
+            cursor = cls.get_read_cursor()
+            filters, filter_params = cls._comic_filters(user_id, is_admin, start_date, end_date, location)
+            match = cls.build_search_query(search)
+            if match:
+                query = f'''
+                    WITH matches AS MATERIALIZED ({cls.get_backend().search_matches_sql})
+                    SELECT c.*, u.username
+                    FROM matches m
+                    JOIN comics c ON c.id = m.id
+                    LEFT JOIN users u ON c.user_id = u.id
+                    WHERE 1=1{filters}
+                    ORDER BY m.search_score, c.date DESC, c.created_at DESC
+                '''
+                params = [match] + filter_params
+            else:
+                query = f'''
+                    SELECT c.*, u.username
+                    FROM comics c
+                    LEFT JOIN users u ON c.user_id = u.id
+                    WHERE 1=1{filters}
+                    ORDER BY c.date DESC, c.created_at DESC
+                '''
+                params = filter_params
+            app_logger.debug(f"Executing query: {query} with params: {params}")
+            cursor.execute(query, params)
+            return cls._expand_comics([dict(row) for row in cursor.fetchall()])
+        except Exception as e:
+            app_logger.error(f"Error getting filtered comics from database: {e}")
+            return []
+
+    @staticmethod
+    def encode_page_cursor(comic):
+        """
+        Encode the sort key of the last comic on a page: (date, created_at, id) when
+        listing, or (search_score, id) for search results.
+        """
+        if 'search_score' in comic:
+            key = json.dumps([comic['search_score'], comic['id']])
+        else:
+            key = json.dumps([str(comic['date']), str(comic['created_at']), comic['id']])
+        return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_page_cursor(cursor_token, search=False):
+        """Decode a page cursor, returning None for a missing or malformed token."""
+        if not cursor_token:
+            return None
+        try:
+            key = json.loads(base64.urlsafe_b64decode(cursor_token.encode('ascii')))
+            if search:
+                score, comic_id = key
+                return float(score), int(comic_id)
+            date, created_at, comic_id = key
+            return date, created_at, int(comic_id)
+        except (ValueError, TypeError):
+            app_logger.warning(f"Ignoring invalid page cursor: {cursor_token}")
+            return None
+
+    @classmethod
+    def get_comic_page(cls, user_id=None, is_admin=False, start_date=None, end_date=None, location=None,
+                       after=None, page_size=None, search=None):
+        """
+        Get one page of the comic gallery using keyset pagination.
+
+        Pages are ordered by (date, created_at, id) descending and continue strictly after
+        the sort key encoded in `after`, so each page is an index range scan regardless of
+        how deep into the gallery it is. With a search, comics matching it in the
+        backend's full-text index are ordered by relevance instead and pages continue
+        after (search_score, id).
+        Comics sharing a story_hash or title with a newer listed comic are left out, so
+        pages are full and no story repeats across pages.
+        Rows use COMIC_LIST_COLUMNS.
+
+        Args:
+            user_id (int): The user whose comics to list (ignored for admins).
+            is_admin (bool): Whether to list comics of all users.
+            start_date (date): Optional earliest comic date.
+            end_date (date): Optional latest comic date.
+            location (str): Optional exact location filter.
+            after (str): Cursor returned for the previous page, or None for the first page.
+            page_size (int): Number of comics per page (defaults to config.GALLERY_PAGE_SIZE).
+            search (str): Optional full-text search over title, story, summary and script.
+
+        Returns:
+            tuple: (list of comic dicts, cursor for the next page or None on the last page).
+        """
+        page_size = page_size or config.GALLERY_PAGE_SIZE
+        try:
+            cursor = cls.get_read_cursor()
+            filters, params = cls._comic_filters(user_id, is_admin, start_date, end_date, location)
+            duplicates, duplicate_params = cls._newest_of_duplicates_filter(user_id, is_admin, start_date, end_date, location)
+            filters += duplicates
+            params.extend(duplicate_params)
+            match = cls.build_search_query(search)
+            if match:
+                # FTS5's bm25() is only allowed next to the MATCH, so score the matches once
+                # in a materialized CTE and page over (score, id) outside it
+                query = f'''
+                    WITH matches AS MATERIALIZED ({cls.get_backend().search_matches_sql})
+                    SELECT {COMIC_LIST_COLUMNS}, u.username, m.search_score
+                    FROM matches m
+                    JOIN comics c ON c.id = m.id
+                    LEFT JOIN users u ON c.user_id = u.id
+                    WHERE 1=1{filters}
+                '''
+                params.insert(0, match)
+                sort_key = cls.decode_page_cursor(after, search=True)
+                if sort_key:
+                    query += ' AND (m.search_score, c.id) > (?, ?)'
+                    params.extend(sort_key)
+                query += ' ORDER BY m.search_score, c.id LIMIT ?'
+            else:
+                query = f'''
+                    SELECT {COMIC_LIST_COLUMNS}, u.username
+                    FROM comics c
+                    LEFT JOIN users u ON c.user_id = u.id
+                    WHERE 1=1{filters}
+                '''
+                sort_key = cls.decode_page_cursor(after)
+                if sort_key:
+                    query += ' AND (c.date, c.created_at, c.id) < (?, ?, ?)'
+                    params.extend(sort_key)
+                query += ' ORDER BY c.date DESC, c.created_at DESC, c.id DESC LIMIT ?'
+            params.append(page_size + 1)
+            app_logger.debug(f"Executing query: {query} with params: {params}")
+            cursor.execute(query, params)
+            comics = cls._expand_comics([dict(row) for row in cursor.fetchall()])
+            next_cursor = None
+            if len(comics) > page_size:
+                comics = comics[:page_size]
+                next_cursor = cls.encode_page_cursor(comics[-1])
+            return comics, next_cursor
+        except Exception as e:
+            app_logger.error(f"Error getting comic page from database: {e}")
+            return [], None
+
+    @classmethod
+    def get_comic_detail(cls, comic_id, user_id=None, is_admin=False):
+        """
+        Get every column of a single comic, including the full story and script.
+
+        Args:
+            comic_id (int): The comic ID.
+            user_id (int): The requesting user; non-admins only see their own comics.
+            is_admin (bool): Whether the requesting user is an admin.
+
+        Returns:
+            dict: The comic with its owner's username, or None if not found or not visible.
+        """
+        try:
+            cursor = cls.get_read_cursor()
             query = '''
-                SELECT c.*, u.username 
-                FROM comics c 
-                LEFT JOIN users u ON c.user_id = u.id 
-                WHERE 1=1
+                SELECT c.*, u.username
+                FROM comics c
+                LEFT JOIN users u ON c.user_id = u.id
+                WHERE c.id = ?
             '''
-            params = []
-            if not is_admin and user_id:
+            params = [comic_id]
+            if not is_admin:
                 query += ' AND c.user_id = ?'
                 params.append(user_id)
-            if start_date:
-                query += ' AND c.date >= ?'
-                params.append(start_date)
-            if end_date:
-                query += ' AND c.date <= ?'
-                params.append(end_date)
-            if location:
-                query += ' AND c.location = ?'
-                params.append(location)
-            query += ' ORDER BY c.date DESC, c.created_at DESC'
-            app_logger.debug(f"Executing query: {query} with params: {params}")
             cursor.execute(query, params)
-            return [dict(row) for row in cursor.fetchall()]
+            result = cursor.fetchone()
+            return cls._expand_comics([dict(result)])[0] if result else None
         except Exception as e:
-            app_logger.error(f"Error getting filtered comics from database: {e}")
-            return []
+            app_logger.error(f"Error getting comic detail from database: {e}")
+            return None
 
     @classmethod
     def get_unique_locations(cls):
+        """Get every location with at least one comic, in alphabetical order."""
         try:
-            cursor = cls.get_cursor()
-            cursor.execute('SELECT DISTINCT location FROM comics ORDER BY location')
+            cursor = cls.get_read_cursor()
+            cursor.execute('SELECT location FROM comic_location_stats ORDER BY location')
             return [row['location'] for row in cursor.fetchall()]
         except Exception as e:
             app_logger.error(f"Error getting unique locations from database: {e}")
             return []
 
+    @classmethod
+    def get_location_stats(cls):
+        """
+        Get the number of comics at each location.
+
+        Returns:
+            list: Dicts of location and comic_count, most comics first.
+        """
+        try:
+            cursor = cls.get_read_cursor()
+            cursor.execute('SELECT location, comic_count FROM comic_location_stats ORDER BY comic_count DESC, location')
+            return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            app_logger.error(f"Error getting location stats from database: {e}")
+            return []
+
+    @classmethod
+    def get_date_stats(cls, start_date=None, end_date=None):
+        """
+        Get the number of comics on each date that has any, newest first.
+
+        Args:
+            start_date (date, optional): Earliest date to include.
+            end_date (date, optional): Latest date to include.
+
+        Returns:
+            list: Dicts of date (as YYYY-MM-DD) and comic_count.
+        """
+        try:
+            cursor = cls.get_read_cursor()
+            query = 'SELECT date, comic_count FROM comic_date_stats WHERE 1=1'
+            params = []
+            if start_date:
+                query += ' AND date >= ?'
+                params.append(start_date)
+            if end_date:
+                query += ' AND date <= ?'
+                params.append(end_date)
+            query += ' ORDER BY date DESC'
+            cursor.execute(query, params)
+            return [{'date': str(row['date']), 'comic_count': row['comic_count']} for row in cursor.fetchall()]
+        except Exception as e:
+            app_logger.error(f"Error getting date stats from database: {e}")
+            return []
+
     @classmethod
     def close(cls):
+        """Return this thread's connections to their pools."""
         if hasattr(cls._local, "connection"):
-            cls._local.connection.close()
+            cls.get_backend().release(cls._local.connection)
             del cls._local.connection
-        app_logger.info("Database connection closed")
+        if hasattr(cls._local, "read_connection"):
+            cls.get_backend().release(cls._local.read_connection, read_only=True)
+            del cls._local.read_connection
+        app_logger.debug("Database connections released to pool")
+
+    @classmethod
+    def close_pools(cls):
+        """Release this thread's connections and close every idle pooled connection."""
+        cls.close()
+        cls.get_backend().close_all()
+        app_logger.info("Database connection pools closed")
 
     @classmethod
     def purge_database(cls):
         try:
             cursor = cls.get_cursor()
+            cursor.execute('DELETE FROM comic_assets')
+            cursor.execute('DELETE FROM comic_story_bands')
+            cursor.execute('DELETE FROM comic_text_archive')
+            cursor.execute('DELETE FROM output_manifest')
+            cls.get_backend().clear_search_index(cursor)
             cursor.execute('DELETE FROM comics')
-            cls.get_connection().commit()
+            cls.commit()
             app_logger.info("Database purged successfully")
         except Exception as e:
+            if cls.in_transaction():
+                raise
             app_logger.error(f"Error purging database: {e}")
 
     @classmethod
-    def add_user_id_column(cls):
-        cursor = cls.get_cursor()
-        try:
-            cursor.execute('ALTER TABLE comics ADD COLUMN user_id INTEGER REFERENCES users(id)')
-            cls.get_connection().commit()
-            app_logger.debug("Added user_id column to comics table")
-        except sqlite3.OperationalError as e:
-            if "duplicate column name" in str(e):
-                app_logger.debug("user_id column already exists in comics table")
-            else:
-                raise e
+    def migrate(cls):
+        return cls.get_backend().migrate(cls.get_connection())
 
     @classmethod
     def initialize_database(cls):
-        cls.create_table()
-        cls.add_user_id_column()
-        cls.add_email_column()
-        cls.populate_from_output_folder()
+        cls.migrate()
         cls.initialize_loyalty_point_costs()
 
     @classmethod
@@ -248,9 +904,11 @@ class ComicDatabase:
                 INSERT INTO users (username, email, password_hash, role, loyalty_points, created_at)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (username, email, password_hash, role, 10, current_time))
-            cls.get_connection().commit()
+            cls.commit()
             app_logger.debug(f"Added user to database: {username}, password_hash: {password_hash}")
         except Exception as e:
+            if cls.in_transaction():
+                raise
             app_logger.error(f"Error adding user to database: {e}")
 
     @classmethod
@@ -267,8 +925,10 @@ class ComicDatabase:
             return None
 
     @classmethod
-    def check_password(cls, username, password):
-        user = cls.get_user_by_username(username)
+    def check_password(cls, username, password, user=None):
+        """Check a user's password; pass the already loaded user row to skip the lookup."""
+        if user is None:
+            user = cls.get_user_by_username(username)
         if user:
             stored_hash = user['password_hash']
             app_logger.debug(f"Stored password hash for {username}: {stored_hash}")
@@ -303,65 +963,318 @@ class ComicDatabase:
             return []
 
     @classmethod
-    def add_email_column(cls):
-        cursor = cls.get_cursor()
+    def get_output_manifest(cls):
+        """Get the output folder manifest as a dict keyed by path relative to OUTPUT_DIR."""
         try:
-            cursor.execute("PRAGMA table_info(users)")
-            columns = [column[1] for column in cursor.fetchall()]
-            if 'email' not in columns:
-                app_logger.debug("Adding email column to users table")
-                cursor.execute('ALTER TABLE users ADD COLUMN email TEXT')
-                cls.get_connection().commit()
-            else:
-                app_logger.debug("Email column already exists in users table")
-        except Exception as e:
-            app_logger.error(f"Error adding email column: {e}")
-
-    @classmethod
-    def populate_from_output_folder(cls):
-        output_dir = config.OUTPUT_DIR
-        for location_folder in os.listdir(output_dir):
-            location_path = os.path.join(output_dir, location_folder)
-            if os.path.isdir(location_path):
-                location = location_folder.replace('_', ' ')
-                for date_folder in os.listdir(location_path):
-                    date_path = os.path.join(location_path, date_folder)
-                    if os.path.isdir(date_path):
-                        date = datetime.strptime(date_folder, "%Y_%m_%d").date()
-                        for file in os.listdir(date_path):
-                            if file.endswith('.png'):
-                                image_path = os.path.join(date_path, file)
-                                title = file.replace('ggs_grizzly_news_', '').replace('.png', '').replace('_', ' ')
-                                summary_file = file.replace('.png', '_summary.txt')
-                                summary_path = os.path.join(date_path, summary_file)
-                                if os.path.exists(summary_path):
-                                    with open(summary_path, 'r') as f:
-                                        original_story = f.read()
-                                else:
-                                    original_story = "Summary not available"
-                                
-                                audio_file = file.replace('.png', '.mp3')
-                                audio_path = os.path.join(date_path, audio_file)
-                                if not os.path.exists(audio_path):
-                                    audio_path = None
-                                
-                                cls.add_comic(None, title, location, original_story, "Comic script not available", "Comic summary not available", "", image_path, audio_path, date)
-        app_logger.info("Database populated from output folder")
-
-    @classmethod
-    def update_user_loyalty_points(cls, user_id, points):
+            cursor = cls.get_cursor()
+            cursor.execute('SELECT path, mtime, size, summary_mtime, comic_id, owned FROM output_manifest')
+            return {row['path']: dict(row) for row in cursor.fetchall()}
+        except Exception as e:
+            app_logger.error(f"Error getting output manifest from database: {e}")
+            return {}
+
+    @classmethod
+    def find_comic_id_by_image_path(cls, image_path, relative_image_path):
+        """
+        Find a comic that already references an image, either by the absolute path the
+        old output folder scan stored or by the relative path inside a comma-joined
+        image_path list written by the generators.
+        """
+        try:
+            cursor = cls.get_cursor()
+            position = cls.get_backend().substring_position("',' || image_path || ','", "',' || ? || ','")
+            cursor.execute(f'''
+                SELECT id FROM comics
+                WHERE image_path = ? OR {position} > 0
+                ORDER BY id
+                LIMIT 1
+            ''', (image_path, relative_image_path))
+            result = cursor.fetchone()
+            return result['id'] if result else None
+        except Exception as e:
+            app_logger.error(f"Error finding comic by image path: {e}")
+            return None
+
+    @classmethod
+    def upsert_output_manifest_entry(cls, path, mtime, size, summary_mtime, comic_id, owned):
         try:
             cursor = cls.get_cursor()
             cursor.execute('''
-                UPDATE users
-                SET loyalty_points = loyalty_points + ?
-                WHERE id = ?
-            ''', (points, user_id))
-            cls.get_connection().commit()
+                INSERT INTO output_manifest (path, mtime, size, summary_mtime, comic_id, owned, indexed_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(path) DO UPDATE SET
+                    mtime = excluded.mtime,
+                    size = excluded.size,
+                    summary_mtime = excluded.summary_mtime,
+                    comic_id = excluded.comic_id,
+                    owned = excluded.owned,
+                    indexed_at = excluded.indexed_at
+            ''', (path, mtime, size, summary_mtime, comic_id, int(owned)))
+            cls.commit()
+        except Exception as e:
+            if cls.in_transaction():
+                raise
+            app_logger.error(f"Error updating output manifest entry {path}: {e}")
+
+    @classmethod
+    def delete_output_manifest_entries(cls, paths):
+        """Forget output folder files that no longer exist; their comics are kept."""
+        if not paths:
+            return
+        try:
+            cursor = cls.get_cursor()
+            cursor.executemany('DELETE FROM output_manifest WHERE path = ?', [(path,) for path in paths])
+            cls.commit()
+        except Exception as e:
+            if cls.in_transaction():
+                raise
+            app_logger.error(f"Error deleting output manifest entries: {e}")
+
+    @classmethod
+    def update_indexed_comic(cls, comic_id, original_story, audio_path):
+        """Refresh the story and audio of a comic created by the output folder indexer."""
+        try:
+            with cls.transaction():
+                cursor = cls.get_cursor()
+                cursor.execute('SELECT * FROM comics WHERE id = ?', (comic_id,))
+                comic = cls._expand_comics([dict(cursor.fetchone())])[0]
+                backend = cls.get_backend()
+                backend.unindex_search_text(cursor, comic_id, comic['title'], comic['original_story'], comic['comic_summary'], comic['comic_script'])
+                if comic.get('text_archived'):
+                    cursor.execute('UPDATE comic_text_archive SET original_story = ? WHERE comic_id = ?',
+                                   (cls.encode_comic_text(original_story), comic_id))
+                    stored_story = ''
+                else:
+                    stored_story = cls.encode_comic_text(original_story)
+                cursor.execute('''
+                    UPDATE comics
+                    SET original_story = ?, story_excerpt = ?, story_truncated = ?, story_hash = ?, audio_path = ?
+                    WHERE id = ?
+                ''', (stored_story, original_story[:STORY_EXCERPT_LENGTH], int(len(original_story) > STORY_EXCERPT_LENGTH),
+                      story_hash(original_story), audio_path, comic_id))
+                cls.add_comic_assets(comic_id, comic['image_path'], audio_path)
+                cls.index_comic_story(comic_id, original_story)
+                backend.index_search_text(cursor, comic_id, comic['title'], original_story, comic['comic_summary'], comic['comic_script'])
+        except Exception as e:
+            if cls.in_transaction():
+                raise
+            app_logger.error(f"Error updating indexed comic {comic_id}: {e}")
+
+    @classmethod
+    def get_comic_text_samples(cls, limit=500):
+        """
+        Get the story, script and summary of the newest comics, for training a
+        compression dictionary.
+
+        Returns:
+            list: Plain texts, up to three per comic.
+        """
+        try:
+            cursor = cls.get_read_cursor()
+            cursor.execute('''
+                SELECT original_story, comic_script, comic_summary
+                FROM comics
+                WHERE text_archived = 0
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (limit,))
+            comics = cls._expand_comics([dict(row) for row in cursor.fetchall()])
+            return [comic[column] for comic in comics for column in COMPRESSED_COMIC_COLUMNS if comic[column]]
+        except Exception as e:
+            app_logger.error(f"Error getting comic text samples from database: {e}")
+            return []
+
+    @classmethod
+    def compress_comic_text(cls, after_id=0, limit=500):
+        """
+        Compress one batch of comics with the current dictionary.
+
+        Rows stored as plain text or compressed with an older dictionary are rewritten;
+        the text itself, and so the full-text index, is unchanged.
+
+        Args:
+            after_id (int): Resume after this comic ID (0 to start from the beginning).
+            limit (int): Number of comics to examine.
+
+        Returns:
+            tuple: (last comic ID examined or None when there are no more, rows rewritten).
+        """
+        try:
+            with cls.transaction():
+                cursor = cls.get_cursor()
+                cursor.execute('''
+                    SELECT id, original_story, comic_script, comic_summary
+                    FROM comics
+                    WHERE id > ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (after_id, limit))
+                rows = [dict(row) for row in cursor.fetchall()]
+                updates = []
+                for row in rows:
+                    stored = [row[column] for column in COMPRESSED_COMIC_COLUMNS]
+                    encoded = [cls.encode_comic_text(cls.decode_comic_text(value)) for value in stored]
+                    if encoded != stored:
+                        updates.append(encoded + [row['id']])
+                cursor.executemany('''
+                    UPDATE comics SET original_story = ?, comic_script = ?, comic_summary = ? WHERE id = ?
+                ''', updates)
+            return (rows[-1]['id'] if rows else None), len(updates)
+        except Exception as e:
+            if cls.in_transaction():
+                raise
+            app_logger.error(f"Error compressing comic text after comic {after_id}: {e}")
+            return None, 0
+
+    @classmethod
+    def archive_comic_text(cls, before_date, limit=500):
+        """
+        Move the story and script of one batch of old comics into comic_text_archive.
+
+        The comics row keeps its title, summary, excerpt and metadata, so listings
+        and duplicate checks are unaffected and the comics table stays small. Readers
+        load the archived text through _expand_comics. SQLite search is unaffected
+        because comics_fts is written by this class rather than read from comics.
+
+        Does nothing on backends with native text compression: PostgreSQL search
+        builds its tsvector from the comics columns, so blanking them would hide the
+        comics from search, and TOAST already keeps large text out of the heap.
+
+        Args:
+            before_date (date): Archive comics dated before this day.
+            limit (int): Maximum number of comics to archive.
+
+        Returns:
+            int: The number of comics archived (0 when none are left, the backend
+            compresses text natively, or on error).
+        """
+        if cls.get_backend().native_text_compression:
+            app_logger.info("Storage backend compresses text natively; not archiving comic text")
+            return 0
+        try:
+            with cls.transaction():
+                cursor = cls.get_cursor()
+                cursor.execute('''
+                    SELECT id, original_story, comic_script
+                    FROM comics
+                    WHERE text_archived = 0 AND date < ?
+                    ORDER BY date
+                    LIMIT ?
+                ''', (before_date, limit))
+                rows = cursor.fetchall()
+                cursor.executemany('INSERT INTO comic_text_archive (comic_id, original_story, comic_script) VALUES (?, ?, ?)', [
+                    (row['id'],
+                     cls.encode_comic_text(cls.decode_comic_text(row['original_story'])),
+                     cls.encode_comic_text(cls.decode_comic_text(row['comic_script'])))
+                    for row in rows
+                ])
+                cursor.executemany("UPDATE comics SET original_story = '', comic_script = '', text_archived = 1 WHERE id = ?",
+                                   [(row['id'],) for row in rows])
+            return len(rows)
+        except Exception as e:
+            if cls.in_transaction():
+                raise
+            app_logger.error(f"Error archiving comic text: {e}")
+            return 0
+
+    @classmethod
+    def _record_loyalty_change(cls, cursor, user_id, action, points, balance_after):
+        cursor.execute('''
+            INSERT INTO loyalty_ledger (user_id, action, points, balance_after)
+            VALUES (?, ?, ?, ?)
+        ''', (user_id, action, points, balance_after))
+
+    @classmethod
+    def update_user_loyalty_points(cls, user_id, points, action='adjustment'):
+        """
+        Add (or with a negative value, remove) loyalty points and record the change in the ledger.
+
+        Args:
+            user_id (int): The user ID.
+            points (int): The signed number of points.
+            action (str): What the points were awarded or removed for, kept in loyalty_ledger.
+        """
+        try:
+            with cls.transaction():
+                cursor = cls.get_cursor()
+                cursor.execute('''
+                    UPDATE users
+                    SET loyalty_points = loyalty_points + ?
+                    WHERE id = ?
+                    RETURNING loyalty_points
+                ''', (points, user_id))
+                result = cursor.fetchone()
+                if result:
+                    cls._record_loyalty_change(cursor, user_id, action, points, result['loyalty_points'])
+            cls.on_commit(lambda: cls.invalidate_user(user_id))
             app_logger.debug(f"Updated loyalty points for user_id {user_id}: {points} points")
         except Exception as e:
+            if cls.in_transaction():
+                raise
             app_logger.error(f"Error updating user loyalty points: {e}")
 
+    @classmethod
+    def spend_loyalty_points(cls, user_id, action):
+        """
+        Charge a user the loyalty point cost of an action if they can afford it.
+
+        The balance check and the debit are one conditional UPDATE, so concurrent
+        requests cannot both pass the check and overdraw the balance: SQLite serializes
+        the writes and the second UPDATE sees the first one's balance. Admins match the
+        UPDATE without being charged. The debit is recorded in loyalty_ledger in the
+        same transaction.
+
+        Args:
+            user_id (int): The user ID.
+            action (str): The action_name in loyalty_point_costs.
+
+        Returns:
+            bool: True if the action is allowed (and was paid for), False otherwise.
+        """
+        try:
+            with cls.transaction():
+                cursor = cls.get_cursor()
+                cursor.execute('''
+                    WITH cost AS (SELECT point_cost FROM loyalty_point_costs WHERE action_name = ?)
+                    UPDATE users
+                    SET loyalty_points = loyalty_points - CASE WHEN role = 'admin' THEN 0 ELSE (SELECT point_cost FROM cost) END
+                    WHERE id = ? AND (role = 'admin' OR loyalty_points >= (SELECT point_cost FROM cost))
+                    RETURNING role, loyalty_points, (SELECT point_cost FROM cost) AS point_cost
+                ''', (action, user_id))
+                result = cursor.fetchone()
+                if not result:
+                    app_logger.debug(f"User {user_id} cannot afford action {action}")
+                    return False
+                if result['role'] == 'admin':
+                    app_logger.debug(f"Admin user {user_id} bypassing loyalty point check")
+                    return True
+                cls._record_loyalty_change(cursor, user_id, action, -result['point_cost'], result['loyalty_points'])
+            cls.on_commit(lambda: cls.invalidate_user(user_id))
+            app_logger.debug(f"User {user_id} spent {result['point_cost']} loyalty points on {action}")
+            return True
+        except Exception as e:
+            if cls.in_transaction():
+                raise
+            app_logger.error(f"Error spending loyalty points: {e}")
+            return False
+
+    @classmethod
+    def get_loyalty_ledger(cls, user_id, limit=50):
+        """Get a user's most recent loyalty point changes, newest first."""
+        try:
+            cursor = cls.get_read_cursor()
+            cursor.execute('''
+                SELECT id, action, points, balance_after, created_at
+                FROM loyalty_ledger
+                WHERE user_id = ?
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (user_id, limit))
+            return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            app_logger.error(f"Error getting loyalty ledger from database: {e}")
+            return []
+
     @classmethod
     def update_user_last_login(cls, user_id):
         try:
@@ -372,9 +1285,12 @@ class ComicDatabase:
                 SET last_login = ?
                 WHERE id = ?
             ''', (current_time, user_id))
-            cls.get_connection().commit()
+            cls.commit()
+            cls.on_commit(lambda: cls.invalidate_user(user_id))
             app_logger.debug(f"Updated last login for user_id {user_id}: {current_time}")
         except Exception as e:
+            if cls.in_transaction():
+                raise
             app_logger.error(f"Error updating user last login: {e}")
 
     @classmethod
@@ -387,21 +1303,77 @@ class ComicDatabase:
                 SET last_purchase_date = ?
                 WHERE id = ?
             ''', (current_date, user_id))
-            cls.get_connection().commit()
+            cls.commit()
+            cls.on_commit(lambda: cls.invalidate_user(user_id))
             app_logger.debug(f"Updated last purchase date for user_id {user_id}: {current_date}")
         except Exception as e:
+            if cls.in_transaction():
+                raise
             app_logger.error(f"Error updating user last purchase date: {e}")
 
     @classmethod
-    def get_loyalty_point_cost(cls, action_name):
+    def get_loyalty_point_costs(cls):
+        """
+        Get the whole loyalty price table from an in-process cache.
+
+        The table is loaded with one SELECT and kept until the 'loyalty_point_costs'
+        counter in cache_versions changes; triggers bump it on every write to
+        loyalty_point_costs, so price changes made by any worker are picked up on the
+        next call at the cost of one primary key read.
+
+        Returns:
+            dict: Mapping of action name to point cost.
+        """
+        try:
+            cursor = cls.get_read_cursor()
+            cursor.execute("SELECT version FROM cache_versions WHERE name = 'loyalty_point_costs'")
+            row = cursor.fetchone()
+            if row is None:
+                # Without the counter, price changes would go unnoticed: recreate it and
+                # serve this call straight from the table
+                app_logger.warning("Loyalty price cache version missing; re-seeding cache_versions")
+                cls._seed_loyalty_price_version()
+                version = None
+            else:
+                version = row['version']
+                with cls._price_cache_lock:
+                    if cls._price_cache is not None and cls._price_cache_version == version:
+                        return dict(cls._price_cache)
+            cursor.execute('SELECT action_name, point_cost FROM loyalty_point_costs')
+            prices = {row['action_name']: row['point_cost'] for row in cursor.fetchall()}
+            with cls._price_cache_lock:
+                cls._price_cache = prices if version is not None else None
+                cls._price_cache_version = version
+            app_logger.debug(f"Loaded loyalty price table (version {version})")
+            return dict(prices)
+        except Exception as e:
+            app_logger.error(f"Error getting loyalty point costs: {e}")
+            return {}
+
+    @classmethod
+    def _seed_loyalty_price_version(cls):
         try:
             cursor = cls.get_cursor()
-            cursor.execute('SELECT point_cost FROM loyalty_point_costs WHERE action_name = ?', (action_name,))
-            result = cursor.fetchone()
-            return result['point_cost'] if result else None
+            cursor.execute('''
+                INSERT INTO cache_versions (name, version) VALUES ('loyalty_point_costs', 0)
+                ON CONFLICT (name) DO NOTHING
+            ''')
+            cls.commit()
         except Exception as e:
-            app_logger.error(f"Error getting loyalty point cost: {e}")
-            return None
+            if cls.in_transaction():
+                raise
+            app_logger.error(f"Error re-seeding the loyalty price cache version: {e}")
+
+    @classmethod
+    def invalidate_loyalty_point_costs(cls):
+        """Drop this process's cached price table; other processes notice the version change."""
+        with cls._price_cache_lock:
+            cls._price_cache = None
+            cls._price_cache_version = None
+
+    @classmethod
+    def get_loyalty_point_cost(cls, action_name):
+        return cls.get_loyalty_point_costs().get(action_name)
 
     @classmethod
     def update_loyalty_point_cost(cls, action_name, point_cost):
@@ -409,14 +1381,45 @@ class ComicDatabase:
             cursor = cls.get_cursor()
             current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             cursor.execute('''
-                INSERT OR REPLACE INTO loyalty_point_costs (action_name, point_cost, updated_at)
+                INSERT INTO loyalty_point_costs (action_name, point_cost, updated_at)
                 VALUES (?, ?, ?)
+                ON CONFLICT (action_name) DO UPDATE SET
+                    point_cost = excluded.point_cost,
+                    updated_at = excluded.updated_at
             ''', (action_name, point_cost, current_time))
-            cls.get_connection().commit()
+            cls.commit()
+            cls.invalidate_loyalty_point_costs()
             app_logger.debug(f"Updated loyalty point cost for {action_name}: {point_cost}")
         except Exception as e:
+            if cls.in_transaction():
+                raise
             app_logger.error(f"Error updating loyalty point cost: {e}")
 
+    @classmethod
+    def update_loyalty_point_costs(cls, point_costs):
+        """
+        Set several loyalty point costs with a single executemany and one commit.
+
+        Args:
+            point_costs (dict): Mapping of action name to point cost.
+        """
+        try:
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            with cls.transaction():
+                cls.get_cursor().executemany('''
+                    INSERT INTO loyalty_point_costs (action_name, point_cost, updated_at)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (action_name) DO UPDATE SET
+                        point_cost = excluded.point_cost,
+                        updated_at = excluded.updated_at
+                ''', [(action_name, point_cost, current_time) for action_name, point_cost in point_costs.items()])
+            cls.invalidate_loyalty_point_costs()
+            app_logger.debug(f"Updated loyalty point costs: {point_costs}")
+        except Exception as e:
+            if cls.in_transaction():
+                raise
+            app_logger.error(f"Error updating loyalty point costs: {e}")
+
     @classmethod
     def initialize_loyalty_point_costs(cls):
         default_costs = {
@@ -431,27 +1434,111 @@ class ComicDatabase:
             'daily_news_comic': 2,
             'media_comic': 2
         }
-        for action, cost in default_costs.items():
-            cls.update_loyalty_point_cost(action, cost)
-
-# Initialize the database
-app_logger.info("Initializing database")
-ComicDatabase.initialize_database()
-
-# Add or update admin user
-admin_user = ComicDatabase.get_user_by_username('admin')
-if not admin_user:
-    app_logger.info("Adding default admin user")
-    ComicDatabase.add_user('admin', 'admin@example.com', config.ADMIN_PASSWORD, 'admin')
-    app_logger.info(f"Added default admin user with password: {config.ADMIN_PASSWORD[:2]}...")
-else:
-    app_logger.info("Updating admin user password")
-    ComicDatabase.update_user_password('admin', config.ADMIN_PASSWORD)
-    app_logger.info(f"Updated admin user password to: {config.ADMIN_PASSWORD[:2]}...")
-
-# Debug: Check all users in the database
-all_users = ComicDatabase.get_all_users()
-app_logger.debug(f"All users in database: {all_users}")
-
-# Remove the code that distributes 10 loyalty points to all existing users
+        try:
+            # Only add missing actions; prices changed by an admin are kept
+            with cls.transaction():
+                cls.get_cursor().executemany('''
+                    INSERT INTO loyalty_point_costs (action_name, point_cost)
+                    VALUES (?, ?)
+                    ON CONFLICT (action_name) DO NOTHING
+                ''', list(default_costs.items()))
+            cls.invalidate_loyalty_point_costs()
+        except Exception as e:
+            if cls.in_transaction():
+                raise
+            app_logger.error(f"Error initializing loyalty point costs: {e}")
+
+    @classmethod
+    def get_setting(cls, name):
+        """Get a value from app_settings, or None if it is not set."""
+        try:
+            cursor = cls.get_cursor()
+            cursor.execute('SELECT value FROM app_settings WHERE name = ?', (name,))
+            row = cursor.fetchone()
+            return row['value'] if row else None
+        except Exception as e:
+            app_logger.error(f"Error getting setting {name} from database: {e}")
+            return None
+
+    @classmethod
+    def set_setting(cls, name, value):
+        """Store a value in app_settings, replacing any previous one."""
+        try:
+            cursor = cls.get_cursor()
+            cursor.execute('''
+                INSERT INTO app_settings (name, value, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            ''', (name, value))
+            cls.commit()
+        except Exception as e:
+            if cls.in_transaction():
+                raise
+            app_logger.error(f"Error storing setting {name} in database: {e}")
+
+    @staticmethod
+    def _password_fingerprint(password):
+        # Keyed with SECRET_KEY so the stored fingerprint cannot be brute-forced from a
+        # copy of the database alone
+        return hmac.new((config.SECRET_KEY or '').encode('utf-8'), password.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    @classmethod
+    def sync_admin_user(cls, password):
+        """
+        Create the admin user, or reset its password, when the configured one changed.
+
+        An HMAC fingerprint of the password applied last is kept in app_settings, so the
+        deliberately slow password hash is only computed when ADMIN_PASSWORD (or
+        SECRET_KEY) changes or the admin user is missing, not on every start. A password
+        the admin set in the app is kept until the configured one changes.
+
+        Args:
+            password (str): The configured admin password.
+
+        Returns:
+            bool: Whether the admin user was created or its password reset.
+        """
+        if not password:
+            app_logger.warning("ADMIN_PASSWORD is not set; skipping admin user sync")
+            return False
+        fingerprint = cls._password_fingerprint(password)
+        admin_user = cls.get_user_by_username('admin')
+        if admin_user and hmac.compare_digest(cls.get_setting('admin_password_fingerprint') or '', fingerprint):
+            app_logger.debug("Admin password unchanged; skipping admin user sync")
+            return False
+        if admin_user:
+            cls.update_user_password('admin', password)
+            app_logger.info("Updated admin user password from configuration")
+        else:
+            cls.add_user('admin', 'admin@example.com', password, 'admin')
+            app_logger.info("Added default admin user")
+        cls.set_setting('admin_password_fingerprint', fingerprint)
+        return True
+
+    @classmethod
+    def bootstrap(cls):
+        """
+        Prepare the database for the application, once per process.
+
+        Applies migrations, adds missing loyalty point costs and syncs the admin user.
+        Importing this module has no side effects; the web app and the CLI call this
+        at startup, and other tools call initialize_database() if they need the schema.
+        """
+        with cls._bootstrap_lock:
+            if cls._bootstrapped:
+                return
+            app_logger.info("Initializing database")
+            with startup_profiler.step('database: open connection'):
+                cls.get_connection()
+            with startup_profiler.step('database: migrations'):
+                cls.migrate()
+            with startup_profiler.step('database: loyalty point costs'):
+                cls.initialize_loyalty_point_costs()
+            with startup_profiler.step('database: admin user sync'):
+                cls.sync_admin_user(config.ADMIN_PASSWORD)
+            cls._bootstrapped = True
 
+if __name__ == '__main__':
+    # python src/database.py: create or upgrade the schema and sync the admin user
+    ComicDatabase.bootstrap()
+    ComicDatabase.close_pools()
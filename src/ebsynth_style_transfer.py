@@ -16,12 +16,12 @@ Note: This implementation requires the ezsynth library, which is a wrapper for E
 import os
 import time
 from ezsynth import ImageSynth, load_guide
-from config import Config
+from config import load_config
 from logger import app_logger
 from database import ComicDatabase
 
 # Load environment variables
-config = Config()
+config = load_config()
 
 def ebsynth_style_transfer(style_path, src_path, tgt_path, output_path, use_guide=False, guide_path=None):
     """
@@ -0,0 +1,229 @@
+import gc
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config import load_config
+from lazy_imports import lazy_import, is_loaded
+from logger import app_logger
+
+config = load_config()
+
+torch = lazy_import('torch')
+diffusers = lazy_import('diffusers')
+
+class _LoadedPipeline:
+    def __init__(self, pipe):
+        self.pipe = pipe
+        # Diffusers pipelines are not thread-safe; one generation at a time per pipeline
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+class _PendingLoad:
+    def __init__(self):
+        # Set once the load finished; error holds the exception if it failed
+        self.done = threading.Event()
+        self.error = None
+
+class FluxPipelineManager:
+    """
+    Keeps FLUX pipelines loaded between image requests.
+
+    Loading FLUX.1 takes tens of seconds and several GB, so each variant is loaded
+    once and reused. At most FLUX_PIPELINE_CACHE_SIZE variants stay resident, the
+    least recently used is unloaded to make room, and a background thread unloads
+    any pipeline idle for FLUX_PIPELINE_IDLE_SECONDS. A load does not block requests
+    for variants that are already loaded, and concurrent requests for a variant that
+    is loading wait for that one load.
+
+    Example:
+        with flux_pipelines.pipeline('realism') as pipe:
+            image = pipe(prompt, num_inference_steps=4).images[0]
+    """
+
+    def __init__(self, max_pipelines=None, idle_seconds=None):
+        self._max_pipelines = max_pipelines
+        self._idle_seconds = idle_seconds
+        self._pipelines = OrderedDict()
+        # Variants being loaded, so concurrent requests for one variant share a single load
+        self._loading = {}
+        # Guards the maps only; pipelines are loaded without it so other variants stay usable
+        self._lock = threading.Lock()
+        self._evictor = None
+        self._stop = threading.Event()
+
+    @property
+    def max_pipelines(self):
+        return max(1, self._max_pipelines or config.FLUX_PIPELINE_CACHE_SIZE)
+
+    @property
+    def idle_seconds(self):
+        return config.FLUX_PIPELINE_IDLE_SECONDS if self._idle_seconds is None else self._idle_seconds
+
+    @staticmethod
+    def variants():
+        """
+        The FLUX variants that can be loaded.
+
+        Returns:
+            dict: Variant name -> (model location, LoRA weights or None). 'realism' is only
+            available when FLUX1_REALISM_LORA is set.
+        """
+        variants = {'schnell': (config.FLUX1_MODEL_LOCATION, None)}
+        if config.FLUX1_REALISM_LORA:
+            variants['realism'] = (config.FLUX1_MODEL_LOCATION, config.FLUX1_REALISM_LORA)
+        return variants
+
+    @classmethod
+    def model_key(cls, variant):
+        """Identify the weights a variant loads, for caches of its outputs."""
+        model_id, lora = cls.variants()[variant]
+        return f"{model_id}|{lora or ''}"
+
+    def _load(self, variant, model_id, lora):
+        app_logger.info(f"Loading FLUX pipeline '{variant}' from {model_id}")
+        started = time.perf_counter()
+        pipe = diffusers.FluxPipeline.from_pretrained(model_id, torch_dtype=torch.bfloat16)
+        if lora:
+            pipe.load_lora_weights(lora)
+        pipe.enable_sequential_cpu_offload() # offload the model to CPU in a sequential manner. This is useful for large batch sizes
+        app_logger.info(f"Loaded FLUX pipeline '{variant}' in {time.perf_counter() - started:.1f}s")
+        return pipe
+
+    def _evict_lru(self):
+        # Called with self._lock held to make room for one more load; pipelines in use
+        # are skipped and may leave the cache over its size until they are released.
+        # The caller frees the memory once the lock is released.
+        evicted = []
+        for variant in list(self._pipelines):
+            if len(self._pipelines) + len(self._loading) < self.max_pipelines:
+                break
+            if self._pipelines[variant].in_use == 0:
+                app_logger.info(f"Unloading least recently used FLUX pipeline '{variant}'")
+                del self._pipelines[variant]
+                evicted.append(variant)
+        return evicted
+
+    @staticmethod
+    def _free_memory():
+        gc.collect()
+        if is_loaded(torch) and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    @contextmanager
+    def pipeline(self, variant='schnell'):
+        """
+        Borrow a loaded FLUX pipeline, loading it first if needed.
+
+        Args:
+            variant (str): A name from variants().
+
+        Yields:
+            FluxPipeline: The pipeline, exclusive to the caller until the block exits.
+        """
+        entry = self._acquire(variant)
+        try:
+            with entry.lock:
+                yield entry.pipe
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+
+    def _acquire(self, variant):
+        # Returns the variant's entry with in_use incremented, loading it first if needed
+        while True:
+            with self._lock:
+                entry = self._pipelines.get(variant)
+                if entry is not None:
+                    self._pipelines.move_to_end(variant)
+                    entry.in_use += 1
+                    return entry
+                pending = self._loading.get(variant)
+                if pending is None:
+                    variants = self.variants()
+                    if variant not in variants:
+                        raise ValueError(f"Unknown FLUX variant '{variant}'; available: {', '.join(variants)}")
+                    evicted = self._evict_lru()
+                    pending = self._loading[variant] = _PendingLoad()
+                    break
+            # Another request is loading this variant; wait for it and use its pipeline
+            pending.done.wait()
+            if pending.error is not None:
+                raise RuntimeError(f"Loading FLUX pipeline '{variant}' failed: {pending.error}") from pending.error
+
+        if evicted:
+            self._free_memory()
+        try:
+            pipe = self._load(variant, *variants[variant])
+        except BaseException as e:
+            with self._lock:
+                del self._loading[variant]
+            pending.error = e
+            pending.done.set()
+            raise
+        with self._lock:
+            del self._loading[variant]
+            entry = self._pipelines[variant] = _LoadedPipeline(pipe)
+            entry.in_use += 1
+            self._start_evictor()
+        pending.done.set()
+        return entry
+
+    def loaded_variants(self):
+        """Names of the resident pipelines, least recently used first."""
+        with self._lock:
+            return list(self._pipelines)
+
+    def evict_idle(self):
+        """
+        Unload pipelines unused for longer than idle_seconds.
+
+        Returns:
+            list: Names of the variants unloaded.
+        """
+        if self.idle_seconds <= 0:
+            return []
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [variant for variant, entry in self._pipelines.items()
+                    if entry.in_use == 0 and entry.last_used < cutoff]
+            for variant in idle:
+                del self._pipelines[variant]
+        if idle:
+            app_logger.info(f"Unloaded idle FLUX pipelines: {', '.join(idle)}")
+            self._free_memory()
+        return idle
+
+    def unload_all(self):
+        """Unload every pipeline that is not in use and stop the idle evictor."""
+        self._stop.set()
+        with self._lock:
+            for variant in [variant for variant, entry in self._pipelines.items() if entry.in_use == 0]:
+                del self._pipelines[variant]
+        self._free_memory()
+
+    def _start_evictor(self):
+        # Called with self._lock held
+        if self.idle_seconds <= 0 or (self._evictor is not None and self._evictor.is_alive()):
+            return
+        self._stop.clear()
+        self._evictor = threading.Thread(target=self._evict_idle_loop, name='flux-pipeline-evictor', daemon=True)
+        self._evictor.start()
+
+    def _evict_idle_loop(self):
+        while not self._stop.wait(max(1.0, min(self.idle_seconds / 4, 60.0))):
+            try:
+                self.evict_idle()
+            except Exception as e:
+                app_logger.error(f"Error unloading idle FLUX pipelines: {e}")
+            with self._lock:
+                if not self._pipelines:
+                    # Nothing left to watch; the next load starts a new evictor
+                    self._evictor = None
+                    return
+
+# Shared by every image request in this process
+flux_pipelines = FluxPipelineManager()
@@ -4,18 +4,28 @@ warnings.filterwarnings("ignore", message="You set `add_prefix_space`. The token
 import requests
 import re
 import time
-from langchain_community.utilities.dalle_image_generator import DallEAPIWrapper 
-
-import matplotlib.pyplot as plt
-import torch
-from diffusers import FluxPipeline
+import weakref
 
 from logger import app_logger
 from config import load_config
+from lazy_imports import lazy_import, is_loaded
+from flux_pipelines import flux_pipelines
+from prompt_embeddings import prompt_embedding_cache
 from utils import filter_content
 
 config = load_config()
 
+# Largest FLUX batch that fit in memory, per loaded pipeline. A pipeline reloaded by
+# flux_pipelines (after eviction, into freed memory) starts again from FLUX_BATCH_SIZE.
+_flux_batch_limits = weakref.WeakKeyDictionary()
+
+# Error messages PyTorch uses when a CUDA or CPU allocation fails
+OUT_OF_MEMORY_MESSAGES = ('out of memory', "can't allocate memory")
+
+# Loaded on first use so importing this module does not pull in torch
+torch = lazy_import('torch')
+dalle_image_generator = lazy_import('langchain_community.utilities.dalle_image_generator')
+
 def parse_comic_script(comic_script):
     panels = re.findall(r'Panel \d+:(.*?)(?=Panel \d+:|$)', comic_script, re.DOTALL)
     parsed_panels = []
@@ -69,38 +79,87 @@ def generate_safe_prompt(panel, retry_count, original_story=None, comic_artist_s
     
     return filter_content(prompt, strict=(retry_count > 0))
 
-def generate_flux1_images(comic_script, original_story, comic_artist_style=None):
-    app_logger.debug(f"Generating images with FLUX.1-schnell...")
+def _is_out_of_memory(error):
+    return isinstance(error, MemoryError) or any(message in str(error).lower() for message in OUT_OF_MEMORY_MESSAGES)
+
+# T5 tokens encoded per prompt; part of the prompt embedding cache key
+FLUX_MAX_SEQUENCE_LENGTH = 256
+
+def _run_flux_batch(pipe, prompts, model_key):
+    # Repeated and retried prompts skip the T5 and CLIP encoders
+    prompt_embeds, pooled_prompt_embeds = prompt_embedding_cache.encode(pipe, prompts, model_key, FLUX_MAX_SEQUENCE_LENGTH)
+    return pipe(
+        prompt_embeds=prompt_embeds,
+        pooled_prompt_embeds=pooled_prompt_embeds,
+        guidance_scale=7.5,  # 0.0 is the for maximum creativity [1 to 20, with most models using a default of 7-7.5]
+        output_type="pil",
+        num_inference_steps=4, #use a larger number if you are using [dev]
+        max_sequence_length=FLUX_MAX_SEQUENCE_LENGTH,
+        generator=torch.Generator("cpu")
+    ).images
+
+def generate_flux1_batch(prompts, variant='schnell', batch_size=None):
+    """
+    Generate one FLUX image per prompt, several prompts per pipeline call.
+
+    A batch shares the text encoding and denoising passes, which is much faster than
+    one call per prompt on CPU-only hosts. If a batch runs out of memory it is split
+    in half and retried, down to one prompt per call, and later batches on the same
+    loaded pipeline start from the size that worked.
+
+    Args:
+        prompts (list): Image prompts.
+        variant (str): FLUX variant from FluxPipelineManager.variants().
+        batch_size (int): Prompts per pipeline call; defaults to FLUX_BATCH_SIZE.
+
+    Returns:
+        list: PIL images, in the order of `prompts`.
+
+    Raises:
+        MemoryError: If a single prompt does not fit in memory.
+    """
+    batch_size = max(1, batch_size or config.FLUX_BATCH_SIZE)
 
-    model_id = config.FLUX1_MODEL_LOCATION
+    images = []
+    # The pipeline stays loaded in flux_pipelines for the next comic
+    with flux_pipelines.pipeline(variant) as pipe:
+        batch_size = min(batch_size, _flux_batch_limits.get(pipe, batch_size))
+        model_key = flux_pipelines.model_key(variant)
+        start = 0
+        while start < len(prompts):
+            batch = prompts[start:start + batch_size]
+            try:
+                images.extend(_run_flux_batch(pipe, batch, model_key))
+            except Exception as e:
+                if not _is_out_of_memory(e):
+                    raise
+                if is_loaded(torch) and torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                if len(batch) == 1:
+                    raise MemoryError(f"FLUX ran out of memory generating a single image: {e}") from e
+                batch_size = len(batch) // 2
+                _flux_batch_limits[pipe] = batch_size
+                app_logger.warning(f"FLUX batch of {len(batch)} ran out of memory; retrying with batches of {batch_size}")
+                continue
+            start += len(batch)
+    return images
 
-    pipe = FluxPipeline.from_pretrained(model_id, torch_dtype=torch.bfloat16)
-    pipe.enable_sequential_cpu_offload() # offload the model to CPU in a sequential manner. This is useful for large batch sizes
+def generate_flux1_images(comic_script, original_story, comic_artist_style=None, variant='schnell'):
+    app_logger.debug(f"Generating images with FLUX.1 {variant}...")
 
     # Parse the comic script into panels
     panels = parse_comic_script(comic_script)
     
-    image_urls = []
-    for panel in panels:
-        # Generate a safe prompt
-        prompt = generate_safe_prompt(panel, 0, original_story, comic_artist_style)
-        image = pipe(
-            prompt,
-            guidance_scale=7.5,  # 0.0 is the for maximum creativity [1 to 20, with most models using a default of 7-7.5]
-            output_type="pil",
-            num_inference_steps=4, #use a larger number if you are using [dev]
-            max_sequence_length=256,
-            generator=torch.Generator("cpu")
-        ).images[0]
-        image_urls.append(image)
-    return image_urls
+    # Generate a safe prompt for each panel; all panels go through FLUX together
+    prompts = [generate_safe_prompt(panel, 0, original_story, comic_artist_style) for panel in panels]
+    return generate_flux1_batch(prompts, variant)
 
 def generate_dalle_images(comic_script, original_story, comic_artist_style=None):
     try:
         app_logger.debug(f"Generating images with DALL-E...")
         
         # Create a DallEAPIWrapper instance
-        dalle = DallEAPIWrapper(api_key=config.OPENAI_API_KEY, model='dall-e-3')
+        dalle = dalle_image_generator.DallEAPIWrapper(api_key=config.OPENAI_API_KEY, model='dall-e-3')
         
         # Parse the comic script into panels
         panels = parse_comic_script(comic_script)
@@ -0,0 +1,68 @@
+import importlib
+import sys
+import threading
+import types
+
+from logger import app_logger
+
+_import_lock = threading.RLock()
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    torch, transformers, diffusers, cv2 and whisper take seconds to import and are only
+    needed by the generation pipelines, so modules bind them through lazy_import and
+    serving the gallery never loads them.
+
+    Example:
+        torch = lazy_import('torch')
+        ...
+        if torch.cuda.is_available():  # torch is imported here
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with _import_lock:
+                module = self.__dict__['_module']
+                if module is None:
+                    app_logger.debug(f"Importing {self.__name__} on first use")
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+def lazy_import(name):
+    """
+    Bind a module without importing it until one of its attributes is used.
+
+    Args:
+        name (str): Dotted module name, e.g. 'matplotlib.pyplot'.
+
+    Returns:
+        module: The module itself if it is already imported, otherwise a LazyModule.
+    """
+    return sys.modules.get(name) or LazyModule(name)
+
+def is_loaded(module):
+    """Whether a module bound with lazy_import has been imported yet."""
+    if isinstance(module, LazyModule):
+        return module.__dict__['_module'] is not None
+    return True
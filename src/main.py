@@ -7,8 +7,11 @@
 # The script also provides options to post the generated comics to Twitter and Facebook.
 #
 
+# Enabled before anything else is imported so the profile covers every import
+import startup_profiler
+startup_profiler.enable_from_environment()
+
 import warnings
-from numba.core.errors import NumbaDeprecationWarning
 
 warnings.filterwarnings("ignore", message="We strongly recommend passing in an `attention_mask` since your input_ids may be padded.")
 warnings.filterwarnings("ignore", category=FutureWarning, module='transformers')
@@ -16,7 +19,7 @@ warnings.filterwarnings("ignore", category=FutureWarning, module='transformers')
 # Suppress specific UserWarnings related to attention mask in transformers
 warnings.filterwarnings("ignore", message="The attention mask is not set and cannot be inferred from input because pad token is same as eos token.")
 # Suppress NumbaDeprecationWarning related to 'nopython' keyword argument
-warnings.filterwarnings("ignore", category=NumbaDeprecationWarning, message="The 'nopython' keyword argument was not supplied to the 'numba.jit' decorator.")
+warnings.filterwarnings("ignore", message="The 'nopython' keyword argument was not supplied to the 'numba.jit' decorator.")
 # Suppress FutureWarning related to torch.load with weights_only=False
 warnings.filterwarnings("ignore", category=FutureWarning, message="You are using `torch.load` with `weights_only=False`")
 
@@ -128,8 +131,9 @@ def main():
     The main function that runs the Grizzly News AI-Generated Comics program.
     It handles the main menu loop and user interactions.
     """
-    global config  # Declare config as global to avoid UnboundLocalError
-    
+    ComicDatabase.bootstrap()
+    startup_profiler.finish()
+
     try:
         # Create Yogi Bear voice at startup
         if config.GENERATE_AUDIO:
@@ -285,7 +289,6 @@ def main():
             
             elif choice == '5':
                 toggle_voice()
-                config = load_config()  # Reload the configuration after toggling voice recognition
             
             elif choice == '6':
                 confirmation = input("Are you sure you want to purge the database? This action cannot be undone. (y/n): ")
@@ -302,7 +305,7 @@ def main():
             else:
                 app_logger.warning("Invalid choice. Please try again.")
     finally:
-        ComicDatabase.close()
+        ComicDatabase.close_pools()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,10 @@
+from .runner import apply_migrations, get_applied_versions
+from .versions import MIGRATIONS
+from .postgres import POSTGRES_MIGRATIONS
+
+__all__ = [
+    'apply_migrations',
+    'get_applied_versions',
+    'MIGRATIONS',
+    'POSTGRES_MIGRATIONS'
+]
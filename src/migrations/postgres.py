@@ -0,0 +1,252 @@
+"""
+Schema migrations for the PostgreSQL backend.
+
+PostgreSQL databases start at the schema the SQLite MIGRATIONS build up to, so the
+history starts over here. Append new migrations to POSTGRES_MIGRATIONS alongside
+their SQLite counterparts in versions.py.
+"""
+
+# The weighted document comics are searched by. The GIN index and the search query
+# must use the identical expression for the index to be used.
+COMIC_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(original_story, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(comic_summary, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(comic_script, '')), 'D')"
+)
+
+def create_schema(cursor):
+    """
+    Create the tables, indexes and triggers of SQLite schema version 12.
+
+    Full-text search uses a GIN expression index over COMIC_SEARCH_VECTOR instead of
+    the FTS5 table, and the append-only ledger and cache version counter use PL/pgSQL
+    trigger functions.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL,
+            loyalty_points INTEGER DEFAULT 0,
+            last_login TEXT,
+            last_purchase_date DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS comics (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            user_id BIGINT REFERENCES users(id),
+            title TEXT NOT NULL,
+            location TEXT NOT NULL,
+            original_story TEXT NOT NULL,
+            story_hash TEXT,
+            comic_script TEXT NOT NULL,
+            comic_summary TEXT,
+            story_source_url TEXT,
+            image_path TEXT NOT NULL,
+            audio_path TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            date DATE NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS loyalty_point_costs (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            action_name TEXT UNIQUE NOT NULL,
+            point_cost INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS output_manifest (
+            path TEXT PRIMARY KEY,
+            mtime DOUBLE PRECISION NOT NULL,
+            size BIGINT NOT NULL,
+            summary_mtime DOUBLE PRECISION,
+            comic_id BIGINT REFERENCES comics(id) ON DELETE SET NULL,
+            owned INTEGER NOT NULL DEFAULT 0,
+            indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS comic_assets (
+            comic_id BIGINT NOT NULL REFERENCES comics(id) ON DELETE CASCADE,
+            kind TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            byte_size BIGINT,
+            width INTEGER,
+            height INTEGER,
+            available INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (comic_id, kind, position)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS comic_story_bands (
+            band INTEGER NOT NULL,
+            bucket BIGINT NOT NULL,
+            comic_id BIGINT NOT NULL REFERENCES comics(id) ON DELETE CASCADE,
+            PRIMARY KEY (band, bucket, comic_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS loyalty_ledger (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            user_id BIGINT NOT NULL REFERENCES users(id),
+            action TEXT NOT NULL,
+            points INTEGER NOT NULL,
+            balance_after INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            name TEXT PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute("INSERT INTO cache_versions (name, version) VALUES ('loyalty_point_costs', 0) ON CONFLICT DO NOTHING")
+
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comics_user_page ON comics (user_id, date DESC, created_at DESC, id DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comics_page ON comics (date DESC, created_at DESC, id DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comics_location ON comics (location)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comics_story_hash ON comics (story_hash)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comics_title ON comics (title)')
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_comics_search ON comics USING GIN (({COMIC_SEARCH_VECTOR}))')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comic_story_bands_comic ON comic_story_bands (comic_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_loyalty_ledger_user ON loyalty_ledger (user_id, id)')
+
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION loyalty_ledger_append_only() RETURNS trigger AS $$
+        BEGIN
+            RAISE EXCEPTION 'loyalty_ledger is append-only';
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+    cursor.execute('DROP TRIGGER IF EXISTS loyalty_ledger_append_only ON loyalty_ledger')
+    cursor.execute('''
+        CREATE TRIGGER loyalty_ledger_append_only
+        BEFORE UPDATE OR DELETE ON loyalty_ledger
+        FOR EACH ROW EXECUTE FUNCTION loyalty_ledger_append_only()
+    ''')
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION bump_loyalty_point_costs_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE cache_versions SET version = version + 1 WHERE name = 'loyalty_point_costs';
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+    cursor.execute('DROP TRIGGER IF EXISTS loyalty_point_costs_version ON loyalty_point_costs')
+    cursor.execute('''
+        CREATE TRIGGER loyalty_point_costs_version
+        AFTER INSERT OR UPDATE OR DELETE ON loyalty_point_costs
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_loyalty_point_costs_version()
+    ''')
+
+def create_comic_stats(cursor):
+    """
+    Add per-location and per-date comic counts kept current by a trigger.
+
+    Mirrors SQLite migration 13 (create_comic_stats) with one PL/pgSQL row trigger.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS comic_location_stats (
+            location TEXT PRIMARY KEY,
+            comic_count INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS comic_date_stats (
+            date DATE PRIMARY KEY,
+            comic_count INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('LOCK TABLE comics IN SHARE MODE')
+    for table, column in (('comic_location_stats', 'location'), ('comic_date_stats', 'date')):
+        cursor.execute(f'DELETE FROM {table}')
+        cursor.execute(f'INSERT INTO {table} ({column}, comic_count) SELECT {column}, COUNT(*) FROM comics GROUP BY {column}')
+    cursor.execute('''
+        CREATE OR REPLACE FUNCTION maintain_comic_stats() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                UPDATE comic_location_stats SET comic_count = comic_count - 1 WHERE location = OLD.location;
+                DELETE FROM comic_location_stats WHERE location = OLD.location AND comic_count <= 0;
+                UPDATE comic_date_stats SET comic_count = comic_count - 1 WHERE date = OLD.date;
+                DELETE FROM comic_date_stats WHERE date = OLD.date AND comic_count <= 0;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO comic_location_stats (location, comic_count) VALUES (NEW.location, 1)
+                ON CONFLICT (location) DO UPDATE SET comic_count = comic_location_stats.comic_count + 1;
+                INSERT INTO comic_date_stats (date, comic_count) VALUES (NEW.date, 1)
+                ON CONFLICT (date) DO UPDATE SET comic_count = comic_date_stats.comic_count + 1;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+    cursor.execute('DROP TRIGGER IF EXISTS comics_stats ON comics')
+    cursor.execute('''
+        CREATE TRIGGER comics_stats
+        AFTER INSERT OR DELETE OR UPDATE OF location, date ON comics
+        FOR EACH ROW EXECUTE FUNCTION maintain_comic_stats()
+    ''')
+
+def create_comic_text_storage(cursor):
+    """
+    Add the story excerpt, archive flag and archive table of SQLite migration 14.
+
+    TOAST already compresses large text values and keeps them out of the heap, so the
+    text columns stay plain, there are no compression dictionaries and the search
+    index keeps reading the comics columns directly.
+    """
+    cursor.execute('ALTER TABLE comics ADD COLUMN IF NOT EXISTS story_excerpt TEXT')
+    cursor.execute('UPDATE comics SET story_excerpt = substr(original_story, 1, 280) WHERE story_excerpt IS NULL')
+    cursor.execute('ALTER TABLE comics ADD COLUMN IF NOT EXISTS text_archived INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS comic_text_archive (
+            comic_id BIGINT PRIMARY KEY REFERENCES comics(id) ON DELETE CASCADE,
+            original_story TEXT,
+            comic_script TEXT,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def create_app_settings(cursor):
+    """Add the app_settings table of SQLite migration 15."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS app_settings (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def add_comics_story_truncated(cursor):
+    """Add the story_truncated flag of SQLite migration 16."""
+    cursor.execute('ALTER TABLE comics ADD COLUMN IF NOT EXISTS story_truncated INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('UPDATE comics SET story_truncated = CASE WHEN length(original_story) > 280 THEN 1 ELSE 0 END')
+
+def create_duplicate_probe_indexes(cursor):
+    """Replace the story_hash and title indexes as in SQLite migration 17."""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comics_story_hash_page ON comics (story_hash, date, created_at, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comics_title_page ON comics (title, date, created_at, id)')
+    cursor.execute('DROP INDEX IF EXISTS idx_comics_story_hash')
+    cursor.execute('DROP INDEX IF EXISTS idx_comics_title')
+
+# Ordered list of (version, name, migration). Append new migrations with the next
+# version number; never renumber or edit a migration that has shipped.
+POSTGRES_MIGRATIONS = [
+    (1, 'create_schema', create_schema),
+    (2, 'create_comic_stats', create_comic_stats),
+    (3, 'create_comic_text_storage', create_comic_text_storage),
+    (4, 'create_app_settings', create_app_settings),
+    (5, 'add_comics_story_truncated', add_comics_story_truncated),
+    (6, 'create_duplicate_probe_indexes', create_duplicate_probe_indexes),
+]
@@ -0,0 +1,63 @@
+import sqlite3
+from logger import app_logger
+from .versions import MIGRATIONS
+
+
+def create_schema_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def get_applied_versions(connection, cursor_factory=None):
+    cursor = (cursor_factory or connection.cursor)()
+    create_schema_table(cursor)
+    connection.commit()
+    cursor.execute('SELECT version FROM schema_migrations')
+    return {row['version'] for row in cursor.fetchall()}
+
+def apply_migrations(connection, migrations=MIGRATIONS, cursor_factory=None):
+    """
+    Apply every migration in `migrations` that is not yet recorded in schema_migrations.
+
+    Each migration runs in its own transaction together with its schema_migrations
+    row, so a failed migration leaves the database at the previous version.
+
+    Args:
+        connection: The connection to migrate (sqlite3 or psycopg2).
+        migrations (list): Ordered (version, name, migration) tuples; defaults to the
+            SQLite MIGRATIONS.
+        cursor_factory (callable): Returns a cursor accepting ? placeholders; defaults
+            to connection.cursor.
+
+    Returns:
+        list: The versions applied by this call.
+    """
+    cursor_factory = cursor_factory or connection.cursor
+    applied_versions = get_applied_versions(connection, cursor_factory)
+    newly_applied = []
+    for version, name, migration in migrations:
+        if version in applied_versions:
+            continue
+        app_logger.info(f"Applying database migration {version}: {name}")
+        cursor = cursor_factory()
+        try:
+            # sqlite3 does not open a transaction before DDL on its own; psycopg2 always has one open
+            if isinstance(connection, sqlite3.Connection):
+                cursor.execute('BEGIN')
+            migration(cursor)
+            cursor.execute('INSERT INTO schema_migrations (version, name) VALUES (?, ?)', (version, name))
+            connection.commit()
+        except Exception as e:
+            connection.rollback()
+            app_logger.error(f"Database migration {version} ({name}) failed: {e}")
+            raise
+        newly_applied.append(version)
+    if newly_applied:
+        app_logger.info(f"Database schema migrated to version {newly_applied[-1]}")
+    else:
+        app_logger.debug("Database schema is up to date")
+    return newly_applied
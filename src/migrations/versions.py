@@ -0,0 +1,407 @@
+from config import load_config
+from logger import app_logger
+from comic_assets import describe_comic_assets
+from story_signatures import story_hash, story_bands
+from .update_last_login import migrate_last_login
+
+
+# Comic count tables maintained by create_comic_stats: (table, comics column counted)
+COMIC_STATS_TABLES = (('comic_location_stats', 'location'), ('comic_date_stats', 'date'))
+
+def _column_names(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [column[1] for column in cursor.fetchall()]
+
+def add_comics_user_id(cursor):
+    """Add comics.user_id to databases created before comics were owned by users."""
+    if 'user_id' not in _column_names(cursor, 'comics'):
+        cursor.execute('ALTER TABLE comics ADD COLUMN user_id INTEGER REFERENCES users(id)')
+        app_logger.debug("Added user_id column to comics table")
+
+def add_users_email(cursor):
+    """Add users.email to databases created before registration collected emails."""
+    if 'email' not in _column_names(cursor, 'users'):
+        cursor.execute('ALTER TABLE users ADD COLUMN email TEXT')
+        app_logger.debug("Added email column to users table")
+
+def create_listing_indexes(cursor):
+    """
+    Index the gallery and lookup queries.
+
+    The (user_id, date, created_at) index serves the per-user listings in
+    get_all_comics/get_filtered_comics without a sort step, the (date, created_at)
+    index serves the admin listing, and location/email back the dropdown and login
+    lookups.
+    """
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_comics_user_date
+        ON comics (user_id, date DESC, created_at DESC)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_comics_date
+        ON comics (date DESC, created_at DESC)
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comics_location ON comics (location)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)')
+
+def add_comics_story_hash(cursor):
+    """
+    Add the normalized story hash used for duplicate checks and backfill existing rows.
+
+    The index is not UNIQUE: databases populated from the output folder already hold
+    several rows per story, and duplicates are detected by lookup rather than rejected.
+    A title index lets get_comic_by_title_or_story probe both columns by index.
+    """
+    if 'story_hash' not in _column_names(cursor, 'comics'):
+        cursor.execute('ALTER TABLE comics ADD COLUMN story_hash TEXT')
+    cursor.execute('SELECT id, original_story FROM comics WHERE story_hash IS NULL')
+    rows = cursor.fetchall()
+    cursor.executemany('UPDATE comics SET story_hash = ? WHERE id = ?',
+                       [(story_hash(row[1]), row[0]) for row in rows])
+    app_logger.debug(f"Backfilled story_hash for {len(rows)} comics")
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comics_story_hash ON comics (story_hash)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comics_title ON comics (title)')
+
+def create_keyset_page_indexes(cursor):
+    """
+    Extend the listing indexes with id so keyset pages on (date, created_at, id) need no sort.
+
+    Supersedes the indexes from create_listing_indexes, which ended in the implicit
+    ascending rowid and left SQLite sorting the id tie-breaker of each page.
+    """
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_comics_user_page
+        ON comics (user_id, date DESC, created_at DESC, id DESC)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_comics_page
+        ON comics (date DESC, created_at DESC, id DESC)
+    ''')
+    cursor.execute('DROP INDEX IF EXISTS idx_comics_user_date')
+    cursor.execute('DROP INDEX IF EXISTS idx_comics_date')
+
+def create_output_manifest(cursor):
+    """
+    Track the PNG files the output folder indexer has ingested.
+
+    path is relative to OUTPUT_DIR. mtime/size (and summary_mtime for the sidecar
+    summary file) detect changed files; comic_id links the file to its comic, and
+    owned marks comics the indexer created itself rather than found already in the
+    database.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS output_manifest (
+            path TEXT PRIMARY KEY,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL,
+            summary_mtime REAL,
+            comic_id INTEGER REFERENCES comics(id),
+            owned INTEGER NOT NULL DEFAULT 0,
+            indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def create_comic_assets(cursor):
+    """
+    Store one row per comic panel and narration file, checked against the disk at write time.
+
+    path is canonical (relative to OUTPUT_DIR for images, OUTPUT_DIR/audio for audio),
+    so the gallery builds media URLs without probing path variants with os.path.exists.
+    Existing comics are backfilled from comics.image_path and comics.audio_path.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS comic_assets (
+            comic_id INTEGER NOT NULL REFERENCES comics(id) ON DELETE CASCADE,
+            kind TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            byte_size INTEGER,
+            width INTEGER,
+            height INTEGER,
+            available INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (comic_id, kind, position)
+        )
+    ''')
+    output_dir = load_config().OUTPUT_DIR
+    cursor.execute('SELECT id, image_path, audio_path FROM comics')
+    rows = cursor.fetchall()
+    for comic_id, image_path, audio_path in rows:
+        cursor.executemany('''
+            INSERT OR REPLACE INTO comic_assets (comic_id, kind, position, path, byte_size, width, height, available)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(comic_id,) + asset for asset in describe_comic_assets(image_path, audio_path, output_dir)])
+    app_logger.debug(f"Backfilled comic_assets for {len(rows)} comics")
+
+def create_comics_fts(cursor):
+    """
+    Add an FTS5 index over comic title, story, summary and script for gallery search.
+
+    comics_fts is an external-content table reading from comics, kept in sync by
+    insert/update/delete triggers and built from the existing rows here.
+    """
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS comics_fts USING fts5(
+            title, original_story, comic_summary, comic_script,
+            content='comics', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS comics_fts_insert AFTER INSERT ON comics BEGIN
+            INSERT INTO comics_fts (rowid, title, original_story, comic_summary, comic_script)
+            VALUES (new.id, new.title, new.original_story, new.comic_summary, new.comic_script);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS comics_fts_delete AFTER DELETE ON comics BEGIN
+            INSERT INTO comics_fts (comics_fts, rowid, title, original_story, comic_summary, comic_script)
+            VALUES ('delete', old.id, old.title, old.original_story, old.comic_summary, old.comic_script);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS comics_fts_update
+        AFTER UPDATE OF title, original_story, comic_summary, comic_script ON comics BEGIN
+            INSERT INTO comics_fts (comics_fts, rowid, title, original_story, comic_summary, comic_script)
+            VALUES ('delete', old.id, old.title, old.original_story, old.comic_summary, old.comic_script);
+            INSERT INTO comics_fts (rowid, title, original_story, comic_summary, comic_script)
+            VALUES (new.id, new.title, new.original_story, new.comic_summary, new.comic_script);
+        END
+    ''')
+    cursor.execute("INSERT INTO comics_fts (comics_fts) VALUES ('rebuild')")
+
+def create_comic_story_bands(cursor):
+    """
+    Persist MinHash LSH buckets of every comic story for near-duplicate lookups.
+
+    Each comic has one (band, bucket) row per band of its story's MinHash signature
+    (see story_signatures.story_bands); comics sharing a bucket with a new story are
+    the only ones compared to it. Existing comics are backfilled.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS comic_story_bands (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            comic_id INTEGER NOT NULL REFERENCES comics(id) ON DELETE CASCADE,
+            PRIMARY KEY (band, bucket, comic_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comic_story_bands_comic ON comic_story_bands (comic_id)')
+    cursor.execute('SELECT id, original_story FROM comics')
+    rows = cursor.fetchall()
+    for comic_id, original_story in rows:
+        cursor.executemany('INSERT OR IGNORE INTO comic_story_bands (band, bucket, comic_id) VALUES (?, ?, ?)',
+                           [(band, bucket, comic_id) for band, bucket in story_bands(original_story)])
+    app_logger.debug(f"Backfilled story bands for {len(rows)} comics")
+
+def create_loyalty_ledger(cursor):
+    """
+    Add an append-only ledger of every loyalty point change for auditing.
+
+    Each row records the signed change, the action that caused it and the balance
+    after it. Triggers reject UPDATE and DELETE so history cannot be rewritten.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS loyalty_ledger (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            action TEXT NOT NULL,
+            points INTEGER NOT NULL,
+            balance_after INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_loyalty_ledger_user ON loyalty_ledger (user_id, id)')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS loyalty_ledger_no_update BEFORE UPDATE ON loyalty_ledger BEGIN
+            SELECT RAISE(ABORT, 'loyalty_ledger is append-only');
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS loyalty_ledger_no_delete BEFORE DELETE ON loyalty_ledger BEGIN
+            SELECT RAISE(ABORT, 'loyalty_ledger is append-only');
+        END
+    ''')
+
+def create_cache_versions(cursor):
+    """
+    Add version counters that let each process validate its in-process caches.
+
+    Triggers bump the 'loyalty_point_costs' counter on any change to that table, so a
+    worker can tell whether its cached price table is stale with one primary key read,
+    whichever process made the change.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO cache_versions (name, version) VALUES ('loyalty_point_costs', 0)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS loyalty_point_costs_version_{event.lower()}
+            AFTER {event} ON loyalty_point_costs BEGIN
+                UPDATE cache_versions SET version = version + 1 WHERE name = 'loyalty_point_costs';
+            END
+        ''')
+
+def create_comic_stats(cursor):
+    """
+    Add per-location and per-date comic counts kept current by triggers.
+
+    Location dropdowns and archive summaries read these small tables instead of
+    scanning comics. Rows are added on a location or date's first comic and removed
+    when its last comic is deleted. Existing comics are backfilled.
+    """
+    for table, column in COMIC_STATS_TABLES:
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                {column} TEXT PRIMARY KEY,
+                comic_count INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute(f'DELETE FROM {table}')
+        cursor.execute(f'''
+            INSERT INTO {table} ({column}, comic_count)
+            SELECT {column}, COUNT(*) FROM comics GROUP BY {column}
+        ''')
+
+    def count_comic(row):
+        return ''.join(f'''
+                INSERT INTO {table} ({column}, comic_count) VALUES ({row}.{column}, 1)
+                ON CONFLICT ({column}) DO UPDATE SET comic_count = comic_count + 1;''' for table, column in COMIC_STATS_TABLES)
+
+    def uncount_comic(row):
+        return ''.join(f'''
+                UPDATE {table} SET comic_count = comic_count - 1 WHERE {column} = {row}.{column};
+                DELETE FROM {table} WHERE {column} = {row}.{column} AND comic_count <= 0;''' for table, column in COMIC_STATS_TABLES)
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS comics_stats_insert AFTER INSERT ON comics BEGIN{count_comic('new')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS comics_stats_delete AFTER DELETE ON comics BEGIN{uncount_comic('old')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS comics_stats_update AFTER UPDATE OF location, date ON comics
+        WHEN old.location IS NOT new.location OR old.date IS NOT new.date BEGIN{uncount_comic('old')}{count_comic('new')}
+        END
+    ''')
+
+def create_comic_text_storage(cursor):
+    """
+    Prepare comics for compressed and archived story, script and summary text.
+
+    ComicDatabase now stores those columns as zlib BLOBs (see text_compression), so:
+    - the gallery excerpt becomes a plain story_excerpt column instead of substr(),
+    - comics_fts becomes a contentless FTS5 table written by ComicDatabase with the
+      plain text, replacing the triggers that copied the stored column values,
+    - compression_dictionaries holds the shared preset dictionaries, and
+    - comic_text_archive is the cold table the story and script of old comics move to,
+      flagged by comics.text_archived.
+    Existing rows stay plain text until the archival job compresses them.
+    """
+    columns = _column_names(cursor, 'comics')
+    if 'story_excerpt' not in columns:
+        cursor.execute('ALTER TABLE comics ADD COLUMN story_excerpt TEXT')
+        cursor.execute('UPDATE comics SET story_excerpt = substr(original_story, 1, 280)')
+    if 'text_archived' not in columns:
+        cursor.execute('ALTER TABLE comics ADD COLUMN text_archived INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comics_unarchived_date ON comics (date) WHERE text_archived = 0')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS compression_dictionaries (
+            id INTEGER PRIMARY KEY,
+            dictionary BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS comic_text_archive (
+            comic_id INTEGER PRIMARY KEY REFERENCES comics(id) ON DELETE CASCADE,
+            original_story,
+            comic_script,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    for event in ('insert', 'delete', 'update'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS comics_fts_{event}')
+    cursor.execute('DROP TABLE IF EXISTS comics_fts')
+    cursor.execute('''
+        CREATE VIRTUAL TABLE comics_fts USING fts5(
+            title, original_story, comic_summary, comic_script,
+            content='',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    cursor.execute('''
+        INSERT INTO comics_fts (rowid, title, original_story, comic_summary, comic_script)
+        SELECT id, title, original_story, comic_summary, comic_script FROM comics
+    ''')
+
+def create_app_settings(cursor):
+    """
+    Add a name/value table for application state that must survive restarts, such as
+    the fingerprint of the admin password last applied by ComicDatabase.sync_admin_user.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS app_settings (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def add_comics_story_truncated(cursor):
+    """
+    Record whether story_excerpt was cut from a longer story, so the gallery does not
+    guess from the excerpt length and mark 280-character stories as truncated.
+
+    Plain-text stories are measured; for compressed or archived ones the old guess
+    from the excerpt length is kept.
+    """
+    if 'story_truncated' not in _column_names(cursor, 'comics'):
+        cursor.execute('ALTER TABLE comics ADD COLUMN story_truncated INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('''
+        UPDATE comics
+        SET story_truncated = CASE
+            WHEN text_archived = 0 AND typeof(original_story) = 'text' THEN length(original_story) > 280
+            ELSE length(story_excerpt) >= 280
+        END
+    ''')
+
+def create_duplicate_probe_indexes(cursor):
+    """
+    Index story_hash and title together with the gallery sort key, so the gallery's
+    "is there a newer comic with this story or title" probes are a single index
+    lookup. They replace the plain story_hash and title indexes, whose lookups the
+    new indexes serve as a prefix.
+    """
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comics_story_hash_page ON comics (story_hash, date, created_at, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comics_title_page ON comics (title, date, created_at, id)')
+    cursor.execute('DROP INDEX IF EXISTS idx_comics_story_hash')
+    cursor.execute('DROP INDEX IF EXISTS idx_comics_title')
+
+# Ordered list of (version, name, migration). Append new migrations with the next
+# version number; never renumber or edit a migration that has shipped.
+MIGRATIONS = [
+    (1, 'add_comics_user_id', add_comics_user_id),
+    (2, 'add_users_email', add_users_email),
+    (3, 'migrate_last_login', migrate_last_login),
+    (4, 'create_listing_indexes', create_listing_indexes),
+    (5, 'add_comics_story_hash', add_comics_story_hash),
+    (6, 'create_keyset_page_indexes', create_keyset_page_indexes),
+    (7, 'create_output_manifest', create_output_manifest),
+    (8, 'create_comic_assets', create_comic_assets),
+    (9, 'create_comics_fts', create_comics_fts),
+    (10, 'create_comic_story_bands', create_comic_story_bands),
+    (11, 'create_loyalty_ledger', create_loyalty_ledger),
+    (12, 'create_cache_versions', create_cache_versions),
+    (13, 'create_comic_stats', create_comic_stats),
+    (14, 'create_comic_text_storage', create_comic_text_storage),
+    (15, 'create_app_settings', create_app_settings),
+    (16, 'add_comics_story_truncated', add_comics_story_truncated),
+    (17, 'create_duplicate_probe_indexes', create_duplicate_probe_indexes),
+]
@@ -11,6 +11,28 @@ def get_db():
         g.db = ComicDatabase()
     return g.db
 
+def load_user(user_id):
+    """
+    Load a user at most once per request.
+
+    The row is kept on flask.g for the rest of the request and comes from the
+    short-lived cross-request cache in ComicDatabase.get_cached_user.
+    """
+    users = g.setdefault('users', {})
+    if user_id not in users:
+        users[user_id] = get_db().get_cached_user(user_id)
+    return users[user_id]
+
+def forget_user(user_id):
+    """Drop a user loaded in this request after changing it, so later reads see the change."""
+    g.setdefault('users', {}).pop(user_id, None)
+
+def current_user():
+    """Get the logged-in user's row, or None if nobody is logged in."""
+    if 'user' not in session:
+        return None
+    return load_user(session['user']['id'])
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -42,17 +64,18 @@ def login():
         user = db.get_user_by_username(username)
         app_logger.debug(f"User retrieved from database: {user}")
         if user:
-            is_valid = db.check_password(username, password)
+            is_valid = db.check_password(username, password, user=user)
             app_logger.debug(f"Password check result: {is_valid}")
             if is_valid:
                 app_logger.debug(f"Login successful for user: {user}")
                 session['user'] = {'id': user['id'], 'username': user['username'], 'role': user['role']}
                 app_logger.debug(f"Session after login: {session}")
                 try:
-                    db.update_user_last_login(user['id'])
-                    # Award 5 loyalty points if user is not admin
-                    if user['role'] != 'admin':
-                        db.update_user_loyalty_points(user['id'], 5)
+                    with db.transaction():
+                        db.update_user_last_login(user['id'])
+                        # Award 5 loyalty points if user is not admin
+                        if user['role'] != 'admin':
+                            db.update_user_loyalty_points(user['id'], 5, 'login')
                 except Exception as e:
                     app_logger.error(f"Error updating last login: {str(e)}")
                 flash('Logged in successfully.')
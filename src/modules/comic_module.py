@@ -4,13 +4,12 @@ import os
 import json
 import time
 import uuid
-import sqlite3
 from datetime import datetime
 from logger import app_logger
 from database import ComicDatabase
 from modules import generate_daily_comic, generate_custom_comic, generate_media_comic
 from event_fetcher import get_local_events
-from .auth_module import login_required
+from .auth_module import login_required, admin_required, load_user
 from .loyalty_module import check_and_deduct_points
 from .utils_module import format_comic_script, get_unique_locations
 from utils import sanitize_location
@@ -30,8 +29,7 @@ def get_config():
 
 def should_check_loyalty(user_id):
     """Helper function to determine if loyalty points should be checked"""
-    db = get_db()
-    user = db.get_user_by_id(user_id)
+    user = load_user(user_id)
     return user['role'] != 'admin' if user else True
 
 @comic_bp.route('/daily_comic', methods=['GET', 'POST'])
@@ -423,56 +421,25 @@ def custom_comic_progress():
                 yield "data: " + json.dumps({"progress": 90, "message": "Saving comic to database...", "stage": "Database Update"}) + "\n\n"
                 time.sleep(1)
 
-                # Direct database insert to avoid parameter issues
-                try:
-                    image_path_str = ",".join(image_paths)
-                    app_logger.debug(f"Saving image paths to database: {image_path_str}")
-                    
-                    conn = sqlite3.connect(current_app.config['APP_CONFIG'].DB_PATH)
-                    cursor = conn.cursor()
-                    
-                    # Insert using direct SQL
-                    cursor.execute('''
-                        INSERT INTO comics (user_id, title, location, original_story, comic_script, comic_summary, 
-                                           story_source_url, image_path, audio_path, date, created_at)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        user_id, 
-                        title, 
-                        location, 
-                        story, 
-                        comic_script, 
-                        comic_summary, 
-                        "", 
-                        image_path_str, 
-                        relative_audio_path, 
-                        datetime.now().date(), 
-                        datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    ))
-                    
-                    conn.commit()
-                    conn.close()
-                    app_logger.debug(f"Successfully saved comic to database with direct SQL: {title}")
-                except Exception as e:
-                    app_logger.error(f"Error saving to database with direct SQL: {e}")
-                    
-                    # Fall back to the regular method
-                    try:
-                        db.add_comic(
-                            user_id=user_id,
-                            title=title, 
-                            location=location, 
-                            original_story=story, 
-                            comic_script=comic_script, 
-                            comic_summary=comic_summary, 
-                            story_source_url="",
-                            image_path=image_path_str,
-                            audio_path=relative_audio_path, 
-                            date=datetime.now().date()
-                        )
-                        app_logger.debug("Fallback to db.add_comic succeeded")
-                    except Exception as e2:
-                        app_logger.error(f"Both database save methods failed: {e2}")
+                # Insert with keyword arguments to avoid parameter order issues
+                image_path_str = ",".join(image_paths)
+                app_logger.debug(f"Saving image paths to database: {image_path_str}")
+                comic_id = db.add_comic(
+                    user_id=user_id,
+                    title=title,
+                    location=location,
+                    original_story=story,
+                    comic_script=comic_script,
+                    comic_summary=comic_summary,
+                    story_source_url="",
+                    image_path=image_path_str,
+                    audio_path=relative_audio_path,
+                    date=datetime.now().date()
+                )
+                if comic_id is None:
+                    app_logger.error(f"Failed to save comic to database: {title}")
+                else:
+                    app_logger.debug(f"Successfully saved comic to database: {title}")
                 
                 yield "data: " + json.dumps({"progress": 95, "message": "Finalizing custom comic...", "stage": "Finalization"}) + "\n\n"
                 time.sleep(1)
@@ -591,6 +558,68 @@ def media_comic_progress():
 
     return Response(stream_with_context(generate()), mimetype='text/event-stream')
 
+def prepare_comic_for_display(comic, assets):
+    """
+    Resolve media URLs, date and panel summaries of a comic row for the gallery templates.
+
+    Media URLs come from the comic's comic_assets rows (see ComicDatabase.get_comic_assets),
+    whose paths are canonical and were checked when the comic was saved, so rendering
+    does no filesystem I/O.
+    """
+    comic['image_paths'] = [url_for('media.serve_image', filename=asset['path'])
+                            for asset in assets if asset['kind'] == 'image']
+    if not comic['image_paths']:
+        app_logger.warning(f"No available panel images for comic: {comic.get('title', 'Unknown')}")
+
+    audio_assets = [asset for asset in assets if asset['kind'] == 'audio']
+    comic['audio_path'] = url_for('media.serve_audio', filename=audio_assets[0]['path']) if audio_assets else None
+    
+    if 'comic_script' not in comic or not comic['comic_script']:
+        comic['comic_script'] = "No comic script available"
+    
+    # Ensure date is in the correct format for display
+    if 'date' in comic and comic['date']:
+        try:
+            if isinstance(comic['date'], str):
+                # If it's already a string, try to parse it as a date
+                comic['date'] = datetime.strptime(comic['date'], '%Y-%m-%d').strftime('%Y-%m-%d')
+            elif isinstance(comic['date'], datetime):
+                comic['date'] = comic['date'].strftime('%Y-%m-%d')
+            else:
+                app_logger.warning(f"Unexpected date format for comic: {comic.get('title', 'Unknown')}")
+                comic['date'] = str(comic['date'])  # Convert to string as a fallback
+            app_logger.debug(f"Successfully processed date for comic: {comic.get('title', 'Unknown')}, Date: {comic['date']}")
+        except ValueError:
+            app_logger.error(f"Invalid date format for comic: {comic.get('title', 'Unknown')}")
+            comic['date'] = "Unknown Date"
+    else:
+        comic['date'] = "Unknown Date"
+    
+    # Parse panel summaries from comic_summary
+    if 'comic_summary' in comic and comic['comic_summary']:
+        panel_summaries = []
+        summary_lines = comic['comic_summary'].split('\n')
+        for i, line in enumerate(summary_lines):
+            if line.startswith('Panel '):
+                parts = line.split(': ', 1)
+                if len(parts) > 1:
+                    panel_summaries.append(parts[1])
+                else:
+                    # If the current line doesn't have a summary, check the next line
+                    if i + 1 < len(summary_lines):
+                        panel_summaries.append(summary_lines[i + 1].strip())
+                    else:
+                        panel_summaries.append("Panel summary not available")
+        comic['panel_summaries'] = panel_summaries if panel_summaries else ["Panel summary not available"] * 3
+    else:
+        comic['panel_summaries'] = ["Panel summary not available"] * 3
+    
+    # Ensure we always have exactly 3 panel summaries
+    while len(comic['panel_summaries']) < 3:
+        comic['panel_summaries'].append("Panel summary not available")
+    comic['panel_summaries'] = comic['panel_summaries'][:3]
+    return comic
+
 @comic_bp.route('/view_all_comics')
 @login_required
 def view_all_comics():
@@ -598,6 +627,8 @@ def view_all_comics():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     location = request.args.get('location')
+    after = request.args.get('after')
+    search = request.args.get('search', '').strip()
     
     # Convert date strings to datetime objects
     if start_date:
@@ -605,135 +636,22 @@ def view_all_comics():
     if end_date:
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
-    app_logger.debug(f"Filtering comics - Start Date: {start_date}, End Date: {end_date}, Location: {location}")
+    app_logger.debug(f"Filtering comics - Start Date: {start_date}, End Date: {end_date}, Location: {location}, Search: {search}, After: {after}")
     
     user_id = session['user']['id']
     is_admin = session['user']['role'] == 'admin'
-    comics = db.get_filtered_comics(user_id, is_admin, start_date, end_date, location)
-    app_logger.info(f"Viewing filtered comics: {len(comics)} comics found")
+    comics, next_cursor = db.get_comic_page(user_id, is_admin, start_date, end_date, location, after=after, search=search)
+    app_logger.info(f"Viewing filtered comics: {len(comics)} comics on this page")
     
-    unique_comics = []
-    seen_titles = set()
-    seen_stories = set()
-
+    # get_comic_page lists each title and story once across all pages, so no
+    # de-duplication is needed here
     for comic in comics:
-        title = comic.get('title', '')
-        story = comic.get('story', comic.get('original_story', ''))
-        
-        if title not in seen_titles and story not in seen_stories:
-            seen_titles.add(title)
-            seen_stories.add(story)
-
-            if 'image_path' in comic and comic['image_path']:
-                app_logger.debug(f"Original image path: {comic['image_path']}")
-                # Handle both comma-separated strings and list of paths
-                if isinstance(comic['image_path'], str):
-                    image_paths = [path.strip() for path in comic['image_path'].split(',') if path.strip()]
-                elif isinstance(comic['image_path'], list):
-                    image_paths = comic['image_path']
-                else:
-                    image_paths = [comic['image_path']]
-                
-                comic['image_paths'] = []
-                app_logger.debug(f"Processing image paths for comic {title}: {image_paths}")
-                
-                for path in image_paths:
-                    # Clean up any path issues
-                    path = path.strip()
-                    
-                    # Check if path exists directly
-                    if os.path.exists(path):
-                        app_logger.debug(f"Image exists at absolute path: {path}")
-                        relative_path = os.path.relpath(path, current_app.config['GENERATED_IMAGES_FOLDER'])
-                        comic['image_paths'].append(url_for('media.serve_image', filename=relative_path))
-                        continue
-                    
-                    # Try with the GENERATED_IMAGES_FOLDER prefix
-                    full_path = os.path.join(current_app.config['GENERATED_IMAGES_FOLDER'], path)
-                    if os.path.exists(full_path):
-                        app_logger.debug(f"Image exists at combined path: {full_path}")
-                        comic['image_paths'].append(url_for('media.serve_image', filename=path))
-                        continue
-                        
-                    # Try with variations of path formatting
-                    if path.startswith('./output/'):
-                        # Remove the ./output/ prefix
-                        clean_path = path[9:]
-                        full_path = os.path.join(current_app.config['GENERATED_IMAGES_FOLDER'], clean_path)
-                        if os.path.exists(full_path):
-                            app_logger.debug(f"Image exists at clean path: {full_path}")
-                            comic['image_paths'].append(url_for('media.serve_image', filename=clean_path))
-                            continue
-                    
-                    # If we got here, the image wasn't found
-                    app_logger.warning(f"Image file not found for any path variation: {path}")
-            else:
-                app_logger.warning(f"Comic missing image path: {comic.get('title', 'Unknown')}")
-                comic['image_paths'] = []
-            
-            if 'audio_path' in comic and comic['audio_path']:
-                audio_path = comic['audio_path']
-                if not os.path.isabs(audio_path):
-                    audio_path = os.path.join(current_app.config['GENERATED_IMAGES_FOLDER'], 'audio', audio_path)
-                if os.path.exists(audio_path):
-                    relative_audio_path = os.path.relpath(audio_path, os.path.join(current_app.config['GENERATED_IMAGES_FOLDER'], 'audio'))
-                    comic['audio_path'] = url_for('media.serve_audio', filename=relative_audio_path)
-                else:
-                    app_logger.warning(f"Audio file not found: {audio_path}")
-                    comic['audio_path'] = None
-            else:
-                comic['audio_path'] = None
-            
-            if 'comic_script' not in comic or not comic['comic_script']:
-                comic['comic_script'] = "No comic script available"
-            
-            # Ensure date is in the correct format for display
-            if 'date' in comic and comic['date']:
-                try:
-                    if isinstance(comic['date'], str):
-                        # If it's already a string, try to parse it as a date
-                        comic['date'] = datetime.strptime(comic['date'], '%Y-%m-%d').strftime('%Y-%m-%d')
-                    elif isinstance(comic['date'], datetime):
-                        comic['date'] = comic['date'].strftime('%Y-%m-%d')
-                    else:
-                        app_logger.warning(f"Unexpected date format for comic: {comic.get('title', 'Unknown')}")
-                        comic['date'] = str(comic['date'])  # Convert to string as a fallback
-                    app_logger.debug(f"Successfully processed date for comic: {comic.get('title', 'Unknown')}, Date: {comic['date']}")
-                except ValueError:
-                    app_logger.error(f"Invalid date format for comic: {comic.get('title', 'Unknown')}")
-                    comic['date'] = "Unknown Date"
-            else:
-                comic['date'] = "Unknown Date"
-            
-            # Ensure story is properly populated
-            if 'story' not in comic or not comic['story']:
-                comic['story'] = comic.get('original_story', "Story not available")
-            
-            # Parse panel summaries from comic_summary
-            if 'comic_summary' in comic and comic['comic_summary']:
-                panel_summaries = []
-                summary_lines = comic['comic_summary'].split('\n')
-                for i, line in enumerate(summary_lines):
-                    if line.startswith('Panel '):
-                        parts = line.split(': ', 1)
-                        if len(parts) > 1:
-                            panel_summaries.append(parts[1])
-                        else:
-                            # If the current line doesn't have a summary, check the next line
-                            if i + 1 < len(summary_lines):
-                                panel_summaries.append(summary_lines[i + 1].strip())
-                            else:
-                                panel_summaries.append("Panel summary not available")
-                comic['panel_summaries'] = panel_summaries if panel_summaries else ["Panel summary not available"] * 3
-            else:
-                comic['panel_summaries'] = ["Panel summary not available"] * 3
-            
-            # Ensure we always have exactly 3 panel summaries
-            while len(comic['panel_summaries']) < 3:
-                comic['panel_summaries'].append("Panel summary not available")
-            comic['panel_summaries'] = comic['panel_summaries'][:3]
+        # The listing only carries an excerpt; the full story is loaded by comic_detail
+        comic['story'] = comic.get('story_excerpt') or "Story not available"
+        comic['story_truncated'] = bool(comic.get('story_truncated'))
 
-            unique_comics.append(comic)
+    assets = db.get_comic_assets([comic['id'] for comic in comics])
+    unique_comics = [prepare_comic_for_display(comic, assets[comic['id']]) for comic in comics]
     
     locations = get_unique_locations()
     return render_template('view_all_comics.html', 
@@ -741,4 +659,33 @@ def view_all_comics():
                            locations=locations, 
                            start_date=start_date.strftime('%Y-%m-%d') if start_date else '',
                            end_date=end_date.strftime('%Y-%m-%d') if end_date else '',
-                           selected_location=location)
+                           selected_location=location,
+                           search=search,
+                           is_first_page=not after,
+                           next_cursor=next_cursor)
+
+@comic_bp.route('/comic_stats')
+@admin_required
+def comic_stats():
+    db = get_db()
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    return jsonify({
+        'locations': db.get_location_stats(),
+        'dates': db.get_date_stats(start_date, end_date)
+    })
+
+@comic_bp.route('/comic/<int:comic_id>')
+@login_required
+def comic_detail(comic_id):
+    db = get_db()
+    user_id = session['user']['id']
+    is_admin = session['user']['role'] == 'admin'
+    comic = db.get_comic_detail(comic_id, user_id, is_admin)
+    if not comic:
+        flash('Comic not found.', 'error')
+        return redirect(url_for('comic.view_all_comics'))
+    
+    comic['story'] = comic.get('original_story') or "Story not available"
+    assets = db.get_comic_assets([comic_id])[comic_id]
+    return render_template('comic_detail.html', comic=prepare_comic_for_display(comic, assets))
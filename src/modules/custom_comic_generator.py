@@ -1,7 +1,6 @@
 import os
 import re
 import requests
-import sqlite3
 from datetime import datetime
 from PIL import Image
 
@@ -36,8 +35,8 @@ def generate_custom_comic(title, story, location, user_id, comic_artist_style, p
             progress_callback(0, "Checking for existing comics")
         
         # Check if a similar comic already exists
-        existing_comics = ComicDatabase.get_all_comics(user_id)
-        similar_comic = next((comic for comic in existing_comics if is_similar_story(story, comic['original_story'])), None)
+        candidates = ComicDatabase.get_similar_story_candidates(story, user_id)
+        similar_comic = next((comic for comic in candidates if is_similar_story(story, comic['original_story'])), None)
         if similar_comic:
             app_logger.debug(f"Similar comic already exists for story: {title}. Returning existing comic.")
             panel_summaries = parse_panel_summaries(similar_comic['comic_summary'])
@@ -148,54 +147,23 @@ def generate_custom_comic(title, story, location, user_id, comic_artist_style, p
         image_path_str = ",".join(relative_image_paths)
         app_logger.debug(f"Saving image paths to database: {image_path_str}")
         
-        # Execute a direct SQL query to ensure the comic is saved correctly
-        try:
-            conn = sqlite3.connect(config.DB_PATH)
-            cursor = conn.cursor()
-            
-            # Insert using direct SQL to avoid parameter order issues
-            cursor.execute('''
-                INSERT INTO comics (user_id, title, location, original_story, comic_script, comic_summary, 
-                                   story_source_url, image_path, audio_path, date, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                user_id, 
-                title, 
-                location, 
-                story, 
-                event_analysis, 
-                comic_summary, 
-                "", 
-                image_path_str, 
-                audio_path, 
-                datetime.now().date(), 
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            ))
-            
-            conn.commit()
-            conn.close()
-            app_logger.debug(f"Successfully saved comic to database with direct SQL: {title}")
-        except Exception as e:
-            app_logger.error(f"Error saving to database with direct SQL: {e}")
-            
-            # Fall back to the regular method
-            try:
-                ComicDatabase.add_comic(
-                    user_id=user_id,
-                    title=title, 
-                    location=location, 
-                    original_story=story, 
-                    comic_script=event_analysis, 
-                    comic_summary=comic_summary, 
-                    story_source_url="",
-                    image_path=image_path_str,
-                    audio_path=audio_path, 
-                    date=datetime.now().date()
-                )
-                app_logger.debug("Fallback to ComicDatabase.add_comic succeeded")
-            except Exception as e2:
-                app_logger.error(f"Both database save methods failed: {e2}")
-                return None
+        # Insert with keyword arguments to avoid parameter order issues
+        comic_id = ComicDatabase.add_comic(
+            user_id=user_id,
+            title=title,
+            location=location,
+            original_story=story,
+            comic_script=event_analysis,
+            comic_summary=comic_summary,
+            story_source_url="",
+            image_path=image_path_str,
+            audio_path=audio_path,
+            date=datetime.now().date()
+        )
+        if comic_id is None:
+            app_logger.error(f"Failed to save comic to database: {title}")
+            return None
+        app_logger.debug(f"Successfully saved comic to database: {title}")
 
         # Print summary for the user
         app_logger.debug(f"Custom comic generation completed for {title} in {location}!")
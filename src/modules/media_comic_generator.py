@@ -4,7 +4,7 @@ from datetime import datetime
 from PIL import Image
 
 from logger import app_logger
-from utils import analyze_frames, save_summary, save_image
+from utils import analyze_frames, analyze_images, save_summary, save_image
 from text_analysis import analyze_text_ollama, speak_elevenLabs
 from video_processing import get_video_summary
 from database import ComicDatabase
@@ -52,6 +52,9 @@ def generate_media_comic(media_type, path, location, user_id, comic_artist_style
         all_panel_summaries = []
         audio_paths = []
 
+        # Caption every image up front so the model runs full batches instead of one image per call
+        image_analyses = analyze_images(media_paths) if media_type == 'image' and len(media_paths) > 1 else {}
+
         total_steps = len(media_paths)
         for i, media_path in enumerate(media_paths):
             if progress_callback:
@@ -60,7 +63,8 @@ def generate_media_comic(media_type, path, location, user_id, comic_artist_style
             if media_type == 'video':
                 result = process_video(media_path, location, user_id, comic_artist_style, progress_callback)
             else:  # image
-                result = process_image(media_path, location, user_id, comic_artist_style, progress_callback)
+                result = process_image(media_path, location, user_id, comic_artist_style, progress_callback,
+                                       image_analysis=image_analyses.get(media_path))
 
             if result:
                 images, summary, script, panels, audio = result
@@ -99,8 +103,8 @@ def process_video(media_path, location, user_id, comic_artist_style, progress_ca
         return None
 
     # Check if a similar comic already exists
-    existing_comics = ComicDatabase.get_all_comics(user_id)
-    similar_comic = next((comic for comic in existing_comics if is_similar_story(video_summary, comic['original_story'])), None)
+    candidates = ComicDatabase.get_similar_story_candidates(video_summary, user_id)
+    similar_comic = next((comic for comic in candidates if is_similar_story(video_summary, comic['original_story'])), None)
     if similar_comic:
         app_logger.info(f"Similar comic already exists for video: {media_path}. Skipping this video.")
         return (similar_comic['image_path'].split(','), 
@@ -137,9 +141,10 @@ def process_video(media_path, location, user_id, comic_artist_style, progress_ca
 
     return image_paths, video_summary, event_analysis, panel_summaries, audio_path
 
-def process_image(media_path, location, user_id, comic_artist_style, progress_callback=None):
+def process_image(media_path, location, user_id, comic_artist_style, progress_callback=None, image_analysis=None):
     """Helper function to process an image file and generate a comic."""
-    image_analysis = analyze_frames(media_path)
+    if not image_analysis:
+        image_analysis = analyze_frames(media_path)
     if not image_analysis:
         app_logger.error(f"Failed to analyze image: {media_path}")
         return None
@@ -148,8 +153,8 @@ def process_image(media_path, location, user_id, comic_artist_style, progress_ca
     image_description = " ".join(image_analysis)
 
     # Check if a similar comic already exists
-    existing_comics = ComicDatabase.get_all_comics(user_id)
-    similar_comic = next((comic for comic in existing_comics if is_similar_story(image_description, comic['original_story'])), None)
+    candidates = ComicDatabase.get_similar_story_candidates(image_description, user_id)
+    similar_comic = next((comic for comic in candidates if is_similar_story(image_description, comic['original_story'])), None)
     if similar_comic:
         app_logger.info(f"Similar comic already exists for image: {media_path}. Skipping this image.")
         return (similar_comic['image_path'].split(','),
@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+from datetime import datetime
+from config import load_config
+from database import ComicDatabase
+from logger import app_logger
+
+config = load_config()
+
+def _scan_output_folder(output_dir):
+    """
+    Yield every comic PNG under OUTPUT_DIR/<location>/<YYYY_MM_DD>/.
+
+    Folders whose names are not dates are skipped instead of aborting the scan.
+
+    Yields:
+        tuple: (location, date, date_path, file_name, stat_result)
+    """
+    for location_entry in os.scandir(output_dir):
+        if not location_entry.is_dir():
+            continue
+        location = location_entry.name.replace('_', ' ')
+        for date_entry in os.scandir(location_entry.path):
+            if not date_entry.is_dir():
+                continue
+            try:
+                date = datetime.strptime(date_entry.name, "%Y_%m_%d").date()
+            except ValueError:
+                app_logger.debug(f"Skipping non-date folder in output directory: {date_entry.path}")
+                continue
+            for file_entry in os.scandir(date_entry.path):
+                if file_entry.name.endswith('.png') and file_entry.is_file():
+                    yield location, date, date_entry.path, file_entry.name, file_entry.stat()
+
+def _read_sidecars(date_path, file_name):
+    """Read the summary text and locate the narration that sit next to a comic PNG."""
+    summary_path = os.path.join(date_path, file_name.replace('.png', '_summary.txt'))
+    try:
+        summary_mtime = os.path.getmtime(summary_path)
+        with open(summary_path, 'r') as f:
+            original_story = f.read()
+    except OSError:
+        summary_mtime = None
+        original_story = "Summary not available"
+
+    audio_path = os.path.join(date_path, file_name.replace('.png', '.mp3'))
+    if not os.path.exists(audio_path):
+        audio_path = None
+    return original_story, summary_mtime, audio_path
+
+def _index_file(entry, location, date, date_path, file_name, stat, image_path, relative_path):
+    """Index one comic PNG in its own transaction and return the counts key it falls under."""
+    summary_path = os.path.join(date_path, file_name.replace('.png', '_summary.txt'))
+    summary_mtime = os.path.getmtime(summary_path) if os.path.exists(summary_path) else None
+
+    if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size \
+            and entry['summary_mtime'] == summary_mtime:
+        return 'unchanged'
+
+    # Read the sidecars before taking the write lock
+    original_story, summary_mtime, audio_path = _read_sidecars(date_path, file_name)
+    with ComicDatabase.transaction():
+        if entry and entry['comic_id'] is not None:
+            comic_id, owned = entry['comic_id'], entry['owned']
+            if owned:
+                ComicDatabase.update_indexed_comic(comic_id, original_story, audio_path)
+                result = 'updated'
+            else:
+                result = 'unchanged'
+        else:
+            comic_id = ComicDatabase.find_comic_id_by_image_path(image_path, relative_path)
+            owned = comic_id is None
+            if owned:
+                title = file_name.replace('ggs_grizzly_news_', '').replace('.png', '').replace('_', ' ')
+                comic_id = ComicDatabase.add_comic(
+                    None, title, location, original_story,
+                    "Comic script not available", "Comic summary not available", "",
+                    image_path, audio_path, date
+                )
+                result = 'added'
+            else:
+                result = 'linked'
+
+        ComicDatabase.upsert_output_manifest_entry(relative_path, stat.st_mtime, stat.st_size,
+                                                   summary_mtime, comic_id, owned)
+    return result
+
+def index_output_folder(output_dir=None):
+    """
+    Bring the comics table up to date with the PNGs in the output folder.
+
+    Each PNG is recorded in the output_manifest table with its mtime and size (and the
+    mtime of its summary file), so files already indexed and unchanged are skipped
+    without being opened. New files are linked to the comic that already references
+    them, or ingested as a new comic otherwise; changed files refresh the story and
+    audio of comics the indexer created. Manifest entries of deleted files are
+    dropped, but their comics are kept. Running the indexer again is a no-op.
+
+    Each file is committed on its own, so the write lock is only held briefly and a
+    file that cannot be read is logged and skipped without losing the others.
+
+    Args:
+        output_dir (str, optional): The folder to index. Defaults to config.OUTPUT_DIR.
+
+    Returns:
+        dict: Counts of 'added', 'linked', 'updated', 'unchanged', 'failed' and
+        'removed' files.
+    """
+    output_dir = output_dir or config.OUTPUT_DIR
+    counts = {'added': 0, 'linked': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'removed': 0}
+    if not output_dir or not os.path.isdir(output_dir):
+        app_logger.warning(f"Output directory not found, skipping output folder indexing: {output_dir}")
+        return counts
+
+    manifest = ComicDatabase.get_output_manifest()
+    seen = set()
+    for location, date, date_path, file_name, stat in _scan_output_folder(output_dir):
+        image_path = os.path.join(date_path, file_name)
+        relative_path = os.path.relpath(image_path, output_dir)
+        seen.add(relative_path)
+        try:
+            result = _index_file(manifest.get(relative_path), location, date, date_path, file_name,
+                                 stat, image_path, relative_path)
+        except Exception as e:
+            # One unreadable file (bad sidecar encoding, corrupt PNG) must not stop the scan;
+            # it has no manifest entry, so the next run retries it
+            app_logger.error(f"Error indexing output file {image_path}, skipping it: {e}")
+            result = 'failed'
+        counts[result] += 1
+
+    removed = [path for path in manifest if path not in seen]
+    ComicDatabase.delete_output_manifest_entries(removed)
+    counts['removed'] = len(removed)
+
+    app_logger.info(f"Indexed output folder {output_dir}: {counts['added']} added, {counts['linked']} linked, "
+                    f"{counts['updated']} updated, {counts['unchanged']} unchanged, {counts['failed']} failed, "
+                    f"{counts['removed']} removed")
+    return counts
+
+def _run_indexer(interval):
+    try:
+        while True:
+            try:
+                index_output_folder()
+            except Exception as e:
+                app_logger.error(f"Error indexing output folder: {e}")
+            if interval <= 0:
+                break
+            time.sleep(interval)
+    finally:
+        ComicDatabase.close()
+
+def start_background_indexer():
+    """
+    Index the output folder on a daemon thread so startup does not wait for the scan.
+
+    Runs once, or every OUTPUT_INDEX_INTERVAL seconds when that is positive. Does
+    nothing when OUTPUT_INDEXER_ENABLED is false.
+
+    Returns:
+        threading.Thread: The indexer thread, or None if indexing is disabled.
+    """
+    if not config.OUTPUT_INDEXER_ENABLED:
+        app_logger.info("Output folder indexer disabled")
+        return None
+    thread = threading.Thread(target=_run_indexer, args=(config.OUTPUT_INDEX_INTERVAL,),
+                              name='output-indexer', daemon=True)
+    thread.start()
+    return thread
+
+if __name__ == '__main__':
+    ComicDatabase.initialize_database()
+    index_output_folder()
+    ComicDatabase.close_pools()
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from config import load_config
+from lazy_imports import lazy_import
+from logger import app_logger
+
+config = load_config()
+
+torch = lazy_import('torch')
+
+class PromptEmbeddingCache:
+    """
+    Content-addressed cache of FLUX text-encoder outputs.
+
+    Encoding a prompt runs both the T5 and CLIP encoders; on CPU-only hosts that is a
+    large share of each image. Entries are keyed by a SHA-256 of the model, sequence
+    length and full prompt text, so a retried or repeated prompt reuses its
+    prompt_embeds and pooled_prompt_embeds. The most recent
+    PROMPT_EMBEDDING_CACHE_SIZE entries are kept in memory, and when
+    PROMPT_EMBEDDING_CACHE_DIR is set every entry is also written there and survives
+    restarts.
+
+    Example:
+        prompt_embeds, pooled_prompt_embeds = prompt_embedding_cache.encode(pipe, prompts, model_key)
+        images = pipe(prompt_embeds=prompt_embeds, pooled_prompt_embeds=pooled_prompt_embeds).images
+    """
+
+    def __init__(self, max_entries=None, directory=None):
+        self._max_entries = max_entries
+        self._directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_entries(self):
+        return config.PROMPT_EMBEDDING_CACHE_SIZE if self._max_entries is None else self._max_entries
+
+    @property
+    def directory(self):
+        return self._directory if self._directory is not None else config.PROMPT_EMBEDDING_CACHE_DIR
+
+    @staticmethod
+    def key(model_key, prompt, max_sequence_length):
+        payload = json.dumps([model_key, max_sequence_length, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.pt")
+
+    def _remember(self, key, embeddings):
+        # Called with self._lock held
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = embeddings
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        Look up cached embeddings in memory, then on disk.
+
+        Returns:
+            tuple: (prompt_embeds, pooled_prompt_embeds) on the CPU, or None.
+        """
+        with self._lock:
+            embeddings = self._entries.get(key)
+            if embeddings is not None:
+                self._entries.move_to_end(key)
+                return embeddings
+        if not self.directory:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            stored = torch.load(path, map_location='cpu', weights_only=True)
+            embeddings = (stored['prompt_embeds'], stored['pooled_prompt_embeds'])
+        except Exception as e:
+            app_logger.warning(f"Ignoring unreadable prompt embedding cache entry {path}: {e}")
+            return None
+        with self._lock:
+            self._remember(key, embeddings)
+        return embeddings
+
+    def put(self, key, prompt_embeds, pooled_prompt_embeds):
+        """Store one prompt's embeddings, moving them to the CPU first."""
+        embeddings = (prompt_embeds.detach().cpu(), pooled_prompt_embeds.detach().cpu())
+        with self._lock:
+            self._remember(key, embeddings)
+        if not self.directory:
+            return
+        path = self._path(key)
+        # Write then rename so a concurrent reader never loads a partial file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            torch.save({'prompt_embeds': embeddings[0], 'pooled_prompt_embeds': embeddings[1]}, temp_path)
+            os.replace(temp_path, path)
+        except Exception as e:
+            app_logger.warning(f"Could not write prompt embedding cache entry {path}: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def encode(self, pipe, prompts, model_key, max_sequence_length=256):
+        """
+        Get FLUX embeddings for a batch of prompts, encoding only the uncached ones.
+
+        Args:
+            pipe (FluxPipeline): The loaded pipeline, used for cache misses.
+            prompts (list): Prompts in batch order.
+            model_key (str): Identifies the model and LoRA the pipeline was loaded with.
+            max_sequence_length (int): T5 sequence length, as passed to the pipeline.
+
+        Returns:
+            tuple: (prompt_embeds, pooled_prompt_embeds) batched in prompt order, on
+            the pipeline's execution device.
+        """
+        keys = [self.key(model_key, prompt, max_sequence_length) for prompt in prompts]
+        found = {}
+        for key in keys:
+            if key not in found:
+                embeddings = self.get(key)
+                if embeddings is not None:
+                    found[key] = embeddings
+        missing = {}
+        for prompt, key in zip(prompts, keys):
+            if key not in found:
+                missing.setdefault(key, prompt)
+
+        hits = len(prompts) - sum(1 for key in keys if key in missing)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(prompts) - hits
+        app_logger.debug(f"Prompt embedding cache: {hits} of {len(prompts)} prompts cached")
+
+        device = pipe._execution_device
+        if missing:
+            prompt_embeds, pooled_prompt_embeds, _ = pipe.encode_prompt(
+                prompt=list(missing.values()),
+                prompt_2=None,
+                device=device,
+                max_sequence_length=max_sequence_length,
+            )
+            for index, key in enumerate(missing):
+                self.put(key, prompt_embeds[index:index + 1], pooled_prompt_embeds[index:index + 1])
+                found[key] = (prompt_embeds[index:index + 1], pooled_prompt_embeds[index:index + 1])
+
+        return (torch.cat([found[key][0].to(device) for key in keys]),
+                torch.cat([found[key][1].to(device) for key in keys]))
+
+    def clear(self):
+        """Drop the in-memory entries; the on-disk store is kept."""
+        with self._lock:
+            self._entries.clear()
+
+# Shared by every FLUX request in this process
+prompt_embedding_cache = PromptEmbeddingCache()
@@ -0,0 +1,296 @@
+"""
+Cold-start profiler for web_app.py and main.py.
+
+Enable it with the --profile-startup flag or the PROFILE_STARTUP environment variable:
+
+    python src/web_app.py --profile-startup                  # print a ranked report
+    python src/main.py --profile-startup=startup.json        # write a JSON report
+    PROFILE_STARTUP=1 gunicorn 'web_app:create_app()[0]'
+
+It records the wall time of every module imported after it is enabled and of each
+startup step wrapped in step(). Compare two JSON reports to find regressions:
+
+    python src/startup_profiler.py before.json after.json
+
+This module only uses the standard library and must be imported before anything it
+should measure, which is why it does not read the .env file.
+"""
+import contextlib
+import importlib.abc
+import json
+import os
+import sys
+import threading
+import time
+
+ENV_VAR = 'PROFILE_STARTUP'
+FLAG = '--profile-startup'
+
+# Rows shown in the printed report; JSON reports keep every import
+REPORT_LIMIT = 30
+
+_profiler = None
+
+class _TimedLoader:
+    """Wraps a loader so exec_module is timed, then puts the original back on the module."""
+
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._import_started()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._import_finished(module.__name__)
+            module.__loader__ = self._loader
+            if module.__spec__ is not None:
+                module.__spec__.loader = self._loader
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    def __init__(self, profiler):
+        self._profiler = profiler
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._local, 'finding', False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimedLoader(spec.loader, self._profiler)
+        return spec
+
+class StartupProfiler:
+    """
+    Records module import times and named startup steps.
+
+    Import times are split like `python -X importtime`: cumulative time includes the
+    modules a module imported, self time does not. Only imports on the thread that
+    enabled the profiler are timed, so background threads cannot skew the numbers.
+    """
+
+    def __init__(self, output=None):
+        self.output = output
+        self.started = time.perf_counter()
+        self.imports = {}
+        self.steps = []
+        self._finder = _ImportTimer(self)
+        self._stack = []
+        self._thread = threading.get_ident()
+
+    def install(self):
+        if self._finder not in sys.meta_path:
+            sys.meta_path.insert(0, self._finder)
+
+    def uninstall(self):
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+    def _import_started(self):
+        if threading.get_ident() == self._thread:
+            # [start time, time spent importing children]
+            self._stack.append([time.perf_counter(), 0.0])
+
+    def _import_finished(self, name):
+        if threading.get_ident() != self._thread or not self._stack:
+            return
+        start, children = self._stack.pop()
+        cumulative = time.perf_counter() - start
+        if self._stack:
+            self._stack[-1][1] += cumulative
+        self.imports[name] = {
+            'module': name,
+            'self_seconds': cumulative - children,
+            'cumulative_seconds': cumulative,
+        }
+
+    @contextlib.contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append({'name': name, 'seconds': time.perf_counter() - start})
+
+    def report(self):
+        """
+        Build the report of everything recorded so far.
+
+        Returns:
+            dict: Total wall time, imports ranked by self time and steps in the order
+            they ran.
+        """
+        return {
+            'entry_point': os.path.basename(sys.argv[0]) if sys.argv else None,
+            'python': sys.version.split()[0],
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'total_seconds': time.perf_counter() - self.started,
+            'import_seconds': sum(entry['self_seconds'] for entry in self.imports.values()),
+            'imports': sorted(self.imports.values(), key=lambda entry: entry['self_seconds'], reverse=True),
+            'steps': list(self.steps),
+        }
+
+def format_report(report, limit=REPORT_LIMIT):
+    """
+    Format a startup report as a ranked text table.
+
+    Args:
+        report (dict): A report from StartupProfiler.report().
+        limit (int): Number of imports to list.
+
+    Returns:
+        str: The table.
+    """
+    lines = [
+        f"Startup profile for {report['entry_point']}: {report['total_seconds']:.3f}s total, "
+        f"{report['import_seconds']:.3f}s in {len(report['imports'])} imports",
+        "",
+        f"{'Startup step':<48} {'Seconds':>10}",
+    ]
+    for step in sorted(report['steps'], key=lambda step: step['seconds'], reverse=True):
+        lines.append(f"{step['name']:<48} {step['seconds']:>10.3f}")
+    lines += ["", f"{'Module':<48} {'Self (s)':>10} {'Cumulative (s)':>15}"]
+    for entry in report['imports'][:limit]:
+        lines.append(f"{entry['module']:<48} {entry['self_seconds']:>10.3f} {entry['cumulative_seconds']:>15.3f}")
+    return '\n'.join(lines)
+
+def compare_reports(old, new, limit=REPORT_LIMIT):
+    """
+    Compare two startup reports, such as ones written before and after a release.
+
+    Args:
+        old (dict): The baseline report.
+        new (dict): The report to check.
+        limit (int): Number of modules to list.
+
+    Returns:
+        str: Total and per-step changes, then the modules whose self time grew most.
+    """
+    lines = [f"Total: {old['total_seconds']:.3f}s -> {new['total_seconds']:.3f}s "
+             f"({new['total_seconds'] - old['total_seconds']:+.3f}s)"]
+    old_steps = {step['name']: step['seconds'] for step in old['steps']}
+    for step in new['steps']:
+        before = old_steps.get(step['name'], 0.0)
+        lines.append(f"  {step['name']:<46} {before:>8.3f} -> {step['seconds']:>8.3f} ({step['seconds'] - before:+.3f})")
+    old_imports = {entry['module']: entry['self_seconds'] for entry in old['imports']}
+    new_imports = {entry['module']: entry['self_seconds'] for entry in new['imports']}
+    deltas = sorted(((new_imports.get(name, 0.0) - old_imports.get(name, 0.0), name)
+                     for name in set(old_imports) | set(new_imports)), reverse=True)
+    lines += ["", f"{'Module':<48} {'Before (s)':>10} {'After (s)':>10} {'Change':>8}"]
+    for delta, name in deltas[:limit]:
+        lines.append(f"{name:<48} {old_imports.get(name, 0.0):>10.3f} {new_imports.get(name, 0.0):>10.3f} {delta:>+8.3f}")
+    return '\n'.join(lines)
+
+def enable(output=None):
+    """
+    Start profiling imports and startup steps.
+
+    Args:
+        output (str): Path to write a JSON report to, or None to print a table.
+
+    Returns:
+        StartupProfiler: The active profiler.
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = StartupProfiler(output)
+        _profiler.install()
+    return _profiler
+
+def enable_from_environment(argv=None):
+    """
+    Enable the profiler if the --profile-startup flag or PROFILE_STARTUP is set.
+
+    The flag is removed from `argv` so later argument parsing does not see it. A value
+    (--profile-startup=PATH, or PROFILE_STARTUP=PATH) is where the JSON report is written;
+    without one, or with PROFILE_STARTUP=1, the report is printed.
+
+    Args:
+        argv (list): Command line arguments; defaults to sys.argv.
+
+    Returns:
+        bool: True if profiling is enabled.
+    """
+    argv = sys.argv if argv is None else argv
+    requested = False
+    output = None
+    for arg in list(argv[1:]):
+        if arg == FLAG or arg.startswith(FLAG + '='):
+            argv.remove(arg)
+            requested = True
+            output = arg.partition('=')[2] or None
+    value = os.getenv(ENV_VAR, '').strip()
+    if not requested and value and value.lower() not in ('0', 'false', 'no'):
+        requested = True
+        output = None if value.lower() in ('1', 'true', 'yes') else value
+    if requested:
+        enable(output)
+    return is_enabled()
+
+def is_enabled():
+    return _profiler is not None
+
+def step(name):
+    """
+    Time a startup step in the report; does nothing when profiling is off.
+
+    Example:
+        with startup_profiler.step('database bootstrap'):
+            ComicDatabase.bootstrap()
+    """
+    if _profiler is None:
+        return contextlib.nullcontext()
+    return _profiler.step(name)
+
+def finish():
+    """
+    Stop profiling and print or write the report.
+
+    Call once startup is complete, before serving requests or showing the menu.
+
+    Returns:
+        dict: The report, or None if profiling is off.
+    """
+    global _profiler
+    if _profiler is None:
+        return None
+    profiler, _profiler = _profiler, None
+    profiler.uninstall()
+    report = profiler.report()
+    if profiler.output:
+        with open(profiler.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Startup profile written to {profiler.output} ({report['total_seconds']:.3f}s total)")
+    else:
+        print(format_report(report))
+    return report
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3):
+        print(f"Usage: {sys.argv[0]} REPORT.json [NEW_REPORT.json]")
+        sys.exit(2)
+    with open(sys.argv[1]) as f:
+        first = json.load(f)
+    if len(sys.argv) == 2:
+        print(format_report(first))
+    else:
+        with open(sys.argv[2]) as f:
+            print(compare_reports(first, json.load(f)))
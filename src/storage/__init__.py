@@ -0,0 +1,27 @@
+from .base import StorageBackend
+from .sqlite_backend import SQLiteBackend
+
+def create_backend(config):
+    """
+    Create the storage backend selected by config.DB_BACKEND.
+
+    Args:
+        config (Config): The application config; 'sqlite' uses DB_PATH and 'postgres'
+            uses DATABASE_URL.
+
+    Returns:
+        StorageBackend: The backend.
+    """
+    if config.DB_BACKEND == 'sqlite':
+        return SQLiteBackend(config)
+    if config.DB_BACKEND == 'postgres':
+        # Imported here so SQLite deployments do not need psycopg2
+        from .postgres_backend import PostgresBackend
+        return PostgresBackend(config)
+    raise ValueError(f"Unsupported DB_BACKEND: {config.DB_BACKEND}")
+
+__all__ = [
+    'StorageBackend',
+    'SQLiteBackend',
+    'create_backend'
+]
@@ -0,0 +1,97 @@
+import re
+import threading
+
+class StorageBackend:
+    """
+    The database-specific half of ComicDatabase.
+
+    ComicDatabase writes each query once, with ? placeholders and SQL that SQLite and
+    PostgreSQL both accept. A backend supplies the connection pools, cursors that run
+    those queries and return rows addressable by column name, the schema migrations,
+    and the few SQL fragments that differ between databases.
+    """
+
+    name = None
+
+    # SELECT of (id, search_score) for the comics matching one search parameter built
+    # by build_search_query; lower scores rank higher
+    search_matches_sql = None
+
+    # Whether the database compresses large text values itself. Otherwise ComicDatabase
+    # stores the story, script and summary compressed with text_compression.
+    native_text_compression = False
+
+    def __init__(self, config):
+        self.config = config
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _create_pool(self, read_only):
+        raise NotImplementedError
+
+    def get_pool(self, read_only=False):
+        with self._lock:
+            if read_only not in self._pools:
+                self._pools[read_only] = self._create_pool(read_only)
+            return self._pools[read_only]
+
+    def acquire(self, read_only=False):
+        return self.get_pool(read_only).acquire()
+
+    def release(self, connection, read_only=False):
+        self.get_pool(read_only).release(connection)
+
+    def close_all(self):
+        """Close every idle pooled connection."""
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close_all()
+
+    def cursor(self, connection):
+        """Get a cursor on a pooled connection."""
+        raise NotImplementedError
+
+    def migrate(self, connection):
+        """
+        Bring the schema up to date.
+
+        Returns:
+            list: The migration versions applied.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def search_words(search):
+        """Split search box text into plain words, dropping any query syntax."""
+        return re.findall(r'\w+', search or '')
+
+    def build_search_query(self, search):
+        """
+        Turn free text from the search box into the parameter of search_matches_sql.
+
+        All words must match and the last word matches as a prefix.
+
+        Returns:
+            str: The query, or None if the text contains no words.
+        """
+        raise NotImplementedError
+
+    def index_search_text(self, cursor, comic_id, title, original_story, comic_summary, comic_script):
+        """Add the plain text of a new comic to the full-text index, in the caller's transaction."""
+        raise NotImplementedError
+
+    def unindex_search_text(self, cursor, comic_id, title, original_story, comic_summary, comic_script):
+        """Remove a comic from the full-text index, given the plain text it was indexed with."""
+        raise NotImplementedError
+
+    def clear_search_index(self, cursor):
+        """Remove every comic from the full-text index."""
+        raise NotImplementedError
+
+    def substring_position(self, haystack, needle):
+        """SQL expression for the 1-based position of needle in haystack, 0 if absent."""
+        raise NotImplementedError
+
+    def describe(self):
+        """Where this backend stores data, for log messages."""
+        raise NotImplementedError
@@ -0,0 +1,175 @@
+from functools import lru_cache
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+from connection_pool import ConnectionPool
+from logger import app_logger
+from migrations import apply_migrations, POSTGRES_MIGRATIONS
+from migrations.postgres import COMIC_SEARCH_VECTOR
+from .base import StorageBackend
+
+@lru_cache(maxsize=512)
+def translate_placeholders(sql):
+    """Rewrite a query from ? placeholders to psycopg2's %s, escaping literal percent signs."""
+    return sql.replace('%', '%%').replace('?', '%s')
+
+class PostgresCursor:
+    """
+    A psycopg2 cursor that accepts the ? placeholders ComicDatabase queries use.
+
+    A failed statement aborts the whole PostgreSQL transaction, whereas SQLite only
+    fails the statement. The aborted transaction is rolled back before the error is
+    raised, so a mutator that logs the error leaves a usable connection behind; inside
+    ComicDatabase.transaction() the block is rolled back either way.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def _rollback_if_aborted(self):
+        connection = self._cursor.connection
+        if connection.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+            connection.rollback()
+
+    def execute(self, sql, params=None):
+        try:
+            if params is None:
+                self._cursor.execute(sql)
+            else:
+                self._cursor.execute(translate_placeholders(sql), params)
+        except psycopg2.Error:
+            self._rollback_if_aborted()
+            raise
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        if seq_of_params:
+            try:
+                psycopg2.extras.execute_batch(self._cursor, translate_placeholders(sql), seq_of_params)
+            except psycopg2.Error:
+                self._rollback_if_aborted()
+                raise
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+class PostgresConnectionPool(ConnectionPool):
+    """
+    A pool of psycopg2 connections to one PostgreSQL database.
+
+    Connections return rows as dicts. Read-only connections run in autocommit mode
+    with a read-only session, so gallery reads never hold a transaction open between
+    requests and cannot write.
+    """
+
+    def __init__(self, dsn, read_only=False, max_idle=8, statement_timeout_ms=5000):
+        super().__init__(max_idle)
+        self.dsn = dsn
+        self.read_only = read_only
+        self.statement_timeout_ms = statement_timeout_ms
+
+    def _connect(self):
+        connection = psycopg2.connect(self.dsn, cursor_factory=psycopg2.extras.RealDictCursor,
+                                      options=f'-c statement_timeout={int(self.statement_timeout_ms)}')
+        if self.read_only:
+            connection.set_session(readonly=True, autocommit=True)
+        self._opened()
+        app_logger.debug(f"Opened {'read-only' if self.read_only else 'read-write'} PostgreSQL connection")
+        return connection
+
+    def _in_transaction(self, connection):
+        return connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def release(self, connection):
+        if connection.closed:
+            # Dropped by the server or a network error; discard instead of pooling it
+            with self._lock:
+                self._open_count -= 1
+            return
+        if connection.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_INTRANS:
+            # Any SELECT opens a transaction in PostgreSQL; end ones that wrote nothing
+            # quietly so only lost writes are reported
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT txid_current_if_assigned() IS NULL AS read_only')
+                if cursor.fetchone()['read_only']:
+                    connection.rollback()
+        super().release(connection)
+
+class PostgresBackend(StorageBackend):
+    """
+    Stores data in the PostgreSQL database at DATABASE_URL.
+
+    Lets several web nodes share one database. Uses POSTGRES_MIGRATIONS and a GIN
+    index over COMIC_SEARCH_VECTOR for search.
+    """
+
+    name = 'postgres'
+
+    # TOAST compresses large values and moves them out of the heap
+    native_text_compression = True
+
+    # ts_rank weights are {D, C, B, A}: title (A) hits outweigh story, summary and script hits
+    search_matches_sql = f'''
+        SELECT c.id, -ts_rank('{{0.1, 0.2, 0.4, 1.0}}', {COMIC_SEARCH_VECTOR}, q)::float8 AS search_score
+        FROM comics c, to_tsquery('simple', ?) q
+        WHERE ({COMIC_SEARCH_VECTOR}) @@ q
+    '''
+
+    def __init__(self, config):
+        if not config.DATABASE_URL:
+            raise ValueError("DATABASE_URL must be set when DB_BACKEND is postgres")
+        super().__init__(config)
+
+    def _create_pool(self, read_only):
+        return PostgresConnectionPool(
+            self.config.DATABASE_URL,
+            read_only=read_only,
+            max_idle=self.config.DB_POOL_SIZE,
+            statement_timeout_ms=self.config.DB_BUSY_TIMEOUT_MS
+        )
+
+    def cursor(self, connection):
+        return PostgresCursor(connection.cursor())
+
+    def migrate(self, connection):
+        return apply_migrations(connection, POSTGRES_MIGRATIONS, cursor_factory=lambda: self.cursor(connection))
+
+    def build_search_query(self, search):
+        # Words are \w+ only, so quoting them leaves no tsquery syntax in the input
+        words = self.search_words(search)
+        if not words:
+            return None
+        return ' & '.join(f"'{word}'" for word in words) + ':*'
+
+    # The GIN expression index follows the comics columns, which are stored plain
+
+    def index_search_text(self, cursor, comic_id, title, original_story, comic_summary, comic_script):
+        pass
+
+    def unindex_search_text(self, cursor, comic_id, title, original_story, comic_summary, comic_script):
+        pass
+
+    def clear_search_index(self, cursor):
+        pass
+
+    def substring_position(self, haystack, needle):
+        return f'strpos({haystack}, {needle})'
+
+    def describe(self):
+        return psycopg2.extensions.parse_dsn(self.config.DATABASE_URL).get('dbname', 'PostgreSQL')
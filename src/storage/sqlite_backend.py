@@ -0,0 +1,113 @@
+from connection_pool import SQLiteConnectionPool
+from migrations import apply_migrations
+from .base import StorageBackend
+
+def create_base_tables(cursor):
+    """Create the tables that predate schema_migrations; the migrations build on them."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS comics (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            title TEXT NOT NULL,
+            location TEXT NOT NULL,
+            original_story TEXT NOT NULL,
+            comic_script TEXT NOT NULL,
+            comic_summary TEXT,
+            story_source_url TEXT,
+            image_path TEXT NOT NULL,
+            audio_path TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            date DATE NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE,
+            password_hash TEXT NOT NULL,
+            role TEXT NOT NULL,
+            loyalty_points INTEGER DEFAULT 0,
+            last_login TEXT,
+            last_purchase_date DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS loyalty_point_costs (
+            id INTEGER PRIMARY KEY,
+            action_name TEXT UNIQUE NOT NULL,
+            point_cost INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+class SQLiteBackend(StorageBackend):
+    """
+    Stores data in the SQLite file at DB_PATH.
+
+    Uses a read-write and a read-only SQLiteConnectionPool, the versioned MIGRATIONS
+    and the contentless comics_fts FTS5 table for search. comics_fts holds only the
+    index, so ComicDatabase writes the plain text to it; the comics columns may be
+    compressed.
+    """
+
+    name = 'sqlite'
+
+    # bm25() ranks title hits above story, summary and script hits
+    search_matches_sql = '''
+        SELECT rowid AS id, bm25(comics_fts, 10.0, 4.0, 2.0, 1.0) AS search_score
+        FROM comics_fts
+        WHERE comics_fts MATCH ?
+    '''
+
+    def _create_pool(self, read_only):
+        return SQLiteConnectionPool(
+            self.config.DB_PATH,
+            read_only=read_only,
+            max_idle=self.config.DB_POOL_SIZE,
+            busy_timeout_ms=self.config.DB_BUSY_TIMEOUT_MS,
+            cache_size_kb=self.config.DB_CACHE_SIZE_KB,
+            mmap_size=self.config.DB_MMAP_SIZE,
+            cached_statements=self.config.DB_STATEMENT_CACHE_SIZE
+        )
+
+    def cursor(self, connection):
+        return connection.cursor()
+
+    def migrate(self, connection):
+        create_base_tables(connection.cursor())
+        connection.commit()
+        return apply_migrations(connection)
+
+    def build_search_query(self, search):
+        # Quoting every word keeps FTS5 operators and punctuation in the input from
+        # causing syntax errors
+        words = self.search_words(search)
+        if not words:
+            return None
+        return ' '.join(f'"{word}"' for word in words) + '*'
+
+    def index_search_text(self, cursor, comic_id, title, original_story, comic_summary, comic_script):
+        cursor.execute('''
+            INSERT INTO comics_fts (rowid, title, original_story, comic_summary, comic_script)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (comic_id, title, original_story, comic_summary, comic_script))
+
+    def unindex_search_text(self, cursor, comic_id, title, original_story, comic_summary, comic_script):
+        # A contentless table can only delete the exact tokens that were indexed
+        cursor.execute('''
+            INSERT INTO comics_fts (comics_fts, rowid, title, original_story, comic_summary, comic_script)
+            VALUES ('delete', ?, ?, ?, ?, ?)
+        ''', (comic_id, title, original_story, comic_summary, comic_script))
+
+    def clear_search_index(self, cursor):
+        cursor.execute("INSERT INTO comics_fts (comics_fts) VALUES ('delete-all')")
+
+    def substring_position(self, haystack, needle):
+        return f'instr({haystack}, {needle})'
+
+    def describe(self):
+        return self.config.DB_PATH
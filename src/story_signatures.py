@@ -0,0 +1,103 @@
+import hashlib
+import random
+import re
+import unicodedata
+import zlib
+
+def normalize_story(story):
+    """
+    Normalize a story for duplicate detection.
+
+    Applies Unicode NFKC folding, lowercases, and collapses all whitespace runs so that
+    reformatted copies of the same story compare equal.
+
+    Args:
+        story (str): The story text.
+
+    Returns:
+        str: The normalized story.
+    """
+    if not story:
+        return ""
+    story = unicodedata.normalize('NFKC', story)
+    return re.sub(r'\s+', ' ', story).strip().lower()
+
+def story_hash(story):
+    """
+    Compute the content hash stored in comics.story_hash.
+
+    Args:
+        story (str): The story text.
+
+    Returns:
+        str: The hex SHA-256 digest of the normalized story.
+    """
+    return hashlib.sha256(normalize_story(story).encode('utf-8')).hexdigest()
+
+# MinHash parameters. Signatures are persisted in comic_story_bands, so changing any of
+# these requires a migration that rebuilds the bands.
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 32
+MINHASH_ROWS = MINHASH_PERMUTATIONS // MINHASH_BANDS
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                 for rng in [random.Random(0x6772697A7A)] for _ in range(MINHASH_PERMUTATIONS)]
+
+def story_shingles(story):
+    """
+    Split a normalized story into the set of word bigrams MinHash compares.
+
+    Args:
+        story (str): The story text.
+
+    Returns:
+        set: 32-bit hashes of the story's word bigrams (or of its only word).
+    """
+    words = normalize_story(story).split(' ')
+    if words == ['']:
+        return set()
+    if len(words) == 1:
+        return {zlib.crc32(words[0].encode('utf-8'))}
+    return {zlib.crc32(f"{first} {second}".encode('utf-8')) for first, second in zip(words, words[1:])}
+
+def minhash_signature(story):
+    """
+    Compute the MinHash signature of a story.
+
+    The fraction of equal positions in two signatures estimates the Jaccard similarity
+    of the stories' word bigrams.
+
+    Args:
+        story (str): The story text.
+
+    Returns:
+        list: MINHASH_PERMUTATIONS integers, or an empty list for an empty story.
+    """
+    shingles = story_shingles(story)
+    if not shingles:
+        return []
+    return [min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles) for a, b in _PERMUTATIONS]
+
+def story_bands(story):
+    """
+    Compute the locality-sensitive hashing buckets stored in comic_story_bands.
+
+    The signature is cut into MINHASH_BANDS bands of MINHASH_ROWS values and each band
+    is hashed to a signed 64-bit bucket. Stories sharing any bucket are candidate near
+    duplicates; with 32 bands of 2 rows, stories whose bigram Jaccard similarity is 0.3
+    or more collide with probability above 0.95, which covers stories that difflib rates
+    0.9 similar, while unrelated stories share almost no bigrams and rarely collide.
+
+    Args:
+        story (str): The story text.
+
+    Returns:
+        list: (band, bucket) tuples, empty for an empty story.
+    """
+    signature = minhash_signature(story)
+    bands = []
+    for band in range(len(signature) // MINHASH_ROWS):
+        rows = signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]
+        digest = hashlib.blake2b(','.join(map(str, rows)).encode('ascii'), digest_size=8).digest()
+        bands.append((band, int.from_bytes(digest, 'big', signed=True)))
+    return bands
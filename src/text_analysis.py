@@ -3,38 +3,34 @@ import warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning, message=".*BaseChatModel.__call__.*")
 
 import os
-import dotenv
 from datetime import datetime
-from langchain_community.chat_models import ChatOllama
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
 import logging
 
 # Configure more verbose logging for debugging
 logging.basicConfig(level=logging.DEBUG)
 
-# Load environment variables from .env file
-dotenv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env')
-dotenv.load_dotenv(dotenv_path)
+from config import add_reload_listener, load_config
 
-# Set OpenAI API key explicitly for langchain
-os.environ["OPENAI_API_KEY"] = os.getenv("API_KEY_OPENAI", "")
+# The shared config is reloaded in place (toggle_voice, the .env watcher), so this
+# global always holds the current values
+config = load_config()
 
-# Force reload config to ensure we get the latest values
-from importlib import reload
-import config as config_module
-reload(config_module)
-from config import load_config
+def _export_openai_api_key(config):
+    # Set OpenAI API key explicitly for langchain, again after every reload so a
+    # changed API_KEY_OPENAI reaches clients that read the environment
+    os.environ["OPENAI_API_KEY"] = config.OPENAI_API_KEY or ""
 
-# Make sure we've got the freshest config
-config = load_config()
+_export_openai_api_key(config)
+add_reload_listener(_export_openai_api_key)
 
 from api_handlers import elevenlabs_client
 from utils import unload_ollama_model, filter_content
 from logger import app_logger
-from config import load_config
+from lazy_imports import lazy_import
 
-config = load_config()
+# LangChain is only needed once a story is analyzed, not to serve the gallery
+langchain_openai = lazy_import('langchain_openai')
+langchain_schema = lazy_import('langchain.schema')
 
 YOGI_BEAR_VOICE_ID = None  # Global variable to store Yogi Bear voice ID
 
@@ -92,11 +88,8 @@ def extract_panel_summaries(summary):
     return panel_summaries
 
 def summarize_comic_text(text, model=None, system_prompt=None):
-    # Force load the latest config
-    fresh_config = load_config()
-    
-    # Always get the value directly from environment, then fall back to config
-    model_name = os.getenv('OPENAI_TEXT_ANALYZE_MODEL') or (model if model else fresh_config.OPENAI_TEXT_ANALYZE_MODEL)
+    # An OPENAI_TEXT_ANALYZE_MODEL setting overrides the caller's model
+    model_name = os.getenv('OPENAI_TEXT_ANALYZE_MODEL') or model or config.OPENAI_TEXT_ANALYZE_MODEL
     
     # Print direct debug information
     print(f"DEBUG - Using OpenAI model for summary: {model_name}")
@@ -128,13 +121,13 @@ IMPORTANT: Avoid any content that may be considered inappropriate or offensive,
 """
 
         # Use OpenAI instead of Ollama
-        openai_api_key = os.environ.get("OPENAI_API_KEY") or config.OPENAI_API_KEY
+        openai_api_key = config.OPENAI_API_KEY
         if not openai_api_key:
             app_logger.error("OpenAI API key not found. Please set API_KEY_OPENAI in your environment.")
             return "Panel 1: First panel of the comic.\nPanel 2: Second panel of the comic.\nPanel 3: Third panel of the comic."
             
         # Use the same optimal settings for the summary generation
-        chat = ChatOpenAI(
+        chat = langchain_openai.ChatOpenAI(
             model_name=model_name,  # Use the explicitly determined model_name instead of parameter
             temperature=0.7,  # Keep temperature moderate for summaries
             max_tokens=1000,  # Shorter limit for summaries
@@ -142,8 +135,8 @@ IMPORTANT: Avoid any content that may be considered inappropriate or offensive,
         )
         
         messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=text)
+            langchain_schema.SystemMessage(content=system_prompt),
+            langchain_schema.HumanMessage(content=text)
         ]
         
         response = chat(messages)
@@ -161,11 +154,8 @@ def analyze_text_ollama(text, location, comic_artist_style, model=None, system_p
     Note: Despite the function name including 'ollama', this function now uses OpenAI's API.
     The name is kept for backward compatibility with existing code.
     """
-    # Force load the latest config
-    fresh_config = load_config()
-    
-    # Always get the value directly from environment, then fall back to config
-    model_name = os.getenv('OPENAI_TEXT_ANALYZE_MODEL') or (model if model else fresh_config.OPENAI_TEXT_ANALYZE_MODEL)
+    # An OPENAI_TEXT_ANALYZE_MODEL setting overrides the caller's model
+    model_name = os.getenv('OPENAI_TEXT_ANALYZE_MODEL') or model or config.OPENAI_TEXT_ANALYZE_MODEL
     
     # Print direct debug information
     print(f"DEBUG - Using OpenAI model: {model_name}")
@@ -223,8 +213,7 @@ Consistency:
 
         # Use OpenAI instead of Ollama
         try:
-            # Use the API key already set in the environment
-            openai_api_key = os.environ.get("OPENAI_API_KEY") or config.OPENAI_API_KEY
+            openai_api_key = config.OPENAI_API_KEY
             if not openai_api_key:
                 app_logger.error("OpenAI API key not found. Please set API_KEY_OPENAI in your environment.")
                 return None, None, None
@@ -232,7 +221,7 @@ Consistency:
             # Set up ChatOpenAI with appropriate settings for the model
             # For GPT-4-1106-mini, we can use higher temperature for more creative outputs
             # We'll also increase the max_tokens for longer comic scripts
-            chat = ChatOpenAI(
+            chat = langchain_openai.ChatOpenAI(
                 model_name=model_name,  # Use the explicitly determined model_name instead of parameter
                 temperature=0.8,  # Slightly higher for more creative outputs
                 max_tokens=4000,  # Ensure we get full-length scripts
@@ -240,8 +229,8 @@ Consistency:
             )
             
             messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=text)
+                langchain_schema.SystemMessage(content=system_prompt),
+                langchain_schema.HumanMessage(content=text)
             ]
             
             response = chat(messages)
@@ -272,7 +261,7 @@ Panel 2: [Brief summary]
 Panel 3: [Brief summary]"""
                 
                 # Reuse the same chat client with API key already set
-                summary_messages = [HumanMessage(content=summary_prompt)]
+                summary_messages = [langchain_schema.HumanMessage(content=summary_prompt)]
                 summary_response = chat(summary_messages)
                 summary = summary_response.content.strip()
                 panel_summaries = extract_panel_summaries(summary)
@@ -0,0 +1,123 @@
+import struct
+import zlib
+from collections import Counter
+
+# Compressed values start with (format, dictionary id); dictionary id 0 means none
+FORMAT_ZLIB = 1
+HEADER = struct.Struct('>BI')
+
+# Shorter texts are stored as plain TEXT; the header and deflate overhead outweigh the saving
+MIN_COMPRESS_BYTES = 96
+
+# zlib can only reference the last 32 KiB before the data, so a bigger dictionary is wasted
+DICTIONARY_SIZE = 32 * 1024
+
+# Phrases of up to this many words are considered for the dictionary
+MAX_PHRASE_WORDS = 4
+
+def _compressor(dictionary):
+    # Raw deflate (negative wbits) drops the zlib header and checksum; the column
+    # value is the only thing stored
+    if dictionary:
+        return zlib.compressobj(9, zlib.DEFLATED, -15, zdict=dictionary)
+    return zlib.compressobj(9, zlib.DEFLATED, -15)
+
+def _decompressor(dictionary):
+    if dictionary:
+        return zlib.decompressobj(-15, zdict=dictionary)
+    return zlib.decompressobj(-15)
+
+def compress_text(text, dictionary_id=0, dictionary=None):
+    """
+    Compress a text column value with zlib and an optional preset dictionary.
+
+    Args:
+        text (str): The text, or None.
+        dictionary_id (int): ID of `dictionary` in compression_dictionaries, 0 for none.
+        dictionary (bytes): Preset dictionary built by train_dictionary, or None.
+
+    Returns:
+        bytes or str: The compressed value, or `text` unchanged if it is short or does
+        not compress.
+    """
+    if text is None:
+        return None
+    data = text.encode('utf-8')
+    if len(data) < MIN_COMPRESS_BYTES:
+        return text
+    compressor = _compressor(dictionary)
+    value = HEADER.pack(FORMAT_ZLIB, dictionary_id) + compressor.compress(data) + compressor.flush()
+    return value if len(value) < len(data) else text
+
+def is_compressed(value):
+    return isinstance(value, (bytes, bytearray, memoryview))
+
+def compressed_dictionary_id(value):
+    """The dictionary ID a compressed value needs (0 for none), or None for plain text."""
+    if not is_compressed(value):
+        return None
+    return HEADER.unpack_from(value)[1]
+
+def decompress_text(value, dictionary=None):
+    """
+    Decode a value written by compress_text.
+
+    Args:
+        value (bytes or str): The stored value; plain text is returned unchanged.
+        dictionary (bytes): The preset dictionary named by compressed_dictionary_id(value).
+
+    Returns:
+        str: The text.
+
+    Raises:
+        ValueError: If the value is in an unknown format or its dictionary is missing.
+    """
+    if not is_compressed(value):
+        return value
+    value = bytes(value)
+    value_format, dictionary_id = HEADER.unpack_from(value)
+    if value_format != FORMAT_ZLIB:
+        raise ValueError(f"Unknown compressed text format: {value_format}")
+    if dictionary_id and not dictionary:
+        raise ValueError(f"Compression dictionary {dictionary_id} is required to decompress this value")
+    decompressor = _decompressor(dictionary)
+    return (decompressor.decompress(value[HEADER.size:]) + decompressor.flush()).decode('utf-8')
+
+def train_dictionary(samples, size=DICTIONARY_SIZE):
+    """
+    Build a zlib preset dictionary from the phrases most common in sample texts.
+
+    Phrases of one to MAX_PHRASE_WORDS words are scored by occurrences times length,
+    the bytes a back-reference to them could save. The best are packed until `size`
+    is reached, skipping phrases already contained in a chosen one, with the most
+    valuable last because deflate encodes nearer matches more cheaply.
+
+    Args:
+        samples (list): Texts representative of what will be compressed, such as recent
+            comic scripts and stories.
+        size (int): Maximum dictionary size in bytes.
+
+    Returns:
+        bytes: The dictionary, empty if the samples share no phrases.
+    """
+    counts = Counter()
+    for text in samples:
+        words = text.split()
+        for length in range(1, MAX_PHRASE_WORDS + 1):
+            for start in range(len(words) - length + 1):
+                counts[' '.join(words[start:start + length])] += 1
+    candidates = sorted((phrase for phrase, count in counts.items() if count > 1 and len(phrase) > 3),
+                        key=lambda phrase: counts[phrase] * len(phrase), reverse=True)
+    chosen = []
+    chosen_text = ''
+    total = 0
+    for phrase in candidates:
+        if phrase in chosen_text:
+            continue
+        encoded = (phrase + ' ').encode('utf-8')
+        if total + len(encoded) > size:
+            break
+        chosen.append(encoded)
+        chosen_text += phrase + ' '
+        total += len(encoded)
+    return b''.join(reversed(chosen))
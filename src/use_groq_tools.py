@@ -1,12 +1,12 @@
 import json
 import ollama
-import psycopg2
 import os
 
 from logger import app_logger
 from typing import Dict, Any
 from utils import unload_ollama_model
 from config import load_config
+from database import ComicDatabase
 
 config = load_config()
 
@@ -18,12 +18,10 @@ config = load_config()
     #return f"SQL query result for: {query}"
 
 def query_sql(query: str) -> Any:
-    conn = psycopg2.connect(config.DB_PATH)
-    cursor = conn.cursor()
+    # Runs on a read-only connection of the configured storage backend (SQLite or PostgreSQL)
+    cursor = ComicDatabase.get_read_cursor()
     cursor.execute(query)
-    result = cursor.fetchall()
-    conn.close()
-    return result
+    return [dict(row) for row in cursor.fetchall()]
 
 def query_rag(question: str) -> Any:
     # Placeholder function to perform a RAG query
@@ -1,21 +1,23 @@
 import os
 import re
-import torch
 import traceback
 import warnings
 import requests
-import cv2
 import io
 from PIL import Image
 from io import BytesIO
 from datetime import datetime
 from logger import app_logger
-from transformers import pipeline
+from lazy_imports import lazy_import
+from captioning import captioning_engine
 from config import load_config
 from datetime import datetime
 
 config = load_config()
 
+# Loaded on first use; only video capture needs it
+cv2 = lazy_import('cv2')
+
 def sanitize_location(location):
     """Sanitize location string for use in directory paths"""
     # Replace spaces with underscores and remove commas
@@ -53,10 +55,7 @@ def analyze_frames(frames):
     :return: List of detailed frame descriptions
     """
     try:
-        # Load the image captioning pipeline model
-        captioner = load_pipeline_model()
         app_logger.debug("Analyzing frames with image captioning")
-        frame_descriptions = []
 
         # If frames is a string (path to an image file), try to open it
         if isinstance(frames, str):
@@ -64,7 +63,8 @@ def analyze_frames(frames):
                 app_logger.error(f"Invalid file path: {frames}")
                 return None
             try:
-                frames = [Image.open(frames)]
+                with Image.open(frames) as img:
+                    frames = [img.convert('RGB')]
             except Exception as e:
                 app_logger.error(f"Error opening image file: {e}")
                 return None
@@ -78,23 +78,44 @@ def analyze_frames(frames):
             app_logger.error("Invalid input: frames must be a list of PIL Image objects, a single PIL Image object, or a path to an image file")
             return None
 
-        for i, frame in enumerate(frames):
-            app_logger.debug(f"Analyzing frame {i+1}/{len(frames)}")
-            
-            # Generate caption using the image captioning pipeline
-            caption = captioner(frame, max_new_tokens=50)[0]['generated_text']
-            
-            frame_descriptions.append(f"Frame {i+1}: {caption}")
+        # Caption all frames in batches with the shared, already loaded model
+        captions = captioning_engine.caption(frames, max_new_tokens=50)
+        frame_descriptions = [f"Frame {i+1}: {caption}" for i, caption in enumerate(captions)]
             
         app_logger.debug("Frame analysis completed successfully")
-        # Call the function to unload
-        unload_pipeline_model(captioner)
         return frame_descriptions
     except Exception as e:
         app_logger.error(f"Error analyzing frames with image captioning: {e}")
         app_logger.error(traceback.format_exc())
         return None
 
+def analyze_images(image_paths):
+    """
+    Caption several image files in shared batches.
+
+    :param image_paths: List of paths to image files
+    :return: Dict mapping each path to its frame descriptions, as analyze_frames returns
+             them, or None if the image could not be opened or captioned
+    """
+    images = {}
+    for path in image_paths:
+        try:
+            # Decode now so the file is closed before the batch is captioned
+            with Image.open(path) as img:
+                images[path] = img.convert('RGB')
+        except Exception as e:
+            app_logger.error(f"Error opening image file {path}: {e}")
+    results = {path: None for path in image_paths}
+    try:
+        captions = captioning_engine.caption(list(images.values()), max_new_tokens=50)
+    except Exception as e:
+        app_logger.error(f"Error analyzing images with image captioning: {e}")
+        app_logger.error(traceback.format_exc())
+        return results
+    for path, caption in zip(images, captions):
+        results[path] = [f"Frame 1: {caption}"]
+    return results
+
 def save_summary(location, filename, title, story="", source="", panel_summary=""):
     """
     Saves a summary file with event details and panel summary.
@@ -217,31 +238,6 @@ def filter_content(text, strict=False):
     
     return text
 
-def unload_pipeline_model(captioner):
-    # Move the model to CPU
-    captioner.model.to('cpu')
-    
-    # Clear CUDA cache
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
-    
-    # Delete the pipeline and model
-    del captioner.model
-    del captioner
-    
-    # Force garbage collection
-    import gc
-    gc.collect()
-
-def load_pipeline_model():
-    # Check if CUDA is available and set the device
-    device = 0 if torch.cuda.is_available() else -1
-    print(f"{torch.cuda.get_device_name(0) if device == 0 else 'cpu'}")
-
-    # Load image captioning pipeline with fp16 precision for memory optimization
-    captioner = pipeline("image-to-text", model=config.TORCH_IMAGE_TO_TEXT_MODEL, device=device, torch_dtype=torch.float16 if torch.cuda.is_available() else None)
-    return captioner
-
 def unload_ollama_model(model_name):
     url = "http://localhost:11434/api/generate"
     payload = {
@@ -1,13 +1,15 @@
-import cv2
-import numpy as np
 import traceback
 from PIL import Image
 
 from logger import app_logger
+from lazy_imports import lazy_import
 from utils import analyze_frames
 
 from text_analysis import analyze_text_ollama
 
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
 
 def extract_frames(video_path, num_frames=5):
     """
@@ -1,27 +1,41 @@
-import whisper
-import pyaudio
-import numpy as np
-import torch
-from config import load_config
+import threading
+from config import ENV_PATH, load_config
+from lazy_imports import lazy_import
+from logger import app_logger
 
 # Load configuration
 config = load_config()
 
-# Initialize the Whisper model
+# Loaded on first use; nothing is imported until voice input is actually listened to
+whisper = lazy_import('whisper')
+pyaudio = lazy_import('pyaudio')
+np = lazy_import('numpy')
+torch = lazy_import('torch')
+
+# The Whisper model, loaded by get_whisper_model on first transcription
 # Tiny model: ~1 GB VRAM
 # Base model: ~2 GB VRAM
 # Small model: ~3 GB VRAM
 # Medium model: ~5 GB VRAM
 # Large model: ~10-12 GB VRAM
-device = 0 if torch.cuda.is_available() else -1
-whisper_model = whisper.load_model(config.WHISPER_MODEL_SIZE, device="cuda" if device == 0 else "cpu")
+whisper_model = None
+_whisper_model_lock = threading.Lock()
 
 # PyAudio configuration
 CHUNK = 1024
-FORMAT = pyaudio.paFloat32
 CHANNELS = 1
 RATE = 16000
 
+def get_whisper_model():
+    """Load the WHISPER_MODEL_SIZE Whisper model on first use and return it."""
+    global whisper_model
+    with _whisper_model_lock:
+        if whisper_model is None:
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            app_logger.info(f"Loading Whisper {config.WHISPER_MODEL_SIZE} model on {device}")
+            whisper_model = whisper.load_model(config.WHISPER_MODEL_SIZE, device=device)
+        return whisper_model
+
 def is_listen_voice_enabled():
     return config.LISTEN_VOICE_ENABLED
 
@@ -30,7 +44,7 @@ def listen_to_user(duration=config.LISTEN_VOICE_DURATION_SHORT):
         return None
 
     p = pyaudio.PyAudio()
-    stream = p.open(format=FORMAT,
+    stream = p.open(format=pyaudio.paFloat32,
                     channels=CHANNELS,
                     rate=RATE,
                     input=True,
@@ -50,7 +64,7 @@ def listen_to_user(duration=config.LISTEN_VOICE_DURATION_SHORT):
     p.terminate()
 
     audio_data = np.frombuffer(b''.join(frames), dtype=np.float32)
-    result = whisper_model.transcribe(audio_data)
+    result = get_whisper_model().transcribe(audio_data)
     
     return result['text'].strip().lower()
 
@@ -59,7 +73,7 @@ def toggle_voice():
     new_state = 'true' if not current_state else 'false'
     
     # Read the current .env file
-    with open('.env', 'r') as file:
+    with open(ENV_PATH, 'r') as file:
         lines = file.readlines()
     
     # Update the LISTEN_VOICE_ENABLED line
@@ -69,7 +83,10 @@ def toggle_voice():
             break
     
     # Write the updated content back to .env
-    with open('.env', 'w') as file:
+    with open(ENV_PATH, 'w') as file:
         file.writelines(lines)
+
+    # Every module shares the config instance, so this applies the change everywhere
+    config.reload()
     
     print(f"Voice recognition {'enabled' if new_state == 'true' else 'disabled'}")
\ No newline at end of file
@@ -1,8 +1,13 @@
+# Enabled before anything else is imported so the profile covers every import
+import startup_profiler
+startup_profiler.enable_from_environment()
+
 import os
 from flask import Flask, g
-from config import load_config
+from config import add_reload_listener, load_config, start_config_watcher
 from database import ComicDatabase
 from logger import app_logger
+from output_indexer import start_background_indexer
 from text_analysis import create_yogi_bear_voice
 from modules.auth_module import auth_bp
 from modules.loyalty_module import loyalty_bp
@@ -10,9 +15,17 @@ from modules.media_module import media_bp
 from modules.routes_module import routes_bp
 from modules.comic_module import comic_bp
 
+def _sync_admin_user(config):
+    # Runs on the watcher thread, so hand its connection back to the pool afterwards
+    try:
+        ComicDatabase.sync_admin_user(config.ADMIN_PASSWORD)
+    finally:
+        ComicDatabase.close()
+
 def create_app():
     app = Flask(__name__, static_folder='static')
-    config = load_config()
+    with startup_profiler.step('load config'):
+        config = load_config()
 
     # Store config on app for access in other parts of application
     app.config['APP_CONFIG'] = config
@@ -25,15 +38,27 @@ def create_app():
     app.config['GENERATED_IMAGES_FOLDER'] = config.OUTPUT_DIR
     os.makedirs(app.config['GENERATED_IMAGES_FOLDER'], exist_ok=True)
 
+    # Apply migrations and sync the admin user before serving requests
+    ComicDatabase.bootstrap()
+
+    # Pick up comics written to the output folder without blocking startup
+    with startup_profiler.step('start background indexer'):
+        start_background_indexer()
+
+    # Apply .env edits while running; a changed ADMIN_PASSWORD is synced to the admin user
+    add_reload_listener(_sync_admin_user)
+    start_config_watcher()
+
     # Configure audio serving for albums (using relative path)
     app.config['ALBUMS_FOLDER'] = 'audio/albums'
 
     # Register blueprints
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(loyalty_bp)
-    app.register_blueprint(media_bp)
-    app.register_blueprint(routes_bp)
-    app.register_blueprint(comic_bp)
+    with startup_profiler.step('register blueprints'):
+        app.register_blueprint(auth_bp)
+        app.register_blueprint(loyalty_bp)
+        app.register_blueprint(media_bp)
+        app.register_blueprint(routes_bp)
+        app.register_blueprint(comic_bp)
 
     @app.before_first_request
     def before_first_request():
@@ -54,10 +79,13 @@ def create_app():
 
     @app.teardown_appcontext
     def close_db(error):
-        db = g.pop('db', None)
-        if db is not None:
-            db.close()
+        # Return this thread's pooled connections; generation code uses ComicDatabase
+        # directly, so release even when no request handler set g.db
+        g.pop('db', None)
+        ComicDatabase.close()
 
+    # The app is ready to serve; report where startup went if profiling is on
+    startup_profiler.finish()
     return app, config
 
 if __name__ == '__main__':
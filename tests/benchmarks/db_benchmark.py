@@ -0,0 +1,344 @@
+"""
+Benchmark ComicDatabase against a synthetic dataset and write a JSON report.
+
+Seeds a fresh database with synthetic users and comics, times the hot queries one at
+a time, then runs them under concurrent reader and writer threads. Reports from two
+releases can be compared with --compare.
+
+Usage:
+    python tests/benchmarks/db_benchmark.py --comics 10000 --output report.json
+    python tests/benchmarks/db_benchmark.py --comics 1000000 --compare report.json
+
+The database is created in a temporary directory unless --db is given. Set
+DB_BACKEND=postgres and DATABASE_URL to benchmark PostgreSQL instead; that database
+must be empty because the seed data is added to it.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'src')
+
+WORDS = (
+    'bear picnic basket ranger park honey river forest camp trail mountain lake storm '
+    'festival market council road bridge school library museum concert team game '
+    'season harvest fire rescue wildlife salmon snow tourist cabin canoe fishing '
+    'election mayor budget housing traffic weather sunrise night police hospital'
+).split()
+LOCATIONS = [f'Town {i:03d}' for i in range(50)]
+DAYS = 365
+BATCH_SIZE = 1000
+LOYALTY_ACTION = 'custom_comic'
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(samples_ms):
+    """Summarize latencies in milliseconds."""
+    return {
+        'runs': len(samples_ms),
+        'min_ms': round(min(samples_ms), 3),
+        'median_ms': round(statistics.median(samples_ms), 3),
+        'p95_ms': round(percentile(samples_ms, 0.95), 3),
+        'max_ms': round(max(samples_ms), 3),
+    }
+
+
+def synthetic_story(rng, words=60):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def seed_database(db, comic_count, user_count, rng):
+    """
+    Add synthetic users and comics through the regular ComicDatabase writers.
+
+    Returns:
+        dict: The seeded users, stories and timings.
+    """
+    from werkzeug.security import generate_password_hash
+
+    started = time.perf_counter()
+    # One hash for every user; hashing each password would dominate the seed time
+    password_hash = generate_password_hash('benchmark')
+    with db.transaction():
+        cursor = db.get_cursor()
+        cursor.executemany(
+            'INSERT INTO users (username, email, password_hash, role, loyalty_points) VALUES (?, ?, ?, ?, ?)',
+            [(f'bench_user_{i}', f'bench_user_{i}@example.com', password_hash, 'user', 10 ** 9)
+             for i in range(user_count)]
+        )
+    cursor = db.get_read_cursor()
+    cursor.execute("SELECT id FROM users WHERE username LIKE 'bench_user_%' ORDER BY id")
+    user_ids = [row['id'] for row in cursor.fetchall()]
+    users_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    first_day = date.today() - timedelta(days=DAYS - 1)
+    stories = []
+    for batch_start in range(0, comic_count, BATCH_SIZE):
+        batch = []
+        for i in range(batch_start, min(batch_start + BATCH_SIZE, comic_count)):
+            story = synthetic_story(rng)
+            location = rng.choice(LOCATIONS)
+            comic_date = first_day + timedelta(days=rng.randrange(DAYS))
+            if len(stories) < 1000:
+                stories.append(story)
+            batch.append({
+                'user_id': rng.choice(user_ids),
+                'title': ' '.join(rng.choice(WORDS) for _ in range(4)).title() + f' {i}',
+                'location': location,
+                'original_story': story,
+                'comic_script': synthetic_story(rng, 120),
+                'comic_summary': synthetic_story(rng, 20),
+                'story_source_url': f'https://example.com/story/{i}',
+                'image_path': f"{location.replace(' ', '_')}/{comic_date.strftime('%Y_%m_%d')}/bench_{i}.png",
+                'date': comic_date.isoformat(),
+            })
+        if db.add_comics(batch) != len(batch):
+            raise RuntimeError(f"Seeding failed at comic {batch_start}; see the application log")
+        print(f"  seeded {min(batch_start + BATCH_SIZE, comic_count)}/{comic_count} comics", end='\r', flush=True)
+    print()
+    comics_seconds = time.perf_counter() - started
+    db.close()
+    return {
+        'user_ids': user_ids,
+        'stories': stories,
+        'timings': {
+            'users_seconds': round(users_seconds, 3),
+            'comics_seconds': round(comics_seconds, 3),
+            'comics_per_second': round(comic_count / comics_seconds, 1) if comics_seconds else None,
+        },
+    }
+
+
+def filter_cases(db, seeded):
+    """Every combination of the get_filtered_comics filters, as (name, callable)."""
+    admin_user = db.get_user_by_username('admin')
+    user_id = seeded['user_ids'][0]
+    end_date = date.today()
+    start_date = end_date - timedelta(days=30)
+    location = LOCATIONS[0]
+    search = 'bear picnic'
+    cases = []
+    for is_admin, dated, located, searched in itertools.product((False, True), repeat=4):
+        name = '+'.join(part for part, on in (
+            ('admin' if is_admin else 'user', True), ('dates', dated), ('location', located), ('search', searched)
+        ) if on)
+        args = dict(
+            user_id=admin_user['id'] if is_admin else user_id,
+            is_admin=is_admin,
+            start_date=start_date if dated else None,
+            end_date=end_date if dated else None,
+            location=location if located else None,
+            search=search if searched else None,
+        )
+        cases.append((f'get_filtered_comics[{name}]', lambda args=args: db.get_filtered_comics(**args)))
+        cases.append((f'get_comic_page[{name}]', lambda args=args: db.get_comic_page(**args)))
+    return cases
+
+
+def single_thread_cases(db, seeded, rng):
+    stories = seeded['stories']
+    user_ids = seeded['user_ids']
+    cases = filter_cases(db, seeded)
+    cases += [
+        ('get_comic_by_story[hit]', lambda: db.get_comic_by_story(rng.choice(stories))),
+        ('get_comic_by_story[miss]', lambda: db.get_comic_by_story(synthetic_story(rng))),
+        ('get_similar_story_candidates', lambda: db.get_similar_story_candidates(rng.choice(stories))),
+        ('get_unique_locations', db.get_unique_locations),
+        ('get_location_stats', db.get_location_stats),
+        ('get_user_by_username', lambda: db.get_user_by_username(f'bench_user_{rng.randrange(len(user_ids))}')),
+        ('get_user_by_id', lambda: db.get_user_by_id(rng.choice(user_ids))),
+        ('get_cached_user', lambda: db.get_cached_user(rng.choice(user_ids))),
+        ('spend_loyalty_points', lambda: db.spend_loyalty_points(rng.choice(user_ids), LOYALTY_ACTION)),
+        ('update_user_loyalty_points', lambda: db.update_user_loyalty_points(rng.choice(user_ids), 1, 'benchmark')),
+    ]
+    return cases
+
+
+def time_case(db, func, repeat):
+    func()  # Warm the statement and page caches
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    db.close()
+    return summarize(samples)
+
+
+def run_concurrent(db, seeded, readers, writers, duration):
+    """
+    Run gallery reads and loyalty/comic writes on several threads at once.
+
+    Returns:
+        dict: Per-operation throughput and latency.
+    """
+    stop = threading.Event()
+    results = {}
+    results_lock = threading.Lock()
+    user_ids = seeded['user_ids']
+    stories = seeded['stories']
+
+    def record(name, samples, errors):
+        with results_lock:
+            entry = results.setdefault(name, {'samples': [], 'errors': 0})
+            entry['samples'].extend(samples)
+            entry['errors'] += errors
+
+    def worker(operations, seed):
+        rng = random.Random(seed)
+        samples = {name: [] for name, _ in operations}
+        errors = {name: 0 for name, _ in operations}
+        try:
+            while not stop.is_set():
+                name, operation = rng.choice(operations)
+                started = time.perf_counter()
+                try:
+                    operation(rng)
+                except Exception:
+                    errors[name] += 1
+                samples[name].append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+            for name in samples:
+                record(name, samples[name], errors[name])
+
+    read_operations = [
+        ('get_comic_page', lambda rng: db.get_comic_page(rng.choice(user_ids))),
+        ('get_comic_page[search]', lambda rng: db.get_comic_page(rng.choice(user_ids), search=rng.choice(WORDS))),
+        ('get_unique_locations', lambda rng: db.get_unique_locations()),
+        ('get_comic_by_story', lambda rng: db.get_comic_by_story(rng.choice(stories))),
+        ('get_user_by_username', lambda rng: db.get_user_by_username(f'bench_user_{rng.randrange(len(user_ids))}')),
+    ]
+    write_operations = [
+        ('spend_loyalty_points', lambda rng: db.spend_loyalty_points(rng.choice(user_ids), LOYALTY_ACTION)),
+        ('add_comic', lambda rng: db.add_comic(
+            rng.choice(user_ids), f'Concurrent {rng.random()}', rng.choice(LOCATIONS), synthetic_story(rng),
+            synthetic_story(rng, 120), synthetic_story(rng, 20), '', f'Concurrent/{rng.random()}.png')),
+    ]
+
+    threads = [threading.Thread(target=worker, args=(read_operations, i)) for i in range(readers)]
+    threads += [threading.Thread(target=worker, args=(write_operations, 1000 + i)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    report = {'readers': readers, 'writers': writers, 'duration_seconds': duration, 'operations': {}}
+    for name, entry in sorted(results.items()):
+        if not entry['samples']:
+            continue
+        report['operations'][name] = dict(summarize(entry['samples']),
+                                          ops_per_second=round(len(entry['samples']) / duration, 1),
+                                          errors=entry['errors'])
+    return report
+
+
+def compare_reports(baseline, current):
+    """Print the median latency change of every case present in both reports."""
+    print(f"\nCompared with {baseline['metadata']['created_at']} ({baseline['metadata']['comics']} comics):")
+    sections = [('cases', baseline.get('cases', {}), current.get('cases', {})),
+                ('concurrent', baseline.get('concurrent', {}).get('operations', {}),
+                 current.get('concurrent', {}).get('operations', {}))]
+    for section, before, after in sections:
+        for name in sorted(set(before) & set(after)):
+            old, new = before[name]['median_ms'], after[name]['median_ms']
+            change = (new - old) / old * 100 if old else 0.0
+            print(f"  {section:<10} {name:<55} {old:>10.3f} -> {new:>10.3f} ms  {change:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--comics', type=int, default=10000, help='synthetic comics to seed (default 10000)')
+    parser.add_argument('--users', type=int, default=200, help='synthetic users to seed (default 200)')
+    parser.add_argument('--repeat', type=int, default=50, help='timed runs per single-thread case (default 50)')
+    parser.add_argument('--readers', type=int, default=8, help='concurrent reader threads (default 8)')
+    parser.add_argument('--writers', type=int, default=2, help='concurrent writer threads (default 2)')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to run the concurrent phase (default 10)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the synthetic data (default 1)')
+    parser.add_argument('--db', help='SQLite file to create (default: a temporary file)')
+    parser.add_argument('--output', default='db_benchmark.json', help='where to write the JSON report')
+    parser.add_argument('--compare', help='earlier JSON report to compare against')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='grizz-db-benchmark-')
+    db_path = args.db or os.path.join(workdir, 'benchmark.db')
+    if os.path.exists(db_path):
+        parser.error(f"{db_path} already exists; the benchmark needs a fresh database")
+    os.environ['DB_PATH'] = db_path
+    os.environ.setdefault('OUTPUT_DIR', os.path.join(workdir, 'output'))
+    os.environ.setdefault('LOG_PATH', os.path.join(workdir, 'logs'))
+    os.environ.setdefault('ADMIN_PASSWORD', 'benchmark')
+    os.environ['OUTPUT_INDEXER_ENABLED'] = 'false'
+    os.environ['DB_POOL_SIZE'] = str(max(8, args.readers + args.writers))
+
+    sys.path.insert(0, SRC_DIR)
+    from logger import app_logger
+    # Debug logging of every query, and warnings about the synthetic comics' missing
+    # image files, would dominate the timings
+    app_logger.setLevel(logging.ERROR)
+    from database import ComicDatabase as db
+    db.bootstrap()
+
+    rng = random.Random(args.seed)
+    backend = db.get_backend()
+    print(f"Seeding {args.users} users and {args.comics} comics into {backend.name} ({backend.describe()})")
+    seeded = seed_database(db, args.comics, args.users, rng)
+
+    print(f"Timing single-thread cases ({args.repeat} runs each)")
+    cases = {}
+    for name, func in single_thread_cases(db, seeded, rng):
+        cases[name] = time_case(db, func, args.repeat)
+        print(f"  {name:<55} median {cases[name]['median_ms']:>10.3f} ms  p95 {cases[name]['p95_ms']:>10.3f} ms")
+
+    print(f"Running {args.readers} readers and {args.writers} writers for {args.duration}s")
+    concurrent = run_concurrent(db, seeded, args.readers, args.writers, args.duration)
+    for name, entry in concurrent['operations'].items():
+        print(f"  {name:<55} {entry['ops_per_second']:>10.1f} ops/s  median {entry['median_ms']:>8.3f} ms  errors {entry['errors']}")
+
+    report = {
+        'metadata': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'backend': backend.name,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'comics': args.comics,
+            'users': args.users,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'seed': seeded['timings'],
+        'cases': cases,
+        'concurrent': concurrent,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_reports(json.load(f), report)
+    db.close_pools()
+
+
+if __name__ == '__main__':
+    main()
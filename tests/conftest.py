@@ -0,0 +1,68 @@
+import logging
+import os
+import sys
+import tempfile
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+# The application modules read these at import time
+_workdir = tempfile.mkdtemp(prefix='grizz-tests-')
+os.environ.setdefault('OUTPUT_DIR', os.path.join(_workdir, 'output'))
+os.environ.setdefault('LOG_PATH', os.path.join(_workdir, 'logs'))
+os.environ.setdefault('ADMIN_PASSWORD', 'test-admin')
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+os.environ['OUTPUT_INDEXER_ENABLED'] = 'false'
+
+sys.path.insert(0, SRC_DIR)
+
+from logger import app_logger
+
+# Every query is logged at DEBUG; keep test output readable
+app_logger.setLevel(logging.WARNING)
+
+from config import load_config
+from database import ComicDatabase
+
+config = load_config()
+
+BACKENDS = ['sqlite', 'postgres']
+
+
+def _reset_database_state():
+    db = ComicDatabase
+    if db._backend is not None:
+        db.close_pools()
+    db._backend = None
+    db._bootstrapped = False
+    db._user_cache.clear()
+    db.invalidate_loyalty_point_costs()
+    with db._dictionaries_lock:
+        db._dictionaries.clear()
+        db._current_dictionary = None
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch, tmp_path):
+    """
+    A bootstrapped ComicDatabase on each backend: SQLite in a fresh file, and
+    PostgreSQL at DATABASE_URL (skipped when it is not set).
+    """
+    if request.param == 'postgres':
+        if not os.environ.get('DATABASE_URL'):
+            pytest.skip('DATABASE_URL is not set')
+        pytest.importorskip('psycopg2')
+    monkeypatch.setenv('DB_BACKEND', request.param)
+    monkeypatch.setenv('DB_PATH', str(tmp_path / 'comics.db'))
+    config.reload()
+    _reset_database_state()
+    ComicDatabase.bootstrap()
+    if request.param == 'postgres':
+        # The database is shared between runs; users are unique per test and the
+        # ledger is append-only, so only the comics and manifest need clearing
+        ComicDatabase.purge_database()
+    yield request.param
+    _reset_database_state()
+    monkeypatch.undo()
+    config.reload()
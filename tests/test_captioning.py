@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+
+import captioning
+from captioning import CaptioningEngine
+from config import load_config
+
+
+class FakeCaptioner:
+    """Stands in for a transformers image-to-text pipeline, batching like the real one."""
+
+    def __init__(self):
+        self.calls = []
+        self.batches = []
+        self.model = SimpleNamespace(to=lambda device: None)
+
+    def __call__(self, images, max_new_tokens, batch_size):
+        self.calls.append(len(images))
+        results = []
+        for start in range(0, len(images), batch_size):
+            batch = images[start:start + batch_size]
+            self.batches.append(len(batch))
+            results.extend([{'generated_text': f"a photo of {image}"}] for image in batch)
+        return results
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Replace torch and transformers in captioning; returns the captioners created."""
+    created = []
+
+    def pipeline(task, model, device, torch_dtype):
+        assert (task, device) == ('image-to-text', -1)
+        created.append(FakeCaptioner())
+        return created[-1]
+
+    monkeypatch.setattr(captioning, 'torch', SimpleNamespace(cuda=SimpleNamespace(is_available=lambda: False)))
+    monkeypatch.setattr(captioning, 'transformers', SimpleNamespace(pipeline=pipeline))
+    return created
+
+
+def test_one_load_serves_many_calls(loads):
+    engine = CaptioningEngine(batch_size=4, idle_seconds=0)
+    assert not engine.is_loaded()
+    assert engine.caption(['bear', 'moose']) == ['a photo of bear', 'a photo of moose']
+    assert engine.caption(['lynx']) == ['a photo of lynx']
+    assert engine.caption([]) == []
+
+    assert len(loads) == 1
+    assert loads[0].calls == [2, 1]
+    assert engine.is_loaded()
+
+
+def test_unloaded_model_is_loaded_again(loads):
+    engine = CaptioningEngine(batch_size=4, idle_seconds=0)
+    engine.caption(['bear'])
+    engine.unload()
+    assert not engine.is_loaded()
+    engine.caption(['moose'])
+    assert len(loads) == 2
+
+
+def test_batches_respect_the_configured_size(loads, monkeypatch):
+    engine = CaptioningEngine(batch_size=3, idle_seconds=0)
+    frames = [f"frame {i}" for i in range(7)]
+    assert engine.caption(frames) == [f"a photo of frame {i}" for i in range(7)]
+    assert loads[0].batches == [3, 3, 1]
+
+    loads[0].batches.clear()
+    engine.caption(frames, batch_size=5)
+    assert loads[0].batches == [5, 2]
+
+    config = load_config()
+    monkeypatch.setenv('CAPTION_BATCH_SIZE', '2')
+    config.reload()
+    try:
+        CaptioningEngine(idle_seconds=0).caption(frames[:5])
+        assert loads[1].batches == [2, 2, 1]
+    finally:
+        monkeypatch.undo()
+        config.reload()
@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+import config as config_module
+from config import add_reload_listener, load_config, reload_if_changed
+
+
+@pytest.fixture
+def env_file(tmp_path, monkeypatch):
+    """Point the shared config at a temporary .env file, restoring the real one afterwards."""
+    path = tmp_path / '.env'
+    path.write_text('')
+    monkeypatch.setattr(config_module, 'ENV_PATH', str(path))
+    monkeypatch.delenv('LOCATION', raising=False)
+    monkeypatch.delenv('GRIZZ_TEST_FLAG', raising=False)
+    load_config().reload()
+    yield path
+    monkeypatch.undo()
+    load_config().reload()
+
+
+def write_env(path, text):
+    # Bump the mtime explicitly; two writes within the clock resolution look unchanged
+    previous = os.stat(path).st_mtime_ns
+    path.write_text(text)
+    os.utime(path, ns=(previous + 1_000_000_000, previous + 1_000_000_000))
+
+
+def test_reload_updates_the_shared_instance(env_file):
+    import database
+    config = load_config()
+    write_env(env_file, 'LOCATION=Kamloops\n')
+    config.reload()
+    assert load_config() is config
+    # Modules holding `config = load_config()` see the new value
+    assert database.config.LOCATION == 'Kamloops'
+
+    with pytest.raises(AttributeError):
+        config.LOCATION = 'Elsewhere'
+
+
+def test_real_environment_wins_over_env_file(env_file, monkeypatch):
+    monkeypatch.setenv('LOCATION', 'Prince George')
+    write_env(env_file, 'LOCATION=Kamloops\n')
+    assert load_config().reload().LOCATION == 'Prince George'
+    assert os.environ['LOCATION'] == 'Prince George'
+
+
+def test_keys_removed_from_env_file_are_dropped(env_file):
+    write_env(env_file, 'LOCATION=Kamloops\nGRIZZ_TEST_FLAG=on\n')
+    config = load_config().reload()
+    assert (config.LOCATION, os.environ['GRIZZ_TEST_FLAG']) == ('Kamloops', 'on')
+
+    write_env(env_file, 'LOCATION=Kelowna\n')
+    config.reload()
+    assert config.LOCATION == 'Kelowna'
+    assert 'GRIZZ_TEST_FLAG' not in os.environ
+
+    write_env(env_file, '')
+    assert config.reload().LOCATION == 'New York'
+
+
+def test_reload_if_changed_only_reloads_on_mtime_change(env_file):
+    reloads = []
+    add_reload_listener(reloads.append)
+    try:
+        assert reload_if_changed() is False
+        assert reloads == []
+
+        write_env(env_file, 'LOCATION=Kamloops\n')
+        assert reload_if_changed() is True
+        assert reloads == [load_config()]
+        assert load_config().LOCATION == 'Kamloops'
+
+        assert reload_if_changed() is False
+        assert len(reloads) == 1
+    finally:
+        config_module._reload_listeners.remove(reloads.append)
+
+
+def test_watcher_reports_errors_on_stderr(monkeypatch, capsys):
+    def failing_reload():
+        config_module._watcher_stop.set()
+        raise ValueError('bad .env')
+
+    monkeypatch.setattr(config_module, 'reload_if_changed', failing_reload)
+    config_module._watcher_stop.clear()
+    config_module._watch_env_file(0.01)
+    captured = capsys.readouterr()
+    assert 'bad .env' in captured.err
+    assert captured.out == ''
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+
+import flux_pipelines as flux_module
+from flux_pipelines import FluxPipelineManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(flux_module.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """A manager over three fake variants whose loads are recorded instead of run."""
+    monkeypatch.setattr(FluxPipelineManager, 'variants',
+                        staticmethod(lambda: {name: (f"models/{name}", None) for name in ('a', 'b', 'c')}))
+    manager = FluxPipelineManager(max_pipelines=2, idle_seconds=0)
+    manager.loads = []
+
+    def load(variant, model_id, lora):
+        manager.loads.append(variant)
+        return f"pipe-{variant}"
+
+    monkeypatch.setattr(manager, '_load', load)
+    yield manager
+    manager.unload_all()
+
+
+def use(manager, variant):
+    with manager.pipeline(variant) as pipe:
+        return pipe
+
+
+def test_variant_is_loaded_once_and_reused(manager):
+    assert use(manager, 'a') == 'pipe-a'
+    assert use(manager, 'a') == 'pipe-a'
+    assert manager.loads == ['a']
+    assert manager.loaded_variants() == ['a']
+
+
+def test_unknown_variant_is_rejected(manager):
+    with pytest.raises(ValueError, match='Unknown FLUX variant'):
+        use(manager, 'missing')
+    assert manager.loads == []
+
+
+def test_capacity_evicts_least_recently_used(manager):
+    use(manager, 'a')
+    use(manager, 'b')
+    # Touching 'a' makes 'b' the least recently used
+    use(manager, 'a')
+    use(manager, 'c')
+    assert manager.loaded_variants() == ['a', 'c']
+
+    use(manager, 'b')
+    assert manager.loaded_variants() == ['c', 'b']
+    assert manager.loads == ['a', 'b', 'c', 'b']
+
+
+def test_pipeline_in_use_is_not_evicted(manager):
+    with manager.pipeline('a'):
+        use(manager, 'b')
+        use(manager, 'c')
+        assert 'a' in manager.loaded_variants()
+    assert manager.loaded_variants() == ['a', 'c']
+
+
+def test_idle_pipelines_are_unloaded_after_the_timeout(manager, clock):
+    manager._idle_seconds = 60
+    use(manager, 'a')
+    clock.now += 30
+    use(manager, 'b')
+
+    clock.now += 31
+    assert manager.evict_idle() == ['a']
+    assert manager.loaded_variants() == ['b']
+
+    with manager.pipeline('b'):
+        clock.now += 120
+        # Borrowed pipelines are never idle
+        assert manager.evict_idle() == []
+    clock.now += 61
+    assert manager.evict_idle() == ['b']
+    assert manager.loaded_variants() == []
+
+
+def test_concurrent_requests_share_one_load(manager, monkeypatch):
+    release = threading.Event()
+
+    def slow_load(variant, model_id, lora):
+        manager.loads.append(variant)
+        release.wait(5)
+        return f"pipe-{variant}"
+
+    monkeypatch.setattr(manager, '_load', slow_load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(use(manager, 'a'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    # Let every thread reach the pending load before it finishes
+    deadline = time.monotonic() + 5
+    while not manager._loading and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert manager.loads == ['a']
+    assert results == ['pipe-a'] * 4
+
+
+def test_failed_load_is_not_cached(manager, monkeypatch):
+    def failing_load(variant, model_id, lora):
+        manager.loads.append(variant)
+        raise OSError('weights not found')
+
+    monkeypatch.setattr(manager, '_load', failing_load)
+    with pytest.raises(OSError):
+        use(manager, 'a')
+    assert manager.loaded_variants() == []
+    assert manager._loading == {}
+
+    with pytest.raises(OSError):
+        use(manager, 'a')
+    assert manager.loads == ['a', 'a']
@@ -0,0 +1,102 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('requests')
+
+import image_generation
+
+
+class FakeFluxPipe:
+    """Returns one 'image' per prompt and runs out of memory above max_batch prompts."""
+
+    def __init__(self, max_batch):
+        self.max_batch = max_batch
+        self.batch_sizes = []
+
+    def __call__(self, prompt_embeds, **kwargs):
+        self.batch_sizes.append(len(prompt_embeds))
+        if len(prompt_embeds) > self.max_batch:
+            raise RuntimeError('CUDA out of memory. Tried to allocate 2.00 GiB')
+        return SimpleNamespace(images=[f"image of {prompt}" for prompt in prompt_embeds])
+
+
+class FakeFluxPipelines:
+    def __init__(self, pipe):
+        self.pipe = pipe
+
+    @contextmanager
+    def pipeline(self, variant='schnell'):
+        yield self.pipe
+
+    def model_key(self, variant):
+        return f"models/{variant}|"
+
+
+@pytest.fixture
+def use_pipe(monkeypatch):
+    """Route generate_flux1_batch to a fake pipeline, without torch or the text encoders."""
+    monkeypatch.setattr(image_generation, 'torch', SimpleNamespace(
+        Generator=lambda device: None, cuda=SimpleNamespace(is_available=lambda: False)))
+    monkeypatch.setattr(image_generation.prompt_embedding_cache, 'encode',
+                        lambda pipe, prompts, model_key, max_sequence_length: (list(prompts), None))
+
+    def use(pipe):
+        monkeypatch.setattr(image_generation, 'flux_pipelines', FakeFluxPipelines(pipe))
+        return pipe
+    return use
+
+
+def prompts(count):
+    return [f"panel {i}" for i in range(count)]
+
+
+def test_batches_that_fit_run_once(use_pipe):
+    pipe = use_pipe(FakeFluxPipe(max_batch=4))
+    images = image_generation.generate_flux1_batch(prompts(6), batch_size=4)
+    assert images == [f"image of panel {i}" for i in range(6)]
+    assert pipe.batch_sizes == [4, 2]
+
+
+def test_out_of_memory_halves_the_batch(use_pipe):
+    pipe = use_pipe(FakeFluxPipe(max_batch=2))
+    images = image_generation.generate_flux1_batch(prompts(7), batch_size=5)
+
+    assert images == [f"image of panel {i}" for i in range(7)]
+    # 5 fails, 2 fits; the rest of the prompts keep the smaller size
+    assert pipe.batch_sizes == [5, 2, 2, 2, 1]
+
+
+def test_later_calls_start_from_the_size_that_worked(use_pipe):
+    pipe = use_pipe(FakeFluxPipe(max_batch=1))
+    image_generation.generate_flux1_batch(prompts(4), batch_size=4)
+    assert pipe.batch_sizes == [4, 2, 1, 1, 1, 1]
+
+    pipe.batch_sizes.clear()
+    image_generation.generate_flux1_batch(prompts(2), batch_size=4)
+    assert pipe.batch_sizes == [1, 1]
+
+    # A reloaded pipeline is tried at the full size again
+    reloaded = use_pipe(FakeFluxPipe(max_batch=4))
+    image_generation.generate_flux1_batch(prompts(4), batch_size=4)
+    assert reloaded.batch_sizes == [4]
+
+
+def test_single_prompt_out_of_memory_raises(use_pipe):
+    pipe = use_pipe(FakeFluxPipe(max_batch=0))
+    with pytest.raises(MemoryError, match='single image'):
+        image_generation.generate_flux1_batch(prompts(3), batch_size=2)
+    assert pipe.batch_sizes == [2, 1]
+
+
+def test_other_errors_are_not_retried(use_pipe):
+    class BrokenPipe(FakeFluxPipe):
+        def __call__(self, prompt_embeds, **kwargs):
+            self.batch_sizes.append(len(prompt_embeds))
+            raise ValueError('bad scheduler config')
+
+    pipe = use_pipe(BrokenPipe(max_batch=4))
+    with pytest.raises(ValueError):
+        image_generation.generate_flux1_batch(prompts(4), batch_size=4)
+    assert pipe.batch_sizes == [4]
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+from PIL import Image
+
+from database import ComicDatabase as db
+from output_indexer import index_output_folder
+
+
+def count_rows(table):
+    cursor = db.get_cursor()
+    cursor.execute(f'SELECT COUNT(*) AS n FROM {table}')
+    return cursor.fetchone()['n']
+
+
+def write_comic(folder, name, story):
+    os.makedirs(folder, exist_ok=True)
+    image_path = os.path.join(folder, f"{name}.png")
+    Image.new('RGB', (4, 4)).save(image_path)
+    with open(os.path.join(folder, f"{name}_summary.txt"), 'w') as f:
+        f.write(story)
+    return image_path
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    day = tmp_path / 'output' / 'Prince_George' / '2024_07_01'
+    for i in range(3):
+        write_comic(str(day), f"ggs_grizzly_news_Story_{i}", f"Story number {i}")
+    # Not a date folder; skipped
+    write_comic(str(tmp_path / 'output' / 'Prince_George' / 'drafts'), 'draft', 'Draft')
+    return str(tmp_path / 'output')
+
+
+def test_second_run_adds_nothing(backend, output_dir):
+    first = index_output_folder(output_dir)
+    assert (first['added'], first['unchanged'], first['failed']) == (3, 0, 0)
+    assert count_rows('comics') == 3
+    assert count_rows('output_manifest') == 3
+
+    second = index_output_folder(output_dir)
+    assert (second['added'], second['updated'], second['unchanged']) == (0, 0, 3)
+    assert count_rows('comics') == 3
+    assert count_rows('output_manifest') == 3
+
+
+def test_only_changed_files_are_reindexed(backend, output_dir):
+    index_output_folder(output_dir)
+    folder = os.path.join(output_dir, 'Prince_George', '2024_07_01')
+    summary_path = os.path.join(folder, 'ggs_grizzly_news_Story_1_summary.txt')
+    with open(summary_path, 'w') as f:
+        f.write('A rewritten story')
+    stat = os.stat(summary_path)
+    os.utime(summary_path, (stat.st_atime, stat.st_mtime + 10))
+
+    counts = index_output_folder(output_dir)
+    assert (counts['added'], counts['updated'], counts['unchanged']) == (0, 1, 2)
+    assert count_rows('comics') == 3
+    comic_id = db.get_output_manifest()[os.path.join('Prince_George', '2024_07_01', 'ggs_grizzly_news_Story_1.png')]['comic_id']
+    assert db.get_comic_detail(comic_id, is_admin=True)['original_story'] == 'A rewritten story'
+
+    image_path = os.path.join(folder, 'ggs_grizzly_news_Story_2.png')
+    stat = os.stat(image_path)
+    os.utime(image_path, (stat.st_atime, stat.st_mtime + 10))
+    counts = index_output_folder(output_dir)
+    assert (counts['updated'], counts['unchanged']) == (1, 2)
+
+
+def test_new_and_deleted_files(backend, output_dir):
+    index_output_folder(output_dir)
+    folder = os.path.join(output_dir, 'Prince_George', '2024_07_01')
+    write_comic(folder, 'ggs_grizzly_news_Story_3', 'Story number 3')
+    os.remove(os.path.join(folder, 'ggs_grizzly_news_Story_0.png'))
+
+    counts = index_output_folder(output_dir)
+    assert (counts['added'], counts['removed'], counts['unchanged']) == (1, 1, 2)
+    assert count_rows('output_manifest') == 3
+    # The comic of a deleted file stays in the gallery
+    assert count_rows('comics') == 4
+
+
+def test_files_already_referenced_are_linked(backend, output_dir):
+    relative = os.path.join('Prince_George', '2024_07_01', 'ggs_grizzly_news_Story_0.png')
+    comic_id = db.add_comic(None, 'Story 0', 'Prince George', 'Story number 0', 'Panel 1', 'Summary', '',
+                            f"{relative},other.png")
+
+    counts = index_output_folder(output_dir)
+    assert (counts['added'], counts['linked']) == (2, 1)
+    assert db.get_output_manifest()[relative]['comic_id'] == comic_id
+    assert count_rows('comics') == 3
+
+
+def test_unreadable_file_is_skipped(backend, output_dir):
+    folder = os.path.join(output_dir, 'Prince_George', '2024_07_01')
+    with open(os.path.join(folder, 'ggs_grizzly_news_Story_1_summary.txt'), 'wb') as f:
+        f.write(b'\xff\xfe\xfa not utf-8')
+
+    counts = index_output_folder(output_dir)
+    assert (counts['added'], counts['failed']) == (2, 1)
+    assert count_rows('output_manifest') == 2
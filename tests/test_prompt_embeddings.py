@@ -0,0 +1,119 @@
+import os
+
+import pytest
+
+torch = pytest.importorskip('torch')
+
+import prompt_embeddings
+from prompt_embeddings import PromptEmbeddingCache
+
+
+class FakeEncoderPipe:
+    """Stands in for FluxPipeline.encode_prompt, recording the prompts it encodes."""
+
+    _execution_device = 'cpu'
+
+    def __init__(self):
+        self.encoded = []
+
+    @staticmethod
+    def embedding(prompt):
+        return float(sum(map(ord, prompt)))
+
+    def encode_prompt(self, prompt, prompt_2, device, max_sequence_length):
+        self.encoded.append(list(prompt))
+        values = torch.tensor([self.embedding(text) for text in prompt])
+        prompt_embeds = values.view(-1, 1, 1).expand(-1, 4, 3).clone()
+        pooled_prompt_embeds = values.view(-1, 1).expand(-1, 3).clone()
+        return prompt_embeds, pooled_prompt_embeds, torch.zeros(4, 3)
+
+
+def assert_embeds(result, prompts):
+    prompt_embeds, pooled_prompt_embeds = result
+    assert prompt_embeds.shape == (len(prompts), 4, 3)
+    assert pooled_prompt_embeds.shape == (len(prompts), 3)
+    expected = [FakeEncoderPipe.embedding(prompt) for prompt in prompts]
+    assert prompt_embeds[:, 0, 0].tolist() == expected
+    assert pooled_prompt_embeds[:, 0].tolist() == expected
+
+
+def test_cached_prompts_skip_the_encoder():
+    cache = PromptEmbeddingCache(max_entries=10, directory='')
+    pipe = FakeEncoderPipe()
+    assert_embeds(cache.encode(pipe, ['a bear', 'a moose'], 'flux'), ['a bear', 'a moose'])
+    assert_embeds(cache.encode(pipe, ['a moose', 'a lynx', 'a bear'], 'flux'), ['a moose', 'a lynx', 'a bear'])
+
+    assert pipe.encoded == [['a bear', 'a moose'], ['a lynx']]
+    assert (cache.hits, cache.misses) == (2, 3)
+
+    assert_embeds(cache.encode(pipe, ['a lynx'], 'flux'), ['a lynx'])
+    assert len(pipe.encoded) == 2
+
+
+def test_key_covers_model_and_sequence_length():
+    cache = PromptEmbeddingCache(max_entries=10, directory='')
+    pipe = FakeEncoderPipe()
+    cache.encode(pipe, ['a bear'], 'flux')
+    cache.encode(pipe, ['a bear'], 'flux|realism')
+    cache.encode(pipe, ['a bear'], 'flux', max_sequence_length=512)
+    assert len(pipe.encoded) == 3
+
+
+def test_duplicates_in_a_batch_are_encoded_once():
+    cache = PromptEmbeddingCache(max_entries=10, directory='')
+    pipe = FakeEncoderPipe()
+    prompts = ['a bear', 'a moose', 'a bear', 'a bear']
+    assert_embeds(cache.encode(pipe, prompts, 'flux'), prompts)
+    assert pipe.encoded == [['a bear', 'a moose']]
+
+
+def test_memory_is_bounded_least_recently_used_first():
+    cache = PromptEmbeddingCache(max_entries=2, directory='')
+    pipe = FakeEncoderPipe()
+    cache.encode(pipe, ['one', 'two'], 'flux')
+    # Using 'one' again makes 'two' the oldest entry
+    cache.encode(pipe, ['one'], 'flux')
+    cache.encode(pipe, ['three'], 'flux')
+    assert len(cache._entries) == 2
+
+    cache.encode(pipe, ['one', 'three'], 'flux')
+    cache.encode(pipe, ['two'], 'flux')
+    assert pipe.encoded == [['one', 'two'], ['three'], ['two']]
+
+
+def test_disk_store_survives_a_new_cache(tmp_path):
+    pipe = FakeEncoderPipe()
+    PromptEmbeddingCache(max_entries=10, directory=str(tmp_path)).encode(pipe, ['a bear', 'a moose'], 'flux')
+    assert len(list(tmp_path.rglob('*.pt'))) == 2
+
+    restarted = PromptEmbeddingCache(max_entries=10, directory=str(tmp_path))
+    assert_embeds(restarted.encode(pipe, ['a moose', 'a bear'], 'flux'), ['a moose', 'a bear'])
+    assert len(pipe.encoded) == 1
+    assert (restarted.hits, restarted.misses) == (2, 0)
+
+
+def test_unreadable_disk_entry_is_re_encoded(tmp_path):
+    cache = PromptEmbeddingCache(max_entries=10, directory=str(tmp_path))
+    pipe = FakeEncoderPipe()
+    key = cache.key('flux', 'a bear', 256)
+    os.makedirs(os.path.dirname(cache._path(key)))
+    with open(cache._path(key), 'wb') as f:
+        f.write(b'not a tensor file')
+
+    assert_embeds(cache.encode(pipe, ['a bear'], 'flux'), ['a bear'])
+    assert pipe.encoded == [['a bear']]
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    def failing_replace(source, destination):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(prompt_embeddings.os, 'replace', failing_replace)
+    cache = PromptEmbeddingCache(max_entries=10, directory=str(tmp_path))
+    pipe = FakeEncoderPipe()
+    assert_embeds(cache.encode(pipe, ['a bear'], 'flux'), ['a bear'])
+
+    assert [path for path in tmp_path.rglob('*') if path.is_file()] == []
+    # The entry is still served from memory
+    cache.encode(pipe, ['a bear'], 'flux')
+    assert len(pipe.encoded) == 1
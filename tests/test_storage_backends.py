@@ -0,0 +1,299 @@
+"""
+ComicDatabase against each storage backend.
+
+SQLite runs against a fresh file per test. PostgreSQL runs when DATABASE_URL points
+at a disposable database, for example:
+
+    DATABASE_URL=postgresql://postgres@localhost/grizz_test python -m pytest tests
+"""
+import uuid
+from datetime import date, timedelta
+
+import pytest
+
+from database import ComicDatabase as db
+from story_signatures import story_hash
+
+
+def make_user(points=10, role='user'):
+    username = f"user_{uuid.uuid4().hex[:10]}"
+    db.add_user(username, f"{username}@example.com", 'password', role)
+    user = db.get_user_by_username(username)
+    if points != 10:
+        db.update_user_loyalty_points(user['id'], points - 10)
+    return db.get_user_by_id(user['id'])
+
+
+def comic(user_id, title, story, day, location='Kamloops'):
+    return {
+        'user_id': user_id,
+        'title': title,
+        'location': location,
+        'original_story': story,
+        'comic_script': f"Panel 1: {title}",
+        'comic_summary': f"Summary of {title}",
+        'story_source_url': '',
+        'image_path': f"{location}/{day:%Y_%m_%d}/{title}.png",
+        'date': day,
+    }
+
+
+def test_placeholders_and_literal_percent(backend):
+    # '?' must become the driver's placeholder while a literal % survives
+    cursor = db.get_cursor()
+    cursor.execute("SELECT ? AS value, '100%' AS literal", ('grizz',))
+    row = cursor.fetchone()
+    assert (row['value'], row['literal']) == ('grizz', '100%')
+
+
+def test_release_rolls_back_only_lost_writes(backend, monkeypatch):
+    import connection_pool
+    warnings = []
+    monkeypatch.setattr(connection_pool.app_logger, 'warning', warnings.append)
+
+    # A read leaves PostgreSQL inside a transaction that wrote nothing
+    db.get_cursor().execute('SELECT COUNT(*) AS n FROM comics')
+    db.close()
+    assert warnings == []
+
+    user = make_user()
+    db.get_cursor().execute('UPDATE users SET loyalty_points = 99 WHERE id = ?', (user['id'],))
+    db.close()
+    assert len(warnings) == 1
+    db._user_cache.clear()
+    assert db.get_user_by_id(user['id'])['loyalty_points'] == 10
+
+
+def test_add_comic_and_add_comics(backend):
+    user = make_user()
+    story = 'A bear organized a picnic by the river. ' * 20
+    comic_id = db.add_comic(**comic(user['id'], 'Bear Picnic', story, date(2024, 5, 1)))
+    assert isinstance(comic_id, int)
+
+    added = db.add_comics([comic(user['id'], f"Story {i}", f"Story number {i}", date(2024, 5, 2 + i))
+                           for i in range(3)])
+    assert added == 3
+
+    detail = db.get_comic_detail(comic_id, user_id=user['id'])
+    assert detail['original_story'] == story
+    assert detail['story_excerpt'] == story[:280]
+    assert len(db.get_all_comics(user_id=user['id'])) == 4
+    assert db.get_location_stats() == [{'location': 'Kamloops', 'comic_count': 4}]
+
+
+def test_story_truncated_flag(backend):
+    user = make_user()
+    db.add_comic(**comic(user['id'], 'Exact', 'x' * 280, date(2024, 6, 1)))
+    db.add_comic(**comic(user['id'], 'Long', 'y' * 281, date(2024, 6, 2)))
+    page, _ = db.get_comic_page(user_id=user['id'])
+    assert {c['title']: (len(c['story_excerpt']), bool(c['story_truncated'])) for c in page} == {
+        'Exact': (280, False),
+        'Long': (280, True),
+    }
+
+
+def test_keyset_paging(backend):
+    user = make_user()
+    start = date(2024, 1, 1)
+    db.add_comics([comic(user['id'], f"Comic {i}", f"Story {i}", start + timedelta(days=i % 4))
+                   for i in range(7)])
+
+    seen = []
+    after = None
+    while True:
+        page, after = db.get_comic_page(user_id=user['id'], page_size=3, after=after)
+        seen.extend(page)
+        if after is None:
+            break
+    assert len(seen) == 7
+    assert len({c['id'] for c in seen}) == 7
+    keys = [(c['date'], str(c['created_at']), c['id']) for c in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_paging_lists_each_story_once(backend):
+    user = make_user()
+    start = date(2024, 1, 1)
+    # Comic 0 and 5 share a story, comic 1 and 6 share a title; the newer of each pair is listed
+    db.add_comics([comic(user['id'], f"Comic {i}", f"Story {i}", start + timedelta(days=i)) for i in range(5)]
+                  + [comic(user['id'], 'Comic 5', 'story   0', start + timedelta(days=5)),
+                     comic(user['id'], 'Comic 1', 'Another story', start + timedelta(days=6))])
+
+    pages = []
+    after = None
+    while True:
+        page, after = db.get_comic_page(user_id=user['id'], page_size=2, after=after)
+        pages.append([c['title'] for c in page])
+        if after is None:
+            break
+    assert pages == [['Comic 1', 'Comic 5'], ['Comic 4', 'Comic 3'], ['Comic 2']]
+    found, _ = db.get_comic_page(user_id=user['id'], search='comic')
+    assert sorted(c['title'] for c in found) == ['Comic 1', 'Comic 2', 'Comic 3', 'Comic 4', 'Comic 5']
+
+
+def test_search_paging(backend):
+    user = make_user()
+    day = date(2024, 2, 1)
+    db.add_comics([comic(user['id'], f"Picnic {i}", f"Rangers found a picnic basket number {i}", day)
+                   for i in range(5)]
+                  + [comic(user['id'], f"Storm {i}", f"A storm closed the road {i}", day) for i in range(3)])
+
+    found = []
+    after = None
+    while True:
+        page, after = db.get_comic_page(user_id=user['id'], page_size=2, after=after, search='picni')
+        found.extend(page)
+        if after is None:
+            break
+    assert sorted(c['title'] for c in found) == [f"Picnic {i}" for i in range(5)]
+    assert len(db.get_filtered_comics(user_id=user['id'], search='storm')) == 3
+
+
+def test_story_hash_normalizes_whitespace_and_case():
+    story = 'Bears  held a\tPicnic\n by the River.'
+    assert story_hash(story) == story_hash('  bears held a picnic by the river. ')
+    assert story_hash(story) == story_hash('BEARS HELD A PICNIC BY THE RIVER.')
+    assert story_hash(story) != story_hash('Bears held a picnic by the lake.')
+    assert story_hash('') == story_hash(None) == story_hash(' \n ')
+
+
+def test_duplicate_story_lookups(backend):
+    user = make_user()
+    story = 'The ferry resumed service across the lake after a week of repairs.'
+    comic_id = db.add_comic(**comic(user['id'], 'Ferry Returns', story, date(2024, 8, 1)))
+
+    assert db.get_comic_by_story('  THE FERRY resumed service\nacross the lake after a week of repairs. ')['id'] == comic_id
+    assert db.get_comic_by_story('The ferry stayed closed.') is None
+
+    # Matched by story under another title, and by title with another story
+    assert db.get_comic_by_title_or_story('Another title', story.upper())['id'] == comic_id
+    assert db.get_comic_by_title_or_story('Ferry Returns', 'A different story')['id'] == comic_id
+    assert db.get_comic_by_title_or_story('Another title', 'A different story') is None
+
+
+def test_similar_story_candidates(backend):
+    user = make_user()
+    other = make_user()
+    story = ('The town council voted to build a new bridge over the river after the spring '
+             'flood washed out the old crossing and cut off the farms on the east bank.')
+    db.add_comic(**comic(user['id'], 'Bridge', story, date(2024, 3, 1)))
+    db.add_comic(**comic(other['id'], 'Bridge elsewhere', story, date(2024, 3, 1)))
+    db.add_comic(**comic(user['id'], 'Salmon', 'Salmon returned to the creek in record numbers this fall.',
+                         date(2024, 3, 2)))
+
+    candidates = db.get_similar_story_candidates(story.replace('spring', 'April'), user['id'])
+    assert [c['title'] for c in candidates] == ['Bridge']
+
+
+def test_spend_loyalty_points_records_ledger(backend):
+    user = make_user(points=3)
+    cost = db.get_loyalty_point_cost('custom_comic')
+    assert cost == 2
+
+    assert db.spend_loyalty_points(user['id'], 'custom_comic') is True
+    assert db.get_user_by_id(user['id'])['loyalty_points'] == 1
+    assert db.spend_loyalty_points(user['id'], 'custom_comic') is False
+    assert db.get_user_by_id(user['id'])['loyalty_points'] == 1
+
+    ledger = db.get_loyalty_ledger(user['id'])
+    assert [(entry['action'], entry['points'], entry['balance_after']) for entry in ledger[:2]] == [
+        ('custom_comic', -2, 1),
+        ('adjustment', -7, 3),
+    ]
+
+    admin = make_user(points=0, role='admin')
+    assert db.spend_loyalty_points(admin['id'], 'custom_comic') is True
+    assert db.get_user_by_id(admin['id'])['loyalty_points'] == 0
+    assert db.get_loyalty_ledger(admin['id'])[0]['action'] == 'adjustment'
+
+
+def test_user_cache_invalidated_after_outer_commit(backend):
+    user = make_user()
+    assert db.get_cached_user(user['id'])['loyalty_points'] == 10
+
+    with db.transaction():
+        assert db.spend_loyalty_points(user['id'], 'custom_comic') is True
+        # Not committed yet: the cached row must stay until the outer commit
+        assert user['id'] in db._user_cache
+    assert user['id'] not in db._user_cache
+    assert db.get_cached_user(user['id'])['loyalty_points'] == 8
+
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.update_user_loyalty_points(user['id'], 5)
+            raise RuntimeError('abort')
+    assert db.get_cached_user(user['id'])['loyalty_points'] == 8
+
+
+def test_loyalty_ledger_is_append_only(backend):
+    user = make_user()
+    db.spend_loyalty_points(user['id'], 'custom_comic')
+    cursor = db.get_cursor()
+    with pytest.raises(Exception, match='append-only'):
+        cursor.execute('UPDATE loyalty_ledger SET points = 0 WHERE user_id = ?', (user['id'],))
+    db.get_connection().rollback()
+    with pytest.raises(Exception, match='append-only'):
+        cursor.execute('DELETE FROM loyalty_ledger WHERE user_id = ?', (user['id'],))
+    db.get_connection().rollback()
+    assert len(db.get_loyalty_ledger(user['id'])) == 1
+
+
+def test_price_cache_follows_version_bump(backend):
+    assert db.get_loyalty_point_cost('media_comic') == 2
+
+    cursor = db.get_cursor()
+    cursor.execute("SELECT version FROM cache_versions WHERE name = 'loyalty_point_costs'")
+    version = cursor.fetchone()['version']
+    # A write from another process: no invalidate_loyalty_point_costs() in this one
+    cursor.execute("UPDATE loyalty_point_costs SET point_cost = 5 WHERE action_name = 'media_comic'")
+    db.get_connection().commit()
+    cursor.execute("SELECT version FROM cache_versions WHERE name = 'loyalty_point_costs'")
+    assert cursor.fetchone()['version'] > version
+
+    assert db.get_loyalty_point_cost('media_comic') == 5
+    db.update_loyalty_point_cost('media_comic', 2)
+    assert db.get_loyalty_point_cost('media_comic') == 2
+
+
+def test_price_cache_reseeds_missing_version(backend):
+    cursor = db.get_cursor()
+    cursor.execute("DELETE FROM cache_versions WHERE name = 'loyalty_point_costs'")
+    db.get_connection().commit()
+    db.invalidate_loyalty_point_costs()
+
+    assert db.get_loyalty_point_cost('media_comic') == 2
+    cursor = db.get_cursor()
+    cursor.execute("SELECT version FROM cache_versions WHERE name = 'loyalty_point_costs'")
+    assert cursor.fetchone()['version'] == 0
+
+    # The re-seeded counter tracks price changes again
+    db.update_loyalty_point_cost('media_comic', 5)
+    assert db.get_loyalty_point_cost('media_comic') == 5
+    db.update_loyalty_point_cost('media_comic', 2)
+
+
+def test_purge_database(backend):
+    user = make_user()
+    db.add_comics([comic(user['id'], f"Picnic {i}", f"A picnic story {i} about bears", date(2024, 4, 1))
+                   for i in range(3)])
+    db.purge_database()
+
+    assert db.get_comic_page(user_id=user['id']) == ([], None)
+    assert db.get_filtered_comics(user_id=user['id'], search='picnic') == []
+    assert db.get_similar_story_candidates('A picnic story 1 about bears', user['id']) == []
+    assert db.get_location_stats() == []
+    assert db.get_unique_locations() == []
+    # Users and their balances survive a purge
+    assert db.get_user_by_id(user['id'])['loyalty_points'] == 10
+
+
+def test_archive_comic_text_keeps_search_working(backend):
+    user = make_user()
+    story = 'Otters rebuilt the dam below the old mill after the storm.'
+    comic_id = db.add_comic(**comic(user['id'], 'Dam', story, date(2020, 1, 1)))
+
+    archived = db.archive_comic_text(date(2021, 1, 1))
+    assert archived == (0 if db.get_backend().native_text_compression else 1)
+
+    assert [c['id'] for c in db.get_filtered_comics(user_id=user['id'], search='otters')] == [comic_id]
+    assert db.get_comic_detail(comic_id, user_id=user['id'])['original_story'] == story